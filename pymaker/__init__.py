@@ -16,35 +16,44 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import asyncio
+import importlib
 import json
 import logging
-import re
+import os
 import sys
 import time
 from enum import Enum, auto
-from functools import total_ordering, wraps
+from concurrent.futures import Executor
+from functools import lru_cache, partial, total_ordering, wraps
+from pprint import pformat
 from threading import Lock
 from typing import Optional
 
 import eth_utils
-import pkg_resources
+from eth_utils import event_abi_to_log_topic
 from hexbytes import HexBytes
 
 from web3 import Web3
 from web3._utils.contracts import get_function_info, encode_abi
 from web3._utils.events import get_event_data
+from web3._utils.filters import construct_event_filter_params, match_fn
 from web3.exceptions import TransactionNotFound
 
 from eth_abi.codec import ABICodec
 from eth_abi.registry import registry as default_registry
 
+from pymaker.codec import function_encoder, output_decoder, parse_signature, signature_encoder
+from pymaker.events import decode_logs
 from pymaker.gas import DefaultGasPrice, GasPrice
+from pymaker.metrics import MetricsSink
 from pymaker.numeric import Wad
 from pymaker.util import synchronize, bytes_to_hexstring, is_contract_at
 
 filter_threads = []
 node_is_parity = None
 transaction_lock = Lock()
+idempotent_transactions = {}
+idempotency_lock = Lock()
 
 
 def register_filter_thread(filter_thread):
@@ -96,6 +105,9 @@ class Address:
     """Represents an Ethereum address.
 
     Addresses get normalized automatically, so instances of this class can be safely compared to each other.
+    Internally the 20 raw bytes of the address are kept, the checksummed representation is only
+    calculated when first needed. Instances are immutable and get interned, so constructing an
+    `Address` from a value which has been seen recently returns the same instance.
 
     Args:
         address: Can be any address representation allowed by web3.py
@@ -104,15 +116,40 @@ class Address:
     Attributes:
         address: Normalized hexadecimal representation of the Ethereum address.
     """
-    def __init__(self, address):
+    __slots__ = ('_bytes', '_address')
+
+    def __new__(cls, address):
         if isinstance(address, Address):
-            self.address = address.address
-        else:
-            self.address = eth_utils.to_checksum_address(address)
+            return address
+
+        if isinstance(address, (str, bytes)):
+            return _interned_address(address)
+
+        return _address_from_bytes(_address_to_bytes(address))
+
+    @classmethod
+    def _create(cls, address_bytes: bytes):
+        instance = object.__new__(cls)
+        object.__setattr__(instance, '_bytes', address_bytes)
+        object.__setattr__(instance, '_address', None)
+        return instance
+
+    @property
+    def address(self) -> str:
+        if self._address is None:
+            object.__setattr__(self, '_address', eth_utils.to_checksum_address(self._bytes))
+
+        return self._address
 
     def as_bytes(self) -> bytes:
         """Return the address as a 20-byte bytes array."""
-        return bytes.fromhex(self.address.replace('0x', ''))
+        return self._bytes
+
+    def __setattr__(self, key, value):
+        raise AttributeError("Address instances are immutable")
+
+    def __reduce__(self):
+        return Address, (self._bytes,)
 
     def __str__(self):
         return f"{self.address}"
@@ -121,19 +158,143 @@ class Address:
         return f"Address('{self.address}')"
 
     def __hash__(self):
-        return self.address.__hash__()
+        return self._bytes.__hash__()
 
     def __eq__(self, other):
         assert(isinstance(other, Address))
-        return self.address == other.address
+        return self._bytes == other._bytes
 
     def __lt__(self, other):
         assert(isinstance(other, Address))
-        return self.address < other.address
+        return self._bytes < other._bytes
+
+
+def _address_to_bytes(address) -> bytes:
+    if isinstance(address, str):
+        hex_address = address[2:] if address[:2] in ('0x', '0X') else address
+        if len(hex_address) == 40 and hex_address.isalnum():
+            return bytes.fromhex(hex_address)
+
+    elif isinstance(address, bytes):
+        if len(address) == 20:
+            return bytes(address)
+
+    return bytes.fromhex(eth_utils.to_normalized_address(address)[2:])
+
+
+@lru_cache(maxsize=16384)
+def _address_from_bytes(address_bytes: bytes) -> Address:
+    return Address._create(address_bytes)
+
+
+@lru_cache(maxsize=16384)
+def _interned_address(address) -> Address:
+    return _address_from_bytes(_address_to_bytes(address))
+
+
+ZERO_ADDRESS = Address('0x0000000000000000000000000000000000000000')
+
+
+class LazyResource:
+    """Resource file shipped with a package, read and parsed only when first accessed.
+
+    Instances are meant to be used as class attributes, i.e. `abi` and `bin` of `Contract`
+    subclasses. Accessing the attribute, either on the class or on an instance, returns the parsed
+    value. The same object is returned on every access, so it can be used as a cache key.
+
+    Args:
+        package: Name of the module the resource path is relative to, usually `__name__`.
+        resource: Path of the resource file, relative to the directory of `package`.
+        parser: Function converting the raw bytes of the resource into its value.
+    """
+    def __init__(self, package: str, resource: str, parser):
+        assert(isinstance(package, str))
+        assert(isinstance(resource, str))
+        assert(callable(parser))
+
+        self.package = package
+        self.resource = resource
+        self.parser = parser
+        self._value = None
+        self._lock = Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._value is not None
+
+    def load(self):
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = self.parser(read_resource(self.package, self.resource))
+
+        return self._value
+
+    def __get__(self, instance, owner):
+        return self.load()
+
+    def __repr__(self):
+        return f"LazyResource('{self.package}', '{self.resource}')"
+
+
+def read_resource(package: str, resource: str) -> bytes:
+    """Reads a resource file shipped with a package, without using `pkg_resources`.
+
+    Args:
+        package: Name of the module the resource path is relative to, i.e. `pymaker.dss`.
+        resource: Path of the resource file, relative to the directory of `package`.
+
+    Returns:
+        Contents of the resource file.
+    """
+    assert(isinstance(package, str))
+    assert(isinstance(resource, str))
+
+    module = sys.modules.get(package) or importlib.import_module(package)
+    with open(os.path.join(os.path.dirname(module.__file__), resource), 'rb') as file:
+        return file.read()
+
+
+# Stateless, so a single instance can be shared by all event decodes
+_event_codec = ABICodec(default_registry)
+
+
+def _check_block_context():
+    # A safe point: raises `BlockCancelled` if the block being processed by the current callback has become stale.
+    from pymaker.blocks import current_block_context
+    block_context = current_block_context()
+    if block_context is not None:
+        block_context.check()
+
+
+async def _in_executor(function, *args, **kwargs):
+    # Calls to the node block, so they are made from the default executor rather than from the event loop.
+    return await asyncio.get_event_loop().run_in_executor(None, partial(function, *args, **kwargs))
+
+
+def _decode_event_log(event_abi: dict, cls, log: dict):
+    return cls(get_event_data(_event_codec, event_abi, log))
 
 
 class Contract:
+    """Base class of all contract clients.
+
+    Subclasses declare their `abi` and `bin` with `_load_abi` and `_load_bin`. Both are read from
+    the package lazily, the ABI on first use of the class and the bytecode only on deployment.
+
+    Contract factories created by `web3.py` are cached per `Web3` instance and ABI identity,
+    so creating another client for the same contract class is cheap.
+
+    Before a contract client gets created, the existence of code at its address gets checked.
+    This check can be disabled by setting `Contract.check_code` to `False`. Otherwise, unless
+    `Contract.memoize_code_check` is set to `False`, each address is only checked once.
+    """
     logger = logging.getLogger()
+    check_code = True
+    memoize_code_check = True
+
+    _contract_factories = {}
+    _addresses_with_code = {}
 
     @staticmethod
     def _deploy(web3: Web3, abi: list, bytecode: str, args: list) -> Address:
@@ -154,20 +315,84 @@ class Contract:
         assert(isinstance(abi, list))
         assert(isinstance(address, Address))
 
-        if not is_contract_at(web3, address):
+        if Contract.check_code and not Contract._has_code(web3, address):
             raise Exception(f"No contract found at {address}")
 
-        return web3.eth.contract(abi=abi)(address=address.address)
+        return Contract._get_contract_factory(web3, abi)(address=address.address)
+
+    @staticmethod
+    def _get_contract_factory(web3: Web3, abi: list):
+        # We keep references to both `web3` and `abi` so their ids can not get reused while cached.
+        key = (id(web3), id(abi))
+        cached = Contract._contract_factories.get(key)
+        if cached is None:
+            if len(Contract._contract_factories) >= 1024:
+                Contract._contract_factories.clear()
+
+            cached = (web3, abi, web3.eth.contract(abi=abi))
+            Contract._contract_factories[key] = cached
+
+        return cached[2]
+
+    @staticmethod
+    def _has_code(web3: Web3, address: Address) -> bool:
+        # Keyed by node as well, as the same address may hold a contract on one chain but not on another.
+        # We keep a reference to `web3` so its id can not get reused while cached.
+        key = (id(web3), address)
+        if Contract.memoize_code_check and key in Contract._addresses_with_code:
+            return True
+
+        if not is_contract_at(web3, address):
+            return False
+
+        if Contract.memoize_code_check:
+            if len(Contract._addresses_with_code) >= 4096:
+                Contract._addresses_with_code.clear()
+
+            Contract._addresses_with_code[key] = web3
+
+        return True
+
+    def _call(self, function_name: str, args: list, block_identifier='latest') -> tuple:
+        """Calls a view function of the contract, returning all its return values as a tuple.
+
+        Functions taking and returning static values only are encoded and decoded by
+        :py:mod:`pymaker.codec`, other functions are called through `web3.py`. Either way
+        addresses are returned as checksum strings.
+        """
+        _check_block_context()
+
+        encoder = function_encoder(self.abi, function_name)
+        decoder = output_decoder(self.abi, function_name)
+        calldata = encoder.encode(args) if encoder is not None and decoder is not None else None
+
+        if calldata is not None:
+            return decoder.decode(self.web3.eth.call({'to': self.address.address, 'data': bytes_to_hexstring(calldata)},
+                                                     block_identifier))
 
-    def _past_events(self, contract, event, cls, number_of_past_blocks, event_filter) -> list:
+        if '(' in function_name:
+            function_factory = self._contract.get_function_by_signature(function_name)
+        else:
+            function_factory = self._contract.get_function_by_name(function_name)
+
+        result = function_factory(*args).call(block_identifier=block_identifier)
+        return tuple(result) if isinstance(result, (list, tuple)) else (result,)
+
+    def _past_events(self, contract, event, cls, number_of_past_blocks, event_filter,
+                     executor: Optional[Executor] = None) -> list:
+        _check_block_context()
         block_number = contract.web3.eth.blockNumber
         return self._past_events_in_block_range(contract, event, cls, max(block_number-number_of_past_blocks, 0),
-                                                block_number, event_filter)
+                                                block_number, event_filter, executor)
 
-    def _past_events_in_block_range(self, contract, event, cls, from_block, to_block, event_filter) -> list:
+    def _past_events_in_block_range(self, contract, event, cls, from_block, to_block, event_filter,
+                                    executor: Optional[Executor] = None) -> list:
         assert(isinstance(from_block, int))
         assert(isinstance(to_block, int))
         assert(isinstance(event_filter, dict) or (event_filter is None))
+        assert(isinstance(executor, Executor) or (executor is None))
+
+        _check_block_context()
 
         def _event_callback(cls, past):
             def callback(log):
@@ -181,18 +406,40 @@ class Contract:
 
             return callback
 
+        if executor is not None:
+            # raw logs get fetched here and decoded by the executor, `cls` has to be picklable
+            event_abi = contract.events[event]._get_event_abi()
+            data_filter_set, filter_params = construct_event_filter_params(event_abi, contract.web3.codec,
+                                                                           contract_address=contract.address,
+                                                                           argument_filters=event_filter,
+                                                                           fromBlock=from_block, toBlock=to_block)
+
+            logs = contract.web3.eth.getLogs(filter_params)
+            if any(data_filter_set):
+                logs = [log for log in logs if match_fn(contract.web3, data_filter_set, log['data'])]
+
+            self.logger.debug(f"{len(logs)} past {event} events discovered, decoding")
+            return decode_logs(partial(_decode_event_log, event_abi, cls), logs, executor)
+
         result = contract.events[event].createFilter(fromBlock=from_block, toBlock=to_block,
                                                      argument_filters=event_filter).get_all_entries()
 
         return list(map(_event_callback(cls, True), result))
 
+    def _on_event(self, contract, event, cls, subscriptions, handler):
+        assert(callable(handler))
+
+        event_abi = contract.events[event]._get_event_abi()
+        return subscriptions.subscribe(self.address, [event_abi_to_log_topic(event_abi)],
+                                       partial(_decode_event_log, event_abi, cls), handler)
+
     @staticmethod
-    def _load_abi(package, resource) -> list:
-        return json.loads(pkg_resources.resource_string(package, resource))
+    def _load_abi(package, resource) -> LazyResource:
+        return LazyResource(package, resource, json.loads)
 
     @staticmethod
-    def _load_bin(package, resource) -> str:
-        return str(pkg_resources.resource_string(package, resource), "utf-8")
+    def _load_bin(package, resource) -> LazyResource:
+        return LazyResource(package, resource, lambda content: str(content, "utf-8"))
 
 
 class Calldata:
@@ -222,9 +469,13 @@ class Calldata:
         assert isinstance(fn_sign, str)
         assert isinstance(fn_args, list)
 
-        fn_split = re.split('[(),]', fn_sign)
-        fn_name = fn_split[0]
-        fn_args_type = [{"type": type} for type in fn_split[1:] if type]
+        encoder = signature_encoder(fn_sign)
+        calldata = encoder.encode(fn_args) if encoder is not None else None
+        if calldata is not None:
+            return cls(calldata)
+
+        fn_name, fn_types = parse_signature(fn_sign)
+        fn_args_type = [{"type": type} for type in fn_types]
 
         fn_abi = {"type": "function", "name": fn_name, "inputs": fn_args_type}
         fn_abi, fn_selector, fn_arguments = get_function_info("test", abi_codec=web3.codec, fn_abi=fn_abi, args=fn_args)
@@ -298,8 +549,7 @@ class Receipt:
                     if receipt_log['topics'][0] == HexBytes('0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'):
                         from pymaker.token import ERC20Token
                         transfer_abi = [abi for abi in ERC20Token.abi if abi.get('name') == 'Transfer'][0]
-                        codec = ABICodec(default_registry)
-                        event_data = get_event_data(codec, transfer_abi, receipt_log)
+                        event_data = get_event_data(_event_codec, transfer_abi, receipt_log)
                         self.transfers.append(Transfer(token_address=Address(event_data['address']),
                                                        from_address=Address(event_data['args']['from']),
                                                        to_address=Address(event_data['args']['to']),
@@ -310,10 +560,9 @@ class Receipt:
                     if receipt_log['topics'][0] == HexBytes('0x0f6798a560793a54c3bcfe86a93cde1e73087d944c0ea20544137d4121396885'):
                         from pymaker.token import DSToken
                         transfer_abi = [abi for abi in DSToken.abi if abi.get('name') == 'Mint'][0]
-                        codec = ABICodec(default_registry)
-                        event_data = get_event_data(codec, transfer_abi, receipt_log)
+                        event_data = get_event_data(_event_codec, transfer_abi, receipt_log)
                         self.transfers.append(Transfer(token_address=Address(event_data['address']),
-                                                       from_address=Address('0x0000000000000000000000000000000000000000'),
+                                                       from_address=ZERO_ADDRESS,
                                                        to_address=Address(event_data['args']['guy']),
                                                        value=Wad(event_data['args']['wad'])))
 
@@ -322,11 +571,10 @@ class Receipt:
                     if receipt_log['topics'][0] == HexBytes('0xcc16f5dbb4873280815c1ee09dbd06736cffcc184412cf7a71a0fdb75d397ca5'):
                         from pymaker.token import DSToken
                         transfer_abi = [abi for abi in DSToken.abi if abi.get('name') == 'Burn'][0]
-                        codec = ABICodec(default_registry)
-                        event_data = get_event_data(codec, transfer_abi, receipt_log)
+                        event_data = get_event_data(_event_codec, transfer_abi, receipt_log)
                         self.transfers.append(Transfer(token_address=Address(event_data['address']),
                                                        from_address=Address(event_data['args']['guy']),
-                                                       to_address=Address('0x0000000000000000000000000000000000000000'),
+                                                       to_address=ZERO_ADDRESS,
                                                        value=Wad(event_data['args']['wad'])))
 
         else:
@@ -343,11 +591,48 @@ class TransactStatus(Enum):
      FINISHED = auto()
 
 
+class TransactMetrics:
+    """Timing and cost figures collected while executing a :py:class:`pymaker.Transact`.
+
+    Attributes:
+        estimate_gas_time: Time spent estimating gas (in seconds).
+        lock_wait_time: Time spent waiting for the transaction lock (in seconds).
+        send_time: Time spent signing and sending transactions to the node (in seconds).
+        inclusion_time: Time between sending the first transaction and finding it mined (in seconds).
+        replacements: Number of times the transaction has been re-sent with a higher gas price.
+        gas_price: Gas price of the mined transaction, or of the last one sent if none has been mined (in Wei).
+        gas_used: Amount of gas used by the mined transaction.
+        cost: Cost of the mined transaction (in ETH).
+        cancelled: Whether the transaction has been cancelled because its deadline has passed.
+    """
+    def __init__(self):
+        self.estimate_gas_time = None
+        self.lock_wait_time = 0.0
+        self.send_time = 0.0
+        self.inclusion_time = None
+        self.replacements = 0
+        self.gas_price = None
+        self.gas_used = None
+        self.cost = None
+        self.cancelled = False
+
+    def __repr__(self):
+        return f"TransactMetrics({pformat(vars(self))})"
+
+
 class Transact:
-    """Represents an Ethereum transaction before it gets executed."""
+    """Represents an Ethereum transaction before it gets executed.
+
+    If `Transact.metrics_sink` is set to an instance of :py:class:`pymaker.metrics.MetricsSink`,
+    timing and cost figures of each executed transaction (see :py:class:`pymaker.TransactMetrics`)
+    get reported to it, labelled with the `origin` class name and the `function` name. The number
+    of transactions gets reported as the `transact_total` counter, also labelled with the `outcome`.
+    """
 
     logger = logging.getLogger()
     gas_estimate_for_bad_txs = None
+    idempotency_window = 3
+    metrics_sink: Optional[MetricsSink] = None
 
     def __init__(self,
                  origin: Optional[object],
@@ -381,6 +666,11 @@ class Transact:
         self.status = TransactStatus.NEW
         self.nonce = None
         self.replaced = False
+        self.receipt = None
+        self.metrics = TransactMetrics()
+        self._encoded_calldata = None
+        self._mined_receipt = None
+        self._block_number_checked = None
 
     def _is_parity(self) -> bool:
         global node_is_parity
@@ -402,6 +692,123 @@ class Transact:
             self.logger.warning(f"Transaction failed, with hash {transaction_hash}")
         return None
 
+    def _claim_idempotency_key(self, from_account: str, idempotency_key) -> Optional['Transact']:
+        # Keys are only shared by transactions sent from the same account through the same node. Registered
+        # transactions keep a reference to their `web3`, so its id can not get reused while they are registered.
+        registry_key = (id(self.web3), Address(from_account), idempotency_key)
+
+        with idempotency_lock:
+            block_numbers = {}
+
+            # Forget about transactions which failed or were mined outside of the idempotency window.
+            for key, transact in list(idempotent_transactions.items()):
+                if transact.status == TransactStatus.FINISHED:
+                    if transact.receipt is None:
+                        del idempotent_transactions[key]
+                        continue
+
+                    if key[0] not in block_numbers:
+                        block_numbers[key[0]] = transact.web3.eth.blockNumber
+                    if block_numbers[key[0]] - transact.receipt.raw_receipt['blockNumber'] > Transact.idempotency_window:
+                        del idempotent_transactions[key]
+
+            if registry_key in idempotent_transactions:
+                return idempotent_transactions[registry_key]
+
+            idempotent_transactions[registry_key] = self
+            return None
+
+    def _report_metrics(self, outcome: str):
+        assert(isinstance(outcome, str))
+
+        sink = Transact.metrics_sink
+        if sink is None:
+            return
+
+        labels = {'origin': self.origin.__class__.__name__ if self.origin is not None else '',
+                  'function': self.function_name or ''}
+
+        try:
+            # reverted transactions cost gas as well, and the one mined may not be the last one sent
+            mined_receipt = self._mined_receipt
+            if mined_receipt is not None:
+                self.metrics.gas_price = self.web3.eth.getTransaction(mined_receipt.transaction_hash)['gasPrice']
+                self.metrics.cost = mined_receipt.raw_receipt['gasUsed'] * self.metrics.gas_price / 10**18
+
+            sink.increment("transact_total", 1, {**labels, 'outcome': outcome})
+            for name, value in [("transact_estimate_gas_seconds", self.metrics.estimate_gas_time),
+                                ("transact_lock_wait_seconds", self.metrics.lock_wait_time),
+                                ("transact_send_seconds", self.metrics.send_time),
+                                ("transact_inclusion_seconds", self.metrics.inclusion_time),
+                                ("transact_replacements", self.metrics.replacements),
+                                ("transact_gas_price", self.metrics.gas_price),
+                                ("transact_gas_used", self.metrics.gas_used),
+                                ("transact_cost_eth", self.metrics.cost)]:
+                if value is not None:
+                    sink.observe(name, value, labels)
+        except Exception as e:
+            self.logger.warning(f"Failed to report metrics of transaction {self.name()} ({e})")
+
+    def _deadline_passed(self, deadline_block: Optional[int], deadline_timestamp: Optional[int]) -> bool:
+        if deadline_timestamp is not None and time.time() >= deadline_timestamp:
+            return True
+
+        if deadline_block is not None:
+            # Blocks followed by a `Lifecycle` end up in the header cache, otherwise the node gets asked,
+            # but not more often than once a second.
+            from pymaker.blocks import block_cache
+            latest_number = block_cache(self.web3).latest_number
+            if latest_number is not None and latest_number >= deadline_block:
+                return True
+
+            if self._block_number_checked is None or time.monotonic() - self._block_number_checked >= 1.0:
+                self._block_number_checked = time.monotonic()
+                if self.web3.eth.blockNumber >= deadline_block:
+                    return True
+
+        return False
+
+    def _cancel(self, from_account: str, gas_price_last: Optional[int]) -> bool:
+        # Both Parity and Geth require the replacement to pay a higher gas price, so we pay the minimum.
+        gas_price = int((gas_price_last if gas_price_last is not None else self.web3.eth.gasPrice) * 1.125) + 1
+
+        try:
+            with transaction_lock:
+                tx_hash = self.web3.eth.sendTransaction({'from': from_account,
+                                                         'to': from_account,
+                                                         'value': 0,
+                                                         'gas': 21000,
+                                                         'gasPrice': gas_price,
+                                                         'nonce': self.nonce})
+
+            self.logger.info(f"Cancelling transaction {self.name()} with nonce={self.nonce}, gas_price={gas_price}"
+                             f" as its deadline has passed (tx_hash={bytes_to_hexstring(tx_hash)})")
+            return True
+        except Exception as e:
+            self.logger.warning(f"Failed to cancel transaction {self.name()} with nonce={self.nonce},"
+                                f" gas_price={gas_price} ({e})")
+            return False
+
+    def _send(self, from_account: str, gas: int, gas_price: Optional[int], tx_hashes: list):
+        # We need the lock in order to not try to send two transactions with the same nonce.
+        lock_start = time.perf_counter()
+        with transaction_lock:
+            self.metrics.lock_wait_time += time.perf_counter() - lock_start
+
+            if self.nonce is None:
+                if self._is_parity():
+                    self.nonce = int(self.web3.manager.request_blocking("parity_nextNonce", [from_account]), 16)
+
+                else:
+                    self.nonce = self.web3.eth.getTransactionCount(from_account, block_identifier='pending')
+
+            send_start = time.perf_counter()
+            tx_hash = self._func(from_account, gas, gas_price, self.nonce)
+            tx_hashes.append(tx_hash)
+            self.metrics.send_time += time.perf_counter() - send_start
+
+        return tx_hash
+
     def _as_dict(self, dict_or_none) -> dict:
         if dict_or_none is None:
             return {}
@@ -429,12 +836,8 @@ class Transact:
                               **self._as_dict(self.extra)}
 
         if self.contract is not None:
-            if self.function_name is None:
-                return self.web3.eth.sendTransaction({**transaction_params, **{'to': self.address.address,
-                                                                               'data': self.parameters[0]}})
-
-            else:
-                return self._contract_function().transact(transaction_params)
+            return self.web3.eth.sendTransaction({**transaction_params, **{'to': self.address.address,
+                                                                           'data': self._calldata()}})
 
         else:
             return self.web3.eth.sendTransaction({**transaction_params, **{'to': self.address.address}})
@@ -448,6 +851,24 @@ class Transact:
 
         return function_factory(*self.parameters)
 
+    def _calldata(self) -> str:
+        # Calldata is encoded once and then reused for gas estimation, sending and replacing the transaction.
+        # Functions taking static arguments only are encoded by `pymaker.codec`, bypassing `web3.py`.
+        if self._encoded_calldata is None:
+            if self.function_name is None:
+                self._encoded_calldata = self.parameters[0]
+
+            else:
+                encoder = function_encoder(self.abi if self.abi is not None else self.contract.abi, self.function_name)
+                calldata = encoder.encode(self.parameters) if encoder is not None else None
+
+                if calldata is not None:
+                    self._encoded_calldata = bytes_to_hexstring(calldata)
+                else:
+                    self._encoded_calldata = self._contract_function()._encode_transaction_data()
+
+        return self._encoded_calldata
+
     def name(self) -> str:
         """Returns the nicely formatted name of this pending Ethereum transaction.
 
@@ -482,14 +903,9 @@ class Transact:
         assert(isinstance(from_address, Address))
 
         if self.contract is not None:
-            if self.function_name is None:
-                return self.web3.eth.estimateGas({**self._as_dict(self.extra), **{'from': from_address.address,
+            estimate = self.web3.eth.estimateGas({**self._as_dict(self.extra), **{'from': from_address.address,
                                                                                   'to': self.address.address,
-                                                                                  'data': self.parameters[0]}})
-
-            else:
-                estimate = self._contract_function() \
-                        .estimateGas({**self._as_dict(self.extra), **{'from': from_address.address}})
+                                                                                  'data': self._calldata()}})
 
         else:
             estimate = 21000
@@ -506,7 +922,8 @@ class Transact:
 
         Out-of-gas exceptions are automatically recognized as transaction failures.
 
-        Allowed keyword arguments are: `from_address`, `replace`, `gas`, `gas_buffer`, `gas_price`.
+        Allowed keyword arguments are: `from_address`, `replace`, `gas`, `gas_buffer`, `gas_price`,
+        `idempotency_key`, `deadline_block`, `deadline_timestamp`.
         `gas_price` needs to be an instance of a class inheriting from :py:class:`pymaker.gas.GasPrice`.
         `from_address` needs to be an instance of :py:class:`pymaker.Address`.
 
@@ -514,6 +931,19 @@ class Transact:
         specifies how much gas should be added to the estimate. They can not be present
         at the same time. If none of them are present, a default buffer is added to the estimate.
 
+        The `idempotency_key` keyword argument can be any hashable value identifying the action,
+        for example `("bite", ilk.name, urn.address)` or `("deal", flipper.address, id)`. While
+        a transaction with the same key, sent from the same account through the same `Web3` instance,
+        is in progress or has been mined successfully within the last `Transact.idempotency_window`
+        blocks, no new transaction gets sent. Instead, the result of that earlier transaction is returned.
+
+        The `deadline_block` and `deadline_timestamp` keyword arguments make the transaction worthless
+        once the block with that number has been mined, or once that unix timestamp has been reached,
+        respectively. This is useful i.e. for auction bids, which can not succeed after `tic` or `end`.
+        After the deadline the gas price is no longer being increased and the pending transaction gets
+        replaced with a zero-value transfer to ourselves, sent at the lowest gas price which will still
+        be accepted as a replacement. If nothing has been sent by the deadline, nothing will be.
+
         Returns:
             A :py:class:`pymaker.Receipt` object if the transaction invocation was successful.
             `None` otherwise.
@@ -530,22 +960,69 @@ class Transact:
 
         Out-of-gas exceptions are automatically recognized as transaction failures.
 
-        Allowed keyword arguments are: `from_address`, `replace`, `gas`, `gas_buffer`, `gas_price`.
+        Allowed keyword arguments are: `from_address`, `replace`, `gas`, `gas_buffer`, `gas_price`,
+        `idempotency_key`.
         `gas_price` needs to be an instance of a class inheriting from :py:class:`pymaker.gas.GasPrice`.
 
         The `gas` keyword argument is the gas limit for the transaction, whereas `gas_buffer`
         specifies how much gas should be added to the estimate. They can not be present
         at the same time. If none of them are present, a default buffer is added to the estimate.
 
+        If `idempotency_key` is present and a transaction with the same key, sent from the same account
+        through the same `Web3` instance, is either in progress or has been mined in the last
+        `Transact.idempotency_window` blocks, this transaction does not get sent and its future value
+        will be the result of that earlier transaction.
+
+        `deadline_block` and `deadline_timestamp` put an upper bound on the block number or unix timestamp
+        up until which the transaction is still of use. Once it passes, a pending transaction gets cancelled
+        by replacing it with a zero-value transfer to ourselves. Please see `transact` for details.
+
         Returns:
             A future value of either a :py:class:`pymaker.Receipt` object if the transaction
             invocation was successful, or `None` if it failed.
         """
 
-        unknown_kwargs = set(kwargs.keys()) - {'from_address', 'replace', 'gas', 'gas_buffer', 'gas_price'}
+        unknown_kwargs = set(kwargs.keys()) - {'from_address', 'replace', 'gas', 'gas_buffer', 'gas_price',
+                                               'idempotency_key', 'deadline_block', 'deadline_timestamp'}
         if len(unknown_kwargs) > 0:
             raise Exception(f"Unknown kwargs: {unknown_kwargs}")
 
+        # If an equivalent transaction is already in progress or has been mined recently, we do not send
+        # another one (it would most likely revert anyway). We wait for the earlier one and return its result.
+        if 'idempotency_key' in kwargs:
+            from_account = kwargs['from_address'].address if ('from_address' in kwargs) else self.web3.eth.defaultAccount
+            original_tx = await _in_executor(self._claim_idempotency_key, from_account, kwargs['idempotency_key'])
+            if original_tx is not None:
+                self.logger.info(f"Transaction {self.name()} not sent, attaching to {original_tx.name()}"
+                                 f" (idempotency_key={kwargs['idempotency_key']})")
+                while original_tx.status != TransactStatus.FINISHED:
+                    await asyncio.sleep(0.25)
+
+                return original_tx.receipt
+
+        # A transaction decided upon while processing a block which has become stale is not sent.
+        _check_block_context()
+
+        try:
+            receipt = await self._transact_async(**kwargs)
+        except:
+            self._report_metrics("error")
+            raise
+
+        if receipt is not None:
+            self._report_metrics("successful")
+        elif self.metrics.cancelled:
+            self._report_metrics("cancelled")
+        elif self.replaced:
+            self._report_metrics("replaced")
+        elif self.nonce is None:
+            self._report_metrics("not_sent")
+        else:
+            self._report_metrics("failed")
+
+        return receipt
+
+    async def _transact_async(self, **kwargs) -> Optional[Receipt]:
         # Get the from account.
         from_account = kwargs['from_address'].address if ('from_address' in kwargs) else self.web3.eth.defaultAccount
 
@@ -554,8 +1031,9 @@ class Transact:
         # do not increment the nonce. If the estimation is successful, we pass the calculated
         # gas value (plus some `gas_buffer`) to the subsequent `transact` calls so it does not
         # try to estimate it again.
+        estimate_start = time.perf_counter()
         try:
-            gas_estimate = self.estimated_gas(Address(from_account))
+            gas_estimate = await _in_executor(self.estimated_gas, Address(from_account))
         except:
             if Transact.gas_estimate_for_bad_txs:
                 self.logger.warning(f"Transaction {self.name()} will fail, submitting anyway")
@@ -563,6 +1041,8 @@ class Transact:
             else:
                 self.logger.warning(f"Transaction {self.name()} will fail, refusing to send ({sys.exc_info()[1]})")
                 return None
+        finally:
+            self.metrics.estimate_gas_time = time.perf_counter() - estimate_start
 
         # Get or calculate `gas`. Get `gas_price`, which in fact refers to a gas pricing algorithm.
         gas = self._gas(gas_estimate, **kwargs)
@@ -579,15 +1059,23 @@ class Transact:
             replaced_tx.replaced = True
             self.nonce = replaced_tx.nonce
 
+        # Get the deadline after which the transaction is of no use anymore, if any.
+        deadline_block = kwargs['deadline_block'] if ('deadline_block' in kwargs) else None
+        deadline_timestamp = kwargs['deadline_timestamp'] if ('deadline_timestamp' in kwargs) else None
+        assert(isinstance(deadline_block, int) or (deadline_block is None))
+        assert(isinstance(deadline_timestamp, int) or (deadline_timestamp is None))
+
         # Initialize variables which will be used in the main loop.
         tx_hashes = []
         initial_time = time.time()
         gas_price_last = 0
+        first_sent_time = None
+        deadline_passed = False
 
         while True:
             seconds_elapsed = int(time.time() - initial_time)
 
-            if self.nonce is not None and self.web3.eth.getTransactionCount(from_account) > self.nonce:
+            if self.nonce is not None and await _in_executor(self.web3.eth.getTransactionCount, from_account) > self.nonce:
                 # Check if any transaction sent so far has been mined (has a receipt).
                 # If it has, we return either the receipt (if if was successful) or `None`.
                 for attempt in range(1, 11):
@@ -596,27 +1084,51 @@ class Transact:
                         return None
 
                     for tx_hash in tx_hashes:
-                        receipt = self._get_receipt(tx_hash)
+                        receipt = await _in_executor(self._get_receipt, tx_hash)
                         if receipt:
+                            self.metrics.inclusion_time = time.perf_counter() - first_sent_time
+                            self.metrics.gas_used = receipt.gas_used
+                            self._mined_receipt = receipt
                             if receipt.successful:
                                 self.logger.info(f"Transaction {self.name()} was successful (tx_hash={bytes_to_hexstring(tx_hash)})")
+                                self.receipt = receipt
                                 return receipt
                             else:
                                 self.logger.warning(f"Transaction {self.name()} mined successfully but generated no single"
                                                     f" log entry, assuming it has failed (tx_hash={bytes_to_hexstring(tx_hash)})")
                                 return None
 
-                    self.logger.debug(f"No receipt found in attempt #{attempt}/10 (nonce={self.nonce},"
-                                      f" getTransactionCount={self.web3.eth.getTransactionCount(from_account)})")
+                    self.logger.debug(f"No receipt found in attempt #{attempt}/10 (nonce={self.nonce})")
 
                     await asyncio.sleep(0.5)
 
                 # If we can not find a mined receipt but at the same time we know last used nonce
                 # has increased, then it means that the transaction we tried to send failed.
-                self.logger.warning(f"Transaction {self.name()} has been overridden by another transaction"
-                                    f" with the same nonce, which means it has failed")
+                if self.metrics.cancelled:
+                    self.logger.info(f"Transaction {self.name()} has been cancelled as its deadline has passed")
+                else:
+                    self.logger.warning(f"Transaction {self.name()} has been overridden by another transaction"
+                                        f" with the same nonce, which means it has failed")
                 return None
 
+            # If the deadline has passed, there is no point in bumping the gas price anymore. If nothing
+            # has been sent yet we just give up. Otherwise we cancel the pending transaction, so it
+            # does not waste gas and the nonce gets freed as quickly as possible.
+            if not deadline_passed and await _in_executor(self._deadline_passed, deadline_block, deadline_timestamp):
+                if len(tx_hashes) == 0:
+                    self.logger.warning(f"Transaction {self.name()} not sent as its deadline has passed")
+                    return None
+
+                deadline_passed = True
+
+            # A failed cancellation gets retried until either it succeeds or a transaction gets mined.
+            if deadline_passed:
+                if not self.metrics.cancelled:
+                    self.metrics.cancelled = await _in_executor(self._cancel, from_account, gas_price_last)
+
+                await asyncio.sleep(0.25)
+                continue
+
             # Send a transaction if:
             # - no transaction has been sent yet, or
             # - the requested gas price has changed enough since the last transaction has been sent
@@ -626,17 +1138,12 @@ class Transact:
                 gas_price_last = gas_price_value
 
                 try:
-                    # We need the lock in order to not try to send two transactions with the same nonce.
-                    with transaction_lock:
-                        if self.nonce is None:
-                            if self._is_parity():
-                                self.nonce = int(self.web3.manager.request_blocking("parity_nextNonce", [from_account]), 16)
-
-                            else:
-                                self.nonce = self.web3.eth.getTransactionCount(from_account, block_identifier='pending')
+                    tx_hash = await _in_executor(self._send, from_account, gas, gas_price_value, tx_hashes)
 
-                        tx_hash = self._func(from_account, gas, gas_price_value, self.nonce)
-                        tx_hashes.append(tx_hash)
+                    if first_sent_time is None:
+                        first_sent_time = time.perf_counter()
+                    self.metrics.replacements = len(tx_hashes) - 1
+                    self.metrics.gas_price = gas_price_value
 
                     self.logger.info(f"Sent transaction {self.name()} with nonce={self.nonce}, gas={gas},"
                                      f" gas_price={gas_price_value if gas_price_value is not None else 'default'}"
@@ -662,7 +1169,7 @@ class Transact:
         Returns:
             :py:class:`pymaker.Invocation` object for this pending Ethereum transaction.
         """
-        return Invocation(self.address, Calldata(self._contract_function()._encode_transaction_data()))
+        return Invocation(self.address, Calldata(self._calldata()))
 
 
 class Transfer:
@@ -64,6 +64,14 @@ def via_tx_manager(tx_manager: TxManager, **kwargs):
     return approval_function
 
 
+# Defined once, so the contract factory created for it by `Contract._get_contract` can be reused.
+move_abi = [{'constant': False, 'inputs': [{'name': 'guy', 'type': 'address'}], 'name': 'hope', 'outputs': [],
+             'payable': False, 'stateMutability': 'nonpayable', 'type': 'function'},
+            {'constant': True, 'inputs': [{'name': '', 'type': 'address'}, {'name': '', 'type': 'address'}],
+             'name': 'can', 'outputs': [{'name': '', 'type': 'bool'}], 'payable': False, 'stateMutability': 'view',
+             'type': 'function'}]
+
+
 def hope_directly(**kwargs):
     """Approval function: Approves the caller to access tokens directly.
 
@@ -71,12 +79,6 @@ def hope_directly(**kwargs):
     of `Flipper` and `Flopper` and possibly others in the future.
     """
 
-    move_abi = [{'constant': False, 'inputs': [{'name': 'guy', 'type': 'address'}], 'name': 'hope', 'outputs': [],
-                 'payable': False, 'stateMutability': 'nonpayable', 'type': 'function'},
-                {'constant': True, 'inputs': [{'name': '', 'type': 'address'}, {'name': '', 'type': 'address'}],
-                 'name': 'can', 'outputs': [{'name': '', 'type': 'bool'}], 'payable': False, 'stateMutability': 'view',
-                 'type': 'function'}]
-
     def approval_function(token: ERC20Token, spender_address: Address, spender_name: str):
         address_to_check = kwargs['from_address'] if 'from_address' in kwargs else Address(
             token.web3.eth.defaultAccount)
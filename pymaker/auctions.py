@@ -15,19 +15,20 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from concurrent.futures import Executor
 from datetime import datetime
+from functools import partial
 from pprint import pformat
-from typing import List
+from typing import List, Optional
 from web3 import Web3
 
 from web3._utils.events import get_event_data
 
-from eth_abi.codec import ABICodec
-from eth_abi.registry import registry as default_registry
-
-from pymaker import Contract, Address, Transact
-from pymaker.logging import LogNote
+from pymaker import Contract, Address, Transact, ZERO_ADDRESS
+from pymaker.events import AmountColumn, BytesColumn, CategoryColumn, EventRecord, IntColumn, decode_logs
+from pymaker.logging import LogNote, codec
 from pymaker.numeric import Wad, Rad, Ray
+from pymaker.subscriptions import LogSubscription, LogSubscriptions
 from pymaker.token import ERC20Token
 
 
@@ -36,19 +37,30 @@ def toBytes(string: str):
     return string.encode('utf-8').ljust(32, bytes(1))
 
 
+def _parse_auction_event(kick_topic: str, kick_abi: dict, kick_log_class, event: dict):
+    if Web3.toHex(event['topics'][0]) == kick_topic:
+        return kick_log_class(get_event_data(codec, kick_abi, event))
+    else:
+        return LogNote.from_log(event)
+
+
 class AuctionContract(Contract):
     """Abstract baseclass shared across all three auction contracts."""
 
-    class DealLog:
+    class DealLog(EventRecord):
+        __slots__ = ('usr', 'id')
+
+        _columns = {'usr': CategoryColumn,
+                    'id': IntColumn,
+                    'block': IntColumn,
+                    '_tx_hash': BytesColumn}
+
         def __init__(self, lognote: LogNote):
             # This is whoever called `deal`, which could differ from the `guy` who won the auction
             self.usr = Address(lognote.usr)
-            self.id = Web3.toInt(lognote.arg1)
+            self.id = int.from_bytes(lognote.arg1, 'big')
             self.block = lognote.block
-            self.tx_hash = lognote.tx_hash
-
-        def __repr__(self):
-            return f"AuctionContract.DealLog({pformat(vars(self))})"
+            self._tx_hash = lognote._tx_hash
 
     def __init__(self, web3: Web3, address: Address, abi: list, bids: callable):
         if self.__class__ == AuctionContract:
@@ -105,7 +117,7 @@ class AuctionContract(Contract):
         auction_count = self.kicks()+1
         for index in range(1, auction_count):
             bid = self._bids(index)
-            if bid.guy != Address("0x0000000000000000000000000000000000000000"):
+            if bid.guy != ZERO_ADDRESS:
                 now = datetime.now().timestamp()
                 if (bid.tic == 0 or now < bid.tic) and now < bid.end:
                     active_auctions.append(bid)
@@ -149,7 +161,8 @@ class AuctionContract(Contract):
 
         return Transact(self, self.web3, self.abi, self.address, self._contract, 'deal', [id])
 
-    def get_past_lognotes(self, number_of_past_blocks: int, abi: list) -> List[LogNote]:
+    def get_past_lognotes(self, number_of_past_blocks: int, abi: list,
+                          executor: Optional[Executor] = None) -> List[LogNote]:
         assert isinstance(number_of_past_blocks, int)
         assert isinstance(abi, list)
 
@@ -161,10 +174,24 @@ class AuctionContract(Contract):
         }
 
         logs = self.web3.eth.getLogs(filter_params)
-        events = list(map(lambda l: self.parse_event(l), logs))
-        return list(filter(lambda l: l is not None, events))
+        return decode_logs(self._event_decoder(), logs, executor)
 
     def parse_event(self, event):
+        return self._event_decoder()(event)
+
+    def on_log(self, subscriptions: LogSubscriptions, handler) -> LogSubscription:
+        """Subscribe to new auction logs.
+
+        Args:
+            subscriptions: Subscriptions to register with, i.e. `Lifecycle.subscriptions`.
+            handler: Function which will be called with each new log, either as the `KickLog` of the auction
+                contract or as :py:class:`pymaker.logging.LogNote` for all other auction actions.
+        """
+        assert isinstance(subscriptions, LogSubscriptions)
+
+        return subscriptions.subscribe(self.address, None, self._event_decoder(), handler)
+
+    def _event_decoder(self):
         raise NotImplemented()
 
 
@@ -217,7 +244,18 @@ class Flipper(AuctionContract):
         def __repr__(self):
             return f"Flipper.Bid({pformat(vars(self))})"
 
-    class KickLog:
+    class KickLog(EventRecord):
+        __slots__ = ('id', 'lot', 'bid', 'tab', 'usr', 'gal')
+
+        _columns = {'id': IntColumn,
+                    'lot': partial(AmountColumn, Wad),
+                    'bid': partial(AmountColumn, Rad),
+                    'tab': partial(AmountColumn, Rad),
+                    'usr': CategoryColumn,
+                    'gal': CategoryColumn,
+                    'block': IntColumn,
+                    '_tx_hash': BytesColumn}
+
         def __init__(self, log):
             args = log['args']
             self.id = args['id']
@@ -227,50 +265,60 @@ class Flipper(AuctionContract):
             self.usr = Address(args['usr'])
             self.gal = Address(args['gal'])
             self.block = log['blockNumber']
-            self.tx_hash = log['transactionHash'].hex()
+            self._tx_hash = bytes(log['transactionHash'])
 
-        def __repr__(self):
-            return f"Flipper.KickLog({pformat(vars(self))})"
+    class TendLog(EventRecord):
+        __slots__ = ('guy', 'id', 'lot', 'bid')
+
+        _columns = {'guy': CategoryColumn,
+                    'id': IntColumn,
+                    'lot': partial(AmountColumn, Wad),
+                    'bid': partial(AmountColumn, Rad),
+                    'block': IntColumn,
+                    '_tx_hash': BytesColumn}
 
-    class TendLog:
         def __init__(self, lognote: LogNote):
             self.guy = Address(lognote.usr)
-            self.id = Web3.toInt(lognote.arg1)
-            self.lot = Wad(Web3.toInt(lognote.arg2))
-            self.bid = Rad(Web3.toInt(lognote.get_bytes_at_index(2)))
+            self.id = int.from_bytes(lognote.arg1, 'big')
+            self.lot = Wad(int.from_bytes(lognote.arg2, 'big'))
+            self.bid = Rad(lognote.get_int_at_index(2))
             self.block = lognote.block
-            self.tx_hash = lognote.tx_hash
+            self._tx_hash = lognote._tx_hash
 
-        def __repr__(self):
-            return f"Flipper.TendLog({pformat(vars(self))})"
+    class DentLog(EventRecord):
+        __slots__ = ('guy', 'id', 'lot', 'bid')
+
+        _columns = {'guy': CategoryColumn,
+                    'id': IntColumn,
+                    'lot': partial(AmountColumn, Wad),
+                    'bid': partial(AmountColumn, Rad),
+                    'block': IntColumn,
+                    '_tx_hash': BytesColumn}
 
-    class DentLog:
         def __init__(self, lognote: LogNote):
             self.guy = Address(lognote.usr)
-            self.id = Web3.toInt(lognote.arg1)
-            self.lot = Wad(Web3.toInt(lognote.arg2))
-            self.bid = Rad(Web3.toInt(lognote.get_bytes_at_index(2)))
+            self.id = int.from_bytes(lognote.arg1, 'big')
+            self.lot = Wad(int.from_bytes(lognote.arg2, 'big'))
+            self.bid = Rad(lognote.get_int_at_index(2))
             self.block = lognote.block
-            self.tx_hash = lognote.tx_hash
-
-        def __repr__(self):
-            return f"Flipper.DentLog({pformat(vars(self))})"
+            self._tx_hash = lognote._tx_hash
 
     def __init__(self, web3: Web3, address: Address):
         super(Flipper, self).__init__(web3, address, Flipper.abi, self.bids)
 
-    def bids(self, id: int) -> Bid:
+    def bids(self, id: int, block_identifier='latest') -> Bid:
         """Returns the auction details.
 
         Args:
             id: Auction identifier.
+            block_identifier: Block at which to read the details, `latest` by default.
 
         Returns:
             The auction details.
         """
         assert(isinstance(id, int))
 
-        array = self._contract.functions.bids(id).call()
+        array = self._call('bids', [id], block_identifier)
 
         return Flipper.Bid(id=id,
                            bid=Rad(array[0]),
@@ -309,9 +357,9 @@ class Flipper(AuctionContract):
 
         return Transact(self, self.web3, self.abi, self.address, self._contract, 'dent', [id, lot.value, bid.value])
 
-    def past_logs(self, number_of_past_blocks: int):
+    def past_logs(self, number_of_past_blocks: int, executor: Optional[Executor] = None):
         assert isinstance(number_of_past_blocks, int)
-        logs = super().get_past_lognotes(number_of_past_blocks, Flipper.abi)
+        logs = super().get_past_lognotes(number_of_past_blocks, Flipper.abi, executor)
 
         history = []
         for log in logs:
@@ -327,15 +375,8 @@ class Flipper(AuctionContract):
                 history.append(AuctionContract.DealLog(log))
         return history
 
-    def parse_event(self, event):
-        signature = Web3.toHex(event['topics'][0])
-        codec = ABICodec(default_registry)
-        if signature == "0xc84ce3a1172f0dec3173f04caaa6005151a4bfe40d4c9f3ea28dba5f719b2a7a":
-            event_data = get_event_data(codec, self.kick_abi, event)
-            return Flipper.KickLog(event_data)
-        else:
-            event_data = get_event_data(codec, self.log_note_abi, event)
-            return LogNote(event_data)
+    def _event_decoder(self):
+        return partial(_parse_auction_event, "0xc84ce3a1172f0dec3173f04caaa6005151a4bfe40d4c9f3ea28dba5f719b2a7a", self.kick_abi, Flipper.KickLog)
 
     def __repr__(self):
         return f"Flipper('{self.address}')"
@@ -382,29 +423,40 @@ class Flapper(AuctionContract):
         def __repr__(self):
             return f"Flapper.Bid({pformat(vars(self))})"
 
-    class KickLog:
+    class KickLog(EventRecord):
+        __slots__ = ('id', 'lot', 'bid')
+
+        _columns = {'id': IntColumn,
+                    'lot': partial(AmountColumn, Rad),
+                    'bid': partial(AmountColumn, Wad),
+                    'block': IntColumn,
+                    '_tx_hash': BytesColumn}
+
         def __init__(self, log):
             args = log['args']
             self.id = args['id']
             self.lot = Rad(args['lot'])
             self.bid = Wad(args['bid'])
             self.block = log['blockNumber']
-            self.tx_hash = log['transactionHash'].hex()
+            self._tx_hash = bytes(log['transactionHash'])
 
-        def __repr__(self):
-            return f"Flapper.KickLog({pformat(vars(self))})"
+    class TendLog(EventRecord):
+        __slots__ = ('guy', 'id', 'lot', 'bid')
+
+        _columns = {'guy': CategoryColumn,
+                    'id': IntColumn,
+                    'lot': partial(AmountColumn, Rad),
+                    'bid': partial(AmountColumn, Wad),
+                    'block': IntColumn,
+                    '_tx_hash': BytesColumn}
 
-    class TendLog:
         def __init__(self, lognote: LogNote):
             self.guy = Address(lognote.usr)
-            self.id = Web3.toInt(lognote.arg1)
-            self.lot = Rad(Web3.toInt(lognote.arg2))
-            self.bid = Wad(Web3.toInt(lognote.get_bytes_at_index(2)))
+            self.id = int.from_bytes(lognote.arg1, 'big')
+            self.lot = Rad(int.from_bytes(lognote.arg2, 'big'))
+            self.bid = Wad(lognote.get_int_at_index(2))
             self.block = lognote.block
-            self.tx_hash = lognote.tx_hash
-
-        def __repr__(self):
-            return f"Flapper.TendLog({pformat(vars(self))})"
+            self._tx_hash = lognote._tx_hash
 
     def __init__(self, web3: Web3, address: Address):
         super(Flapper, self).__init__(web3, address, Flapper.abi, self.bids)
@@ -412,18 +464,19 @@ class Flapper(AuctionContract):
     def live(self) -> bool:
         return self._contract.functions.live().call() > 0
 
-    def bids(self, id: int) -> Bid:
+    def bids(self, id: int, block_identifier='latest') -> Bid:
         """Returns the auction details.
 
         Args:
             id: Auction identifier.
+            block_identifier: Block at which to read the details, `latest` by default.
 
         Returns:
             The auction details.
         """
         assert(isinstance(id, int))
 
-        array = self._contract.functions.bids(id).call()
+        array = self._call('bids', [id], block_identifier)
 
         return Flapper.Bid(id=id,
                            bid=Wad(array[0]),
@@ -458,9 +511,9 @@ class Flapper(AuctionContract):
 
         return Transact(self, self.web3, self.abi, self.address, self._contract, 'yank', [id])
 
-    def past_logs(self, number_of_past_blocks: int):
+    def past_logs(self, number_of_past_blocks: int, executor: Optional[Executor] = None):
         assert isinstance(number_of_past_blocks, int)
-        logs = super().get_past_lognotes(number_of_past_blocks, Flapper.abi)
+        logs = super().get_past_lognotes(number_of_past_blocks, Flapper.abi, executor)
 
         history = []
         for log in logs:
@@ -474,15 +527,8 @@ class Flapper(AuctionContract):
                 history.append(AuctionContract.DealLog(log))
         return history
 
-    def parse_event(self, event):
-        signature = Web3.toHex(event['topics'][0])
-        codec = ABICodec(default_registry)
-        if signature == "0xe6dde59cbc017becba89714a037778d234a84ce7f0a137487142a007e580d609":
-            event_data = get_event_data(codec, self.kick_abi, event)
-            return Flapper.KickLog(event_data)
-        else:
-            event_data = get_event_data(codec, self.log_note_abi, event)
-            return LogNote(event_data)
+    def _event_decoder(self):
+        return partial(_parse_auction_event, "0xe6dde59cbc017becba89714a037778d234a84ce7f0a137487142a007e580d609", self.kick_abi, Flapper.KickLog)
 
     def __repr__(self):
         return f"Flapper('{self.address}')"
@@ -529,7 +575,16 @@ class Flopper(AuctionContract):
         def __repr__(self):
             return f"Flopper.Bid({pformat(vars(self))})"
 
-    class KickLog:
+    class KickLog(EventRecord):
+        __slots__ = ('id', 'lot', 'bid', 'gal')
+
+        _columns = {'id': IntColumn,
+                    'lot': partial(AmountColumn, Wad),
+                    'bid': partial(AmountColumn, Rad),
+                    'gal': CategoryColumn,
+                    'block': IntColumn,
+                    '_tx_hash': BytesColumn}
+
         def __init__(self, log):
             args = log['args']
             self.id = args['id']
@@ -537,22 +592,25 @@ class Flopper(AuctionContract):
             self.bid = Rad(args['bid'])
             self.gal = Address(args['gal'])
             self.block = log['blockNumber']
-            self.tx_hash = log['transactionHash'].hex()
+            self._tx_hash = bytes(log['transactionHash'])
 
-        def __repr__(self):
-            return f"Flopper.KickLog({pformat(vars(self))})"
+    class DentLog(EventRecord):
+        __slots__ = ('guy', 'id', 'lot', 'bid')
+
+        _columns = {'guy': CategoryColumn,
+                    'id': IntColumn,
+                    'lot': partial(AmountColumn, Wad),
+                    'bid': partial(AmountColumn, Rad),
+                    'block': IntColumn,
+                    '_tx_hash': BytesColumn}
 
-    class DentLog:
         def __init__(self, lognote: LogNote):
             self.guy = Address(lognote.usr)
-            self.id = Web3.toInt(lognote.arg1)
-            self.lot = Wad(Web3.toInt(lognote.arg2))
-            self.bid = Rad(Web3.toInt(lognote.get_bytes_at_index(2)))
+            self.id = int.from_bytes(lognote.arg1, 'big')
+            self.lot = Wad(int.from_bytes(lognote.arg2, 'big'))
+            self.bid = Rad(lognote.get_int_at_index(2))
             self.block = lognote.block
-            self.tx_hash = lognote.tx_hash
-
-        def __repr__(self):
-            return f"Flopper.DentLog({pformat(vars(self))})"
+            self._tx_hash = lognote._tx_hash
 
     def __init__(self, web3: Web3, address: Address):
         assert isinstance(web3, Web3)
@@ -568,18 +626,19 @@ class Flopper(AuctionContract):
 
         return Wad(self._contract.functions.pad().call())
 
-    def bids(self, id: int) -> Bid:
+    def bids(self, id: int, block_identifier='latest') -> Bid:
         """Returns the auction details.
 
         Args:
             id: Auction identifier.
+            block_identifier: Block at which to read the details, `latest` by default.
 
         Returns:
             The auction details.
         """
         assert(isinstance(id, int))
 
-        array = self._contract.functions.bids(id).call()
+        array = self._call('bids', [id], block_identifier)
 
         return Flopper.Bid(id=id,
                            bid=Rad(array[0]),
@@ -616,9 +675,9 @@ class Flopper(AuctionContract):
 
         return Transact(self, self.web3, self.abi, self.address, self._contract, 'yank', [id])
 
-    def past_logs(self, number_of_past_blocks: int):
+    def past_logs(self, number_of_past_blocks: int, executor: Optional[Executor] = None):
         assert isinstance(number_of_past_blocks, int)
-        logs = super().get_past_lognotes(number_of_past_blocks, Flopper.abi)
+        logs = super().get_past_lognotes(number_of_past_blocks, Flopper.abi, executor)
 
         history = []
         for log in logs:
@@ -632,15 +691,8 @@ class Flopper(AuctionContract):
                 history.append(AuctionContract.DealLog(log))
         return history
 
-    def parse_event(self, event):
-        signature = Web3.toHex(event['topics'][0])
-        codec = ABICodec(default_registry)
-        if signature == "0x7e8881001566f9f89aedb9c5dc3d856a2b81e5235a8196413ed484be91cc0df6":
-            event_data = get_event_data(codec, self.kick_abi, event)
-            return Flopper.KickLog(event_data)
-        else:
-            event_data = get_event_data(codec, self.log_note_abi, event)
-            return LogNote(event_data)
+    def _event_decoder(self):
+        return partial(_parse_auction_event, "0x7e8881001566f9f89aedb9c5dc3d856a2b81e5235a8196413ed484be91cc0df6", self.kick_abi, Flopper.KickLog)
 
     def __repr__(self):
         return f"Flopper('{self.address}')"
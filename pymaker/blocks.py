@@ -0,0 +1,700 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 MakerDAO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import logging
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from threading import Event, Lock, local
+from typing import List, Optional, Union
+
+from eth_utils import keccak
+from hexbytes import HexBytes
+from web3 import Web3
+
+from pymaker import Address
+
+
+class BlockHeader:
+    """The subset of a block header keepers usually need.
+
+    Attributes:
+        number: Block number.
+        hash: Block hash, as 32 raw bytes.
+        parent_hash: Hash of the parent block, as 32 raw bytes.
+        timestamp: Block timestamp, in seconds since the epoch.
+        logs_bloom: The 256-byte bloom filter of addresses and topics of all logs emitted in the block.
+    """
+    __slots__ = ('number', 'hash', 'parent_hash', 'timestamp', 'logs_bloom')
+
+    def __init__(self, number: int, hash: bytes, parent_hash: bytes, timestamp: int, logs_bloom: bytes):
+        assert isinstance(number, int)
+        assert isinstance(hash, bytes)
+        assert isinstance(parent_hash, bytes)
+        assert isinstance(timestamp, int)
+        assert isinstance(logs_bloom, bytes)
+
+        self.number = number
+        self.hash = hash
+        self.parent_hash = parent_hash
+        self.timestamp = timestamp
+        self.logs_bloom = logs_bloom
+
+    @classmethod
+    def from_block(cls, block: dict) -> 'BlockHeader':
+        """Creates a header from a block, as returned by `web3.eth.getBlock`."""
+        return cls(number=block['number'],
+                   hash=bytes(block['hash']),
+                   parent_hash=bytes(block['parentHash']),
+                   timestamp=block['timestamp'],
+                   logs_bloom=bytes(block['logsBloom']))
+
+    @classmethod
+    def from_rpc(cls, header: dict) -> 'BlockHeader':
+        """Creates a header from a raw JSON-RPC response, i.e. a `newHeads` subscription notification."""
+        return cls(number=int(header['number'], 16),
+                   hash=bytes(HexBytes(header['hash'])),
+                   parent_hash=bytes(HexBytes(header['parentHash'])),
+                   timestamp=int(header['timestamp'], 16),
+                   logs_bloom=bytes(HexBytes(header['logsBloom'])))
+
+    def __eq__(self, other):
+        assert isinstance(other, BlockHeader)
+        return self.hash == other.hash
+
+    def __hash__(self):
+        return hash(self.hash)
+
+    def __repr__(self):
+        return f"BlockHeader({self.number}, '0x{self.hash.hex()}')"
+
+
+class BlockHeaderCache:
+    """Thread-safe LRU cache of block headers, looked up by block number or block hash.
+
+    A header received for a number which is already cached, but with a different hash, replaces
+    the cached one. This is what happens on chain reorganizations, so as long as new headers
+    get fed into the cache as they arrive (which :py:class:`pymaker.lifecycle.Lifecycle` does),
+    lookups by number return headers of the canonical chain. Headers fetched by hash may belong
+    to orphaned blocks, so they can only be looked up by hash afterwards.
+
+    Usually there is no need to create instances of this class, the cache shared by all
+    users of a `Web3` instance is returned by :py:func:`pymaker.blocks.block_cache`.
+
+    Args:
+        web3: An instance of `Web` from `web3.py`, used to fetch headers missing from the cache.
+        max_size: Maximum number of headers to keep.
+
+    Attributes:
+        latest_number: Highest block number a header has been cached for, `None` if none yet.
+    """
+    logger = logging.getLogger()
+
+    def __init__(self, web3: Web3, max_size: int = 4096):
+        assert isinstance(max_size, int) and max_size > 0
+
+        self.web3 = web3
+        self.max_size = max_size
+        self._headers = OrderedDict()
+        self._headers_by_hash = OrderedDict()
+        self._lock = Lock()
+        self.latest_number = None
+
+    def put(self, header: BlockHeader):
+        """Adds a header to the cache, replacing any other header cached for the same block number."""
+        assert isinstance(header, BlockHeader)
+
+        with self._lock:
+            previous = self._headers.pop(header.number, None)
+            if previous is not None and previous.hash != header.hash:
+                self.logger.debug(f"Replacing cached block #{header.number} (0x{previous.hash.hex()})"
+                                  f" with 0x{header.hash.hex()}")
+                self._headers_by_hash.pop(previous.hash, None)
+
+            self._headers[header.number] = header
+            self._put_by_hash(header)
+            if self.latest_number is None or header.number > self.latest_number:
+                self.latest_number = header.number
+
+            while len(self._headers) > self.max_size:
+                self._headers.popitem(last=False)
+
+    def _put_by_hash(self, header: BlockHeader):
+        self._headers_by_hash.pop(header.hash, None)
+        self._headers_by_hash[header.hash] = header
+
+        while len(self._headers_by_hash) > self.max_size:
+            self._headers_by_hash.popitem(last=False)
+
+    def cached(self, block_identifier: Union[int, bytes, str]) -> Optional[BlockHeader]:
+        """Returns a header from the cache, or `None` if it is not cached.
+
+        Args:
+            block_identifier: Block number, or block hash as bytes or a hex string.
+        """
+        with self._lock:
+            if isinstance(block_identifier, int):
+                headers, key = self._headers, block_identifier
+            else:
+                headers, key = self._headers_by_hash, bytes(HexBytes(block_identifier))
+
+            header = headers.get(key)
+            if header is not None:
+                headers.move_to_end(key)
+
+            return header
+
+    def get(self, block_identifier: Union[int, bytes, str]) -> BlockHeader:
+        """Returns a header, fetching it from the node if it is not cached.
+
+        Args:
+            block_identifier: Block number, block hash as bytes or a hex string, or either `latest`
+                or `earliest`. The latter two are always fetched from the node.
+        """
+        assert isinstance(block_identifier, (int, bytes, str))
+        assert block_identifier != 'pending'
+
+        if block_identifier not in ('latest', 'earliest'):
+            header = self.cached(block_identifier)
+            if header is not None:
+                return header
+
+        block = self.web3.eth.getBlock(block_identifier)
+        assert block is not None, f"Block {block_identifier} not found"
+
+        header = BlockHeader.from_block(block)
+        if isinstance(block_identifier, int) or block_identifier in ('latest', 'earliest'):
+            self.put(header)
+        else:
+            # the block may have been orphaned, so it must not replace the canonical one at its number
+            with self._lock:
+                self._put_by_hash(header)
+        return header
+
+    def timestamp(self, block_number: int) -> int:
+        """Returns the timestamp of a block, fetching its header from the node if it is not cached."""
+        assert isinstance(block_number, int)
+
+        return self.get(block_number).timestamp
+
+    def backfill(self, from_block: int, to_block: int, max_workers: int = 8) -> List[BlockHeader]:
+        """Fetches all headers in a block range which are missing from the cache.
+
+        Missing headers are fetched concurrently, so it is much faster to backfill a range
+        than to look its blocks up one by one, i.e. before calling `era()` on a number of
+        past events. Ranges larger than `max_size` will not fit in the cache as a whole.
+
+        Args:
+            from_block: First block of the range.
+            to_block: Last block of the range, inclusive.
+            max_workers: Maximum number of concurrent requests to the node.
+
+        Returns:
+            Headers of all blocks in the range, ordered by block number.
+        """
+        assert isinstance(from_block, int)
+        assert isinstance(to_block, int)
+        assert from_block <= to_block
+        assert isinstance(max_workers, int) and max_workers > 0
+
+        headers = {number: self.cached(number) for number in range(from_block, to_block + 1)}
+        missing = [number for number, header in headers.items() if header is None]
+
+        if len(missing) > 0:
+            self.logger.debug(f"Backfilling {len(missing)} block header(s) between #{from_block} and #{to_block}")
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(missing))) as executor:
+                for number, block in zip(missing, executor.map(self.web3.eth.getBlock, missing)):
+                    headers[number] = BlockHeader.from_block(block)
+                    self.put(headers[number])
+
+        return [headers[number] for number in range(from_block, to_block + 1)]
+
+    def __len__(self):
+        return len(self._headers)
+
+    def __repr__(self):
+        return f"BlockHeaderCache({len(self)}/{self.max_size} headers)"
+
+
+_caches = weakref.WeakKeyDictionary()
+_caches_lock = Lock()
+
+
+def block_cache(web3: Web3) -> BlockHeaderCache:
+    """Returns the block header cache shared by all users of a `Web3` instance.
+
+    Args:
+        web3: An instance of `Web` from `web3.py`.
+    """
+    with _caches_lock:
+        cache = _caches.get(web3)
+        if cache is None:
+            # a proxy, as the cache referencing `web3` would keep it from ever being removed from `_caches`
+            cache = BlockHeaderCache(weakref.proxy(web3))
+            _caches[web3] = cache
+
+        return cache
+
+
+@lru_cache(maxsize=4096)
+def _bloom_bits(value: bytes) -> tuple:
+    # each value sets three of the 2048 bits, selected by the low 11 bits of the first three pairs of bytes
+    # of its hash. bits are numbered from the end of the big-endian 256-byte bloom, see the yellow paper
+    value_hash = keccak(value)
+    bits = [((value_hash[i] << 8) | value_hash[i+1]) & 2047 for i in (0, 2, 4)]
+    return tuple((255 - bit // 8, 1 << (bit % 8)) for bit in bits)
+
+
+def bloom_may_contain(logs_bloom: bytes, value: bytes) -> bool:
+    """Checks whether a value (a log address or topic) may be present in a `logsBloom`.
+
+    False positives are possible, false negatives are not.
+
+    Args:
+        logs_bloom: The 256-byte bloom of a block, i.e. :py:attr:`pymaker.blocks.BlockHeader.logs_bloom`.
+        value: Address (20 bytes) or topic (32 bytes) to look for.
+    """
+    assert isinstance(logs_bloom, bytes)
+    assert isinstance(value, bytes)
+
+    return all(logs_bloom[index] & mask for index, mask in _bloom_bits(value))
+
+
+class LogInterest:
+    """Logs a keeper is interested in, emitted by a single contract.
+
+    Blocks are checked against it using their `logsBloom`, so logs only need to be fetched
+    for blocks which may contain some of them. Use :py:func:`pymaker.blocks.get_block_logs`
+    to do that.
+
+    Args:
+        address: Address of the contract emitting the logs.
+        topics: Optional list of first topics (event signatures) of the logs, as bytes or hex strings.
+            Logs with any first topic are selected if `None`.
+    """
+    def __init__(self, address: Address, topics: Optional[list] = None):
+        assert isinstance(address, Address)
+        assert isinstance(topics, list) or topics is None
+
+        self.address = address
+        self.topics = frozenset(bytes(HexBytes(topic)) for topic in topics) if topics is not None else None
+
+    def may_match(self, header: BlockHeader) -> bool:
+        """Checks whether a block may contain logs selected by this interest, based on its `logsBloom`."""
+        assert isinstance(header, BlockHeader)
+
+        if not bloom_may_contain(header.logs_bloom, self.address.as_bytes()):
+            return False
+
+        return self.topics is None or any(bloom_may_contain(header.logs_bloom, topic) for topic in self.topics)
+
+    def matches(self, log: dict) -> bool:
+        """Checks whether a raw log, as returned by `eth_getLogs`, is selected by this interest."""
+        if Address(log['address']) != self.address:
+            return False
+
+        return self.topics is None or (len(log['topics']) > 0 and bytes(log['topics'][0]) in self.topics)
+
+    def __repr__(self):
+        return f"LogInterest('{self.address}', {len(self.topics) if self.topics is not None else 'all'} topics)"
+
+
+def get_block_logs(web3: Web3, header: BlockHeader, interests: List[LogInterest]) -> list:
+    """Fetches logs of a block selected by any of `interests`.
+
+    The `logsBloom` of the block is checked first, no request is sent to the node at all
+    if it rules out all `interests`, which is the case for most blocks.
+
+    Args:
+        web3: An instance of `Web` from `web3.py`.
+        header: Header of the block to fetch logs of.
+        interests: Logs to fetch.
+
+    Returns:
+        Raw logs, as returned by `eth_getLogs`.
+    """
+    assert isinstance(header, BlockHeader)
+    assert isinstance(interests, list)
+
+    candidates = [interest for interest in interests if interest.may_match(header)]
+    if len(candidates) == 0:
+        return []
+
+    filter_params = {'blockHash': '0x' + header.hash.hex(),
+                     'address': sorted(set(interest.address.address for interest in candidates))}
+    if all(interest.topics is not None for interest in candidates):
+        topics = set('0x' + topic.hex() for interest in candidates for topic in interest.topics)
+        filter_params['topics'] = [sorted(topics)]
+
+    return [log for log in web3.eth.getLogs(filter_params) if any(interest.matches(log) for interest in candidates)]
+
+
+class BlockStream:
+    """Follows the chain of block headers by parent hash, detecting reorganizations.
+
+    New headers are fed into the stream with `add`, in any order and with gaps, i.e. as reported
+    by a `latest` block filter. Missing ancestors are fetched through the shared
+    :py:class:`pymaker.blocks.BlockHeaderCache`. Handlers registered with the stream get notified of:
+
+    - `new_block(header)`, for every block which becomes part of the canonical chain, in order,
+    - `reorg(removed, added)`, when blocks are replaced by another branch, with the lists of removed
+      and added headers, both ordered by block number; `new_block` follows for every added block,
+    - `confirmed(header)`, for every block which becomes `confirmations` blocks deep, in order.
+
+    Gaps between the current head and a new one get filled in, however long they are, so that no
+    block is missed. Their headers get fetched concurrently, see `BlockHeaderCache.backfill`. Blocks deeper than `max_depth` are forgotten, a reorganization going deeper
+    than that resets the stream to the new head. Handlers are called from the thread calling `add`, any exception
+    they raise gets logged and ignored.
+
+    :py:class:`pymaker.lifecycle.Lifecycle` feeds its `block_stream` with every new block.
+
+    Args:
+        web3: An instance of `Web` from `web3.py`.
+        confirmations: Depth at which blocks get reported as confirmed.
+        max_depth: Number of most recent blocks to keep track of.
+    """
+    logger = logging.getLogger()
+
+    def __init__(self, web3: Web3, confirmations: int = 12, max_depth: int = 128):
+        assert isinstance(confirmations, int) and confirmations >= 0
+        assert isinstance(max_depth, int) and max_depth > confirmations
+
+        self.web3 = web3
+        self.confirmations = confirmations
+        self.max_depth = max_depth
+
+        self._chain = []
+        self._confirmed_number = None
+        self._new_block_handlers = []
+        self._reorg_handlers = []
+        self._confirmed_handlers = []
+        self._lock = Lock()
+
+    def on_new_block(self, handler):
+        assert callable(handler)
+        self._new_block_handlers.append(handler)
+
+    def on_reorg(self, handler):
+        assert callable(handler)
+        self._reorg_handlers.append(handler)
+
+    def on_confirmed(self, handler):
+        assert callable(handler)
+        self._confirmed_handlers.append(handler)
+
+    def has_handlers(self) -> bool:
+        return len(self._new_block_handlers) + len(self._reorg_handlers) + len(self._confirmed_handlers) > 0
+
+    @property
+    def head(self) -> Optional[BlockHeader]:
+        """The most recent block of the canonical chain, or `None` if no block has been added yet."""
+        chain = self._chain
+        return chain[-1] if len(chain) > 0 else None
+
+    def canonical(self, block_number: int) -> Optional[BlockHeader]:
+        """Returns the header of the canonical chain for a block number, if it is still tracked."""
+        chain = self._chain
+        if len(chain) == 0 or not chain[0].number <= block_number <= chain[-1].number:
+            return None
+
+        return chain[block_number - chain[0].number]
+
+    def add(self, header: BlockHeader):
+        """Adds a new head to the stream, notifying the handlers.
+
+        Headers of blocks already in the canonical chain, or older than all tracked blocks, are ignored.
+        """
+        assert isinstance(header, BlockHeader)
+
+        # missing ancestors get fetched before taking the lock, so the node is not waited for while holding it
+        branch = self._branch(header)
+
+        with self._lock:
+            removed, added = self._extend(header, branch)
+            if len(removed) == 0 and len(added) == 0:
+                return
+
+            for new_header in added:
+                block_cache(self.web3).put(new_header)
+
+            if len(removed) > 0:
+                self.logger.info(f"Chain reorganization at block #{removed[0].number}, {len(removed)} block(s)"
+                                 f" replaced by {len(added)} block(s)")
+                self._notify(self._reorg_handlers, removed, added)
+
+            for new_header in added:
+                self._notify(self._new_block_handlers, new_header)
+
+            for confirmed_header in self._newly_confirmed():
+                self._notify(self._confirmed_handlers, confirmed_header)
+
+            del self._chain[:max(len(self._chain) - self.max_depth, 0)]
+
+    def _branch(self, header: BlockHeader) -> list:
+        chain = list(self._chain)
+        if len(chain) == 0 or header.number < chain[0].number:
+            return [header]
+
+        def hash_at(block_number: int) -> Optional[bytes]:
+            index = block_number - chain[0].number
+            return chain[index].hash if 0 <= index < len(chain) else None
+
+        # headers of a gap above the current head get fetched concurrently by number, so walking back
+        # by parent hash finds them in the cache unless the node has switched branches in the meantime
+        cache = block_cache(self.web3)
+        gap = max(header.number - chain[-1].number, 0)
+        if gap > 1:
+            cache.backfill(max(chain[-1].number + 1, header.number - cache.max_size + 1), header.number - 1)
+
+        # walk back from the new header until reaching a block of the canonical chain, blocks above
+        # the current head fill a gap rather than replace anything, so they do not count towards `max_depth`
+        branch = [header]
+        while branch[-1].number > chain[0].number and branch[-1].parent_hash != hash_at(branch[-1].number - 1):
+            if len(branch) > self.max_depth + gap:
+                break
+            branch.append(cache.get(branch[-1].parent_hash))
+
+        branch.reverse()
+        return branch
+
+    def _extend(self, header: BlockHeader, branch: list) -> tuple:
+        chain = self._chain
+        if len(chain) == 0:
+            chain.append(header)
+            return [], [header]
+
+        if self._hash_at(header.number) == header.hash or header.number < chain[0].number:
+            return [], []
+
+        # the chain may have changed while the branch was being fetched, blocks added in the meantime
+        # get skipped and a branch which does not connect anymore gets walked back again
+        start = 0
+        while self._hash_at(branch[start].number) == branch[start].hash:
+            start += 1
+        branch = branch[start:]
+
+        if branch[0].number > chain[0].number and branch[0].parent_hash != self._hash_at(branch[0].number - 1):
+            branch = self._branch(header)
+
+        if branch[0].parent_hash != self._hash_at(branch[0].number - 1):
+            self.logger.warning(f"Chain reorganization beyond the tracked blocks,"
+                                f" restarting from block #{header.number}")
+            removed = list(chain)
+            chain[:] = [header]
+            self._confirmed_number = None
+            return removed, [header]
+
+        # the node reports heads of the branch it considers canonical, so it gets followed
+        # even if it is shorter than the current one
+        fork_index = branch[0].number - chain[0].number
+        removed = chain[fork_index:]
+        chain[fork_index:] = branch
+        if self._confirmed_number is not None and len(removed) > 0:
+            self._confirmed_number = min(self._confirmed_number, branch[0].number - 1)
+
+        return removed, branch
+
+    def _hash_at(self, block_number: int) -> Optional[bytes]:
+        header = self.canonical(block_number)
+        return header.hash if header is not None else None
+
+    def _newly_confirmed(self) -> list:
+        confirmed_number = self.head.number - self.confirmations
+        first_number = self._confirmed_number + 1 if self._confirmed_number is not None else self._chain[0].number
+
+        result = [self.canonical(number) for number in range(first_number, confirmed_number + 1)]
+        if len(result) > 0:
+            self._confirmed_number = confirmed_number
+
+        return result
+
+    def _notify(self, handlers: list, *args):
+        for handler in handlers:
+            try:
+                handler(*args)
+            except:
+                self.logger.exception(f"Block stream handler {handler} failed")
+
+    def __repr__(self):
+        return f"BlockStream({self.head})"
+
+
+class BlockCancelled(Exception):
+    """Raised at safe points of a callback processing a block which a newer block has made stale."""
+    pass
+
+
+_bound_contexts = local()
+_task_contexts = weakref.WeakKeyDictionary()
+
+
+def _current_task() -> Optional[asyncio.Task]:
+    loop = asyncio.events._get_running_loop()
+    if loop is None:
+        return None
+
+    return asyncio.current_task(loop) if hasattr(asyncio, 'current_task') else asyncio.Task.current_task(loop)
+
+
+def current_block_context() -> Optional['BlockContext']:
+    """Returns the block context the current asyncio task or thread is processing a block for, if any."""
+    task = _current_task()
+    if task is not None and task in _task_contexts:
+        return _task_contexts[task]
+
+    return getattr(_bound_contexts, 'context', None)
+
+
+def inherit_block_context(loop: asyncio.AbstractEventLoop):
+    """Makes tasks created on `loop` inherit the block context bound to the task creating them.
+
+    This way coroutines gathered by a callback processing a block reach the same safe points
+    as the callback itself. The task factory already set on `loop`, if any, is still used.
+
+    Args:
+        loop: Event loop to install the task factory on.
+    """
+    assert isinstance(loop, asyncio.AbstractEventLoop)
+
+    previous_factory = loop.get_task_factory()
+    if getattr(previous_factory, 'inherits_block_context', False):
+        return
+
+    def factory(loop, coro, **kwargs):
+        task = _current_task()
+        context = _task_contexts.get(task) if task is not None else None
+        if previous_factory is None:
+            new_task = asyncio.Task(coro, loop=loop, **kwargs)
+        else:
+            new_task = previous_factory(loop, coro, **kwargs)
+
+        if context is not None:
+            _task_contexts[new_task] = context
+        return new_task
+
+    factory.inherits_block_context = True
+    loop.set_task_factory(factory)
+
+
+class BlockContext:
+    """The block an `on_block` callback of :py:class:`pymaker.lifecycle.Lifecycle` has been triggered for.
+
+    Callbacks requiring an argument receive one of these, so they do not need to fetch the block
+    themselves. As a callback is not triggered again while it is still running, blocks can get
+    coalesced. These are listed in `skipped`, so they can still be processed if necessary.
+
+    Reads made through `read` are cached for the lifetime of the context, i.e. for a single
+    callback run, and should be pinned to `number` so they all see the state of the same block. Getters
+    reading structs, such as `Vat.ilk`, `Vat.urn`, `Flipper.bids` or `SimpleMarket.get_order`, accept
+    a `block_identifier` for that:
+
+        def on_block(self, block: BlockContext):
+            ilk = block.read('ilk', lambda: self.vat.ilk('ETH-A', block_identifier=block.number))
+
+    If the callback has been registered with `cancel_stale=True`, the context gets cancelled as soon
+    as a newer block arrives. `read`, `check`, contract reads, past event lookups and sending transactions
+    raise :py:class:`BlockCancelled` from then on, so the callback stops and gets restarted for the newest block.
+
+    Attributes:
+        header: Header of the block.
+        skipped: Headers of the canonical blocks received since the previous callback run, oldest first,
+            for which the callback has not been triggered or has been cancelled.
+    """
+    def __init__(self, header: BlockHeader, skipped: List[BlockHeader]):
+        assert isinstance(header, BlockHeader)
+        assert isinstance(skipped, list)
+
+        self.header = header
+        self.skipped = skipped
+        self._reads = {}
+        self._lock = Lock()
+        self._cancelled = Event()
+        self._previous = None
+
+    @property
+    def number(self) -> int:
+        return self.header.number
+
+    @property
+    def hash(self) -> bytes:
+        return self.header.hash
+
+    @property
+    def parent_hash(self) -> bytes:
+        return self.header.parent_hash
+
+    @property
+    def timestamp(self) -> int:
+        return self.header.timestamp
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """Marks the block as stale, the callback processing it will stop at the next safe point."""
+        self._cancelled.set()
+
+    def check(self):
+        """A safe point, raises :py:class:`BlockCancelled` if the block has become stale."""
+        if self._cancelled.is_set():
+            raise BlockCancelled(f"Block #{self.number} has been superseded by a newer block")
+
+    def read(self, key, function):
+        """Returns the cached result of a read, calling `function` only the first time `key` is read.
+
+        Args:
+            key: Hashable key identifying the read.
+            function: Function performing the read, called with no arguments.
+
+        Returns:
+            Result of the read.
+        """
+        assert callable(function)
+
+        self.check()
+        with self._lock:
+            if key not in self._reads:
+                self._reads[key] = function()
+
+            return self._reads[key]
+
+    def __enter__(self):
+        # inside a coroutine the context is bound to the current task, as the thread is shared by all of them
+        task = _current_task()
+        self._previous = current_block_context()
+        if task is not None:
+            _task_contexts[task] = self
+        else:
+            _bound_contexts.context = self
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        task = _current_task()
+        if task is not None:
+            if self._previous is not None:
+                _task_contexts[task] = self._previous
+            else:
+                _task_contexts.pop(task, None)
+        else:
+            _bound_contexts.context = self._previous
+        self._previous = None
+
+    def __repr__(self):
+        return f"BlockContext(#{self.number}, {len(self.skipped)} skipped)"
@@ -0,0 +1,315 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 MakerDAO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import re
+from functools import lru_cache
+from threading import Lock
+from typing import Optional
+
+import eth_utils
+from web3.exceptions import BadFunctionCallOutput
+
+
+_UINT_TYPE = re.compile(r'^uint(\d*)$')
+_INT_TYPE = re.compile(r'^int(\d*)$')
+_BYTES_TYPE = re.compile(r'^bytes(\d+)$')
+
+
+@lru_cache(maxsize=16384)
+def _is_checksum_address(value: str) -> bool:
+    return eth_utils.is_checksum_address(value)
+
+
+@lru_cache(maxsize=16384)
+def _checksum_address(value: bytes) -> str:
+    return eth_utils.to_checksum_address(value)
+
+
+def _word_encoder(abi_type: str):
+    """Returns a function encoding a value of a static elementary ABI type into a 32-byte word.
+
+    The returned function returns `None` for values it does not handle, these should be left
+    to the generic `web3.py` encoder. `None` is returned for ABI types which are not supported.
+    """
+    if abi_type == 'address':
+        def encode_address(value):
+            if isinstance(value, str) and len(value) == 42 and _is_checksum_address(value):
+                return bytes(12) + bytes.fromhex(value[2:])
+            return None
+
+        return encode_address
+
+    if abi_type == 'bool':
+        def encode_bool(value):
+            if isinstance(value, bool):
+                return (1 if value else 0).to_bytes(32, 'big')
+            return None
+
+        return encode_bool
+
+    match = _UINT_TYPE.match(abi_type)
+    if match:
+        bits = int(match.group(1) or 256)
+
+        def encode_uint(value):
+            if type(value) is int and 0 <= value < 2**bits:
+                return value.to_bytes(32, 'big')
+            return None
+
+        return encode_uint
+
+    match = _INT_TYPE.match(abi_type)
+    if match:
+        bits = int(match.group(1) or 256)
+
+        def encode_int(value):
+            if type(value) is int and -2**(bits-1) <= value < 2**(bits-1):
+                return value.to_bytes(32, 'big', signed=True)
+            return None
+
+        return encode_int
+
+    match = _BYTES_TYPE.match(abi_type)
+    if match:
+        size = int(match.group(1))
+
+        def encode_bytes(value):
+            if isinstance(value, bytes) and len(value) <= size:
+                return bytes(value) + bytes(32 - len(value))
+            return None
+
+        return encode_bytes
+
+    return None
+
+
+class FunctionEncoder:
+    """Precompiled calldata encoder for a contract function taking static elementary arguments only.
+
+    Arguments of types `address`, `bool`, `uint<N>`, `int<N>` and `bytes<N>` are encoded directly
+    into 32-byte words, the function selector is only calculated once. This is considerably faster
+    than the generic `web3.py` encoder, which resolves and validates the function on every call.
+
+    Use :py:func:`pymaker.codec.function_encoder` to get a cached instance.
+
+    Attributes:
+        signature: Canonical signature of the function, i.e. `frob(bytes32,address,address,address,int256,int256)`.
+        selector: The 4-byte function selector.
+    """
+    def __init__(self, fn_abi: dict):
+        assert(isinstance(fn_abi, dict))
+
+        input_types = [argument['type'] for argument in fn_abi.get('inputs', [])]
+        self.signature = f"{fn_abi['name']}({','.join(input_types)})"
+        self.selector = eth_utils.function_signature_to_4byte_selector(self.signature)
+        self._word_encoders = [_word_encoder(input_type) for input_type in input_types]
+
+    @staticmethod
+    def supports(fn_abi: dict) -> bool:
+        """Checks whether all arguments of a function have types supported by the fast-path encoder."""
+        return all(_word_encoder(argument['type']) is not None for argument in fn_abi.get('inputs', []))
+
+    def encode(self, args: list) -> Optional[bytes]:
+        """Encodes the calldata of a call to the function.
+
+        Args:
+            args: Function arguments, in the same form `web3.py` accepts them.
+
+        Returns:
+            The calldata as bytes, or `None` if any of the arguments can not be encoded by
+            the fast path. In that case the generic `web3.py` encoder should be used instead.
+        """
+        if len(args) != len(self._word_encoders):
+            return None
+
+        words = [self.selector]
+        for encode_word, arg in zip(self._word_encoders, args):
+            word = encode_word(arg)
+            if word is None:
+                return None
+
+            words.append(word)
+
+        return b''.join(words)
+
+    def __repr__(self):
+        return f"FunctionEncoder('{self.signature}')"
+
+
+class OutputDecoder:
+    """Decoder for return values of a contract function returning static elementary values only.
+
+    Return values of types `uint<N>`, `int<N>`, `bool`, `bytes<N>` and `address` are sliced directly
+    from the raw 32-byte words returned by `eth_call`, skipping the `web3.py` decoding and normalization
+    stack. Addresses are returned as checksum strings, the same as `web3.py` returns them, with
+    the checksums of recently seen addresses cached.
+
+    Use :py:func:`pymaker.codec.output_decoder` to get a cached instance.
+
+    Attributes:
+        types: ABI types of the return values.
+    """
+    def __init__(self, fn_abi: dict):
+        assert(isinstance(fn_abi, dict))
+
+        self.types = tuple(output['type'] for output in fn_abi.get('outputs', []))
+        self._word_decoders = tuple(_word_decoder(output_type) for output_type in self.types)
+
+    @staticmethod
+    def supports(fn_abi: dict) -> bool:
+        """Checks whether all return values of a function have types supported by the fast-path decoder."""
+        return all(_word_decoder(output['type']) is not None for output in fn_abi.get('outputs', []))
+
+    def decode(self, data: bytes) -> tuple:
+        """Decodes the raw return data of a call.
+
+        Args:
+            data: Raw data returned by `eth_call`.
+
+        Returns:
+            Tuple of decoded values, one for each return value of the function.
+        """
+        if len(data) < 32 * len(self._word_decoders):
+            raise BadFunctionCallOutput(f"Could not decode {len(data)} bytes of return data as {self.types}")
+
+        view = memoryview(data)
+        return tuple(decode_word(view[32*index:32*(index+1)])
+                     for index, decode_word in enumerate(self._word_decoders))
+
+    def __repr__(self):
+        return f"OutputDecoder({self.types})"
+
+
+def _word_decoder(abi_type: str):
+    if abi_type == 'address':
+        return lambda word: _checksum_address(bytes(word[12:]))
+
+    if abi_type == 'bool':
+        return lambda word: word[31] != 0
+
+    if _UINT_TYPE.match(abi_type):
+        return lambda word: int.from_bytes(word, 'big')
+
+    if _INT_TYPE.match(abi_type):
+        return lambda word: int.from_bytes(word, 'big', signed=True)
+
+    match = _BYTES_TYPE.match(abi_type)
+    if match:
+        size = int(match.group(1))
+        return lambda word: bytes(word[:size])
+
+    return None
+
+
+_function_codecs = {}
+_function_codecs_lock = Lock()
+
+
+def _find_function_abi(abi: list, function_name: str) -> Optional[dict]:
+    functions = [item for item in abi if item.get('type', 'function') == 'function' and 'name' in item]
+
+    if '(' in function_name:
+        matching = [item for item in functions
+                    if f"{item['name']}({','.join(argument['type'] for argument in item.get('inputs', []))})"
+                    == function_name.replace(' ', '')]
+    else:
+        matching = [item for item in functions if item['name'] == function_name]
+
+    # overloaded functions are left to `web3.py`, which resolves them or raises a meaningful error
+    return matching[0] if len(matching) == 1 else None
+
+
+def _function_codec(abi: list, function_name: str, codec_class):
+    # We keep a reference to `abi` so its id can not get reused while cached.
+    key = (id(abi), function_name, codec_class)
+    cached = _function_codecs.get(key)
+    if cached is None:
+        fn_abi = _find_function_abi(abi, function_name)
+        codec = codec_class(fn_abi) if fn_abi is not None and codec_class.supports(fn_abi) else None
+
+        with _function_codecs_lock:
+            if len(_function_codecs) >= 4096:
+                _function_codecs.clear()
+
+            cached = (abi, codec)
+            _function_codecs[key] = cached
+
+    return cached[1]
+
+
+def function_encoder(abi: list, function_name: str) -> Optional[FunctionEncoder]:
+    """Returns a cached fast-path encoder for a contract function.
+
+    Encoders are cached per ABI identity and function name, in the same way as contract factories
+    in :py:class:`pymaker.Contract` are, so ABIs are expected to be long-lived objects.
+
+    Args:
+        abi: Contract ABI.
+        function_name: Either the function name, i.e. `frob`, or its signature, i.e. `frob(bytes32,...)`.
+
+    Returns:
+        An instance of :py:class:`pymaker.codec.FunctionEncoder`, or `None` if the function can not be
+        found unambiguously or takes arguments of types not supported by the fast path.
+    """
+    assert(isinstance(abi, list))
+    assert(isinstance(function_name, str))
+
+    return _function_codec(abi, function_name, FunctionEncoder)
+
+
+def output_decoder(abi: list, function_name: str) -> Optional[OutputDecoder]:
+    """Returns a cached fast-path decoder for return values of a contract function.
+
+    Args:
+        abi: Contract ABI.
+        function_name: Either the function name, i.e. `urns`, or its signature, i.e. `urns(bytes32,address)`.
+
+    Returns:
+        An instance of :py:class:`pymaker.codec.OutputDecoder`, or `None` if the function can not be
+        found unambiguously or returns values of types not supported by the fast path.
+    """
+    assert(isinstance(abi, list))
+    assert(isinstance(function_name, str))
+
+    return _function_codec(abi, function_name, OutputDecoder)
+
+
+@lru_cache(maxsize=1024)
+def parse_signature(fn_sign: str) -> tuple:
+    """Parses a function signature like `transfer(address,uint256)` into its name and argument types.
+
+    Returns:
+        A `(name, types)` tuple, `types` being a tuple of ABI type names.
+    """
+    assert(isinstance(fn_sign, str))
+
+    fn_split = re.split('[(),]', fn_sign)
+    return fn_split[0], tuple(type for type in fn_split[1:] if type)
+
+
+@lru_cache(maxsize=1024)
+def signature_encoder(fn_sign: str) -> Optional[FunctionEncoder]:
+    """Returns a cached fast-path encoder for a function signature like `transfer(address,uint256)`.
+
+    Returns:
+        An instance of :py:class:`pymaker.codec.FunctionEncoder`, or `None` if the signature
+        has arguments of types not supported by the fast path.
+    """
+    fn_name, fn_types = parse_signature(fn_sign)
+    fn_abi = {"type": "function", "name": fn_name, "inputs": [{"type": type} for type in fn_types]}
+
+    return FunctionEncoder(fn_abi) if FunctionEncoder.supports(fn_abi) else None
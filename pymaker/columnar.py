@@ -0,0 +1,312 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 MakerDAO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import importlib
+import json
+import os
+from typing import Iterable, List
+
+from pymaker import Address
+from pymaker.events import AmountColumn, BytesColumn, CategoryColumn, EventRecord, EventTable, IntColumn
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+INDEX_FILE = 'index.json'
+
+_DECIMALS = {'Wad': 18, 'Ray': 27, 'Rad': 45}
+
+
+def _require_numpy():
+    if numpy is None:
+        raise RuntimeError("Columnar export requires `numpy`, please install it (`pip install pymaker[columnar]`)")
+
+
+def _record_class_name(record_class) -> str:
+    return f"{record_class.__module__}:{record_class.__qualname__}"
+
+
+def _record_class(name: str):
+    module_name, qualname = name.split(':')
+    result = importlib.import_module(module_name)
+    for part in qualname.split('.'):
+        result = getattr(result, part)
+
+    return result
+
+
+def _column_spec(column) -> dict:
+    if isinstance(column, IntColumn):
+        return {'kind': 'int'}
+    elif isinstance(column, BytesColumn):
+        return {'kind': 'bytes', 'size': column.size}
+    elif isinstance(column, AmountColumn):
+        return {'kind': 'amount', 'signed': column.signed,
+                'wrapper': column.wrapper.__name__ if column.wrapper is not None else None}
+    elif isinstance(column, CategoryColumn):
+        return {'kind': 'category'}
+    else:
+        raise ValueError(f"Unsupported column type {type(column).__name__}")
+
+
+def _encode_category(value) -> list:
+    if isinstance(value, Address):
+        return ['address', value.address]
+    elif isinstance(value, str):
+        return ['str', value]
+    else:
+        raise ValueError(f"Unsupported category value {value!r}")
+
+
+def _decode_category(value: list):
+    kind, raw = value
+    return Address(raw) if kind == 'address' else raw
+
+
+class ColumnarExporter:
+    """Streams event records into a directory of memory-mappable NumPy `.npy` column files.
+
+    Records get buffered in an :py:class:`pymaker.events.EventTable` and written out in chunks
+    of `chunk_size` rows, one `.npy` file per column per chunk. Block numbers and other integers are
+    stored as `int64`, transaction hashes and 256-bit amounts as `(rows, 32)` arrays of `uint8`, and
+    dictionary-encoded columns (ilks, urns, addresses) as `uint32` codes. The dictionaries and the list
+    of chunks are kept in `index.json`, which gets rewritten after every chunk, so an interrupted
+    export leaves a consistent archive behind and can be resumed by creating a new exporter
+    on the same directory.
+
+    The typical usage pattern is as follows:
+
+        with ColumnarExporter('frobs', Vat.LogFrob) as exporter:
+            exporter.write(vat.past_frobs(100000))
+
+    Requires `numpy`.
+
+    Args:
+        directory: Directory to write the files to, gets created if it does not exist.
+        record_class: Subclass of :py:class:`pymaker.events.EventRecord` declaring `_columns`.
+        chunk_size: Number of rows per chunk.
+    """
+    def __init__(self, directory: str, record_class, chunk_size: int = 100000):
+        assert isinstance(directory, str)
+        assert issubclass(record_class, EventRecord)
+        assert isinstance(chunk_size, int) and chunk_size > 0
+        _require_numpy()
+
+        self.directory = directory
+        self.record_class = record_class
+        self.chunk_size = chunk_size
+
+        os.makedirs(directory, exist_ok=True)
+        self._buffer = EventTable(record_class)
+        self._index = self._load_index()
+        self._categories = {name: {tuple(value): code for code, value in enumerate(values)}
+                            for name, values in self._index['categories'].items()}
+
+    def _load_index(self) -> dict:
+        path = os.path.join(self.directory, INDEX_FILE)
+        if os.path.exists(path):
+            with open(path, 'r') as file:
+                index = json.load(file)
+
+            assert index['record_class'] == _record_class_name(self.record_class), \
+                f"Directory contains an archive of {index['record_class']} records"
+            return index
+
+        return {'record_class': _record_class_name(self.record_class),
+                'columns': {name: _column_spec(column) for name, column in self._buffer.columns.items()},
+                'categories': {name: [] for name, column in self._buffer.columns.items()
+                               if isinstance(column, CategoryColumn)},
+                'chunks': []}
+
+    def write(self, records: Iterable[EventRecord]):
+        """Appends records to the archive, writing out every full chunk."""
+        for record in records:
+            self._buffer.append(record)
+            if len(self._buffer) >= self.chunk_size:
+                self.flush()
+
+    def flush(self):
+        """Writes out the buffered records as a new chunk, even if it is not full."""
+        rows = len(self._buffer)
+        if rows == 0:
+            return
+
+        chunk_name = f"chunk-{len(self._index['chunks']):06d}"
+        for name, column in self._buffer.columns.items():
+            numpy.save(os.path.join(self.directory, f"{chunk_name}.{name}.npy"), self._to_array(name, column))
+
+        blocks = self._buffer.columns['block'].data
+        self._index['chunks'].append({'name': chunk_name, 'rows': rows,
+                                      'first_block': min(blocks), 'last_block': max(blocks)})
+        self._write_index()
+        self._buffer = EventTable(self.record_class)
+
+    def _to_array(self, name: str, column):
+        if isinstance(column, IntColumn):
+            return numpy.frombuffer(column.data.tobytes(), dtype=column.data.typecode).astype(numpy.int64)
+        elif isinstance(column, (BytesColumn, AmountColumn)):
+            size = column.size if isinstance(column, BytesColumn) else 32
+            return numpy.frombuffer(bytes(column.data), dtype=numpy.uint8).reshape(-1, size)
+        else:
+            # chunk-local codes get translated to archive-wide ones
+            mapping = []
+            for value in column.values:
+                encoded = tuple(_encode_category(value))
+                if encoded not in self._categories[name]:
+                    self._categories[name][encoded] = len(self._index['categories'][name])
+                    self._index['categories'][name].append(list(encoded))
+                mapping.append(self._categories[name][encoded])
+
+            return numpy.array(mapping, dtype=numpy.uint32)[numpy.frombuffer(column.codes.tobytes(),
+                                                                             dtype=numpy.uint32)]
+
+    def _write_index(self):
+        path = os.path.join(self.directory, INDEX_FILE)
+        with open(path + '.tmp', 'w') as file:
+            json.dump(self._index, file)
+
+        os.replace(path + '.tmp', path)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __repr__(self):
+        return f"ColumnarExporter('{self.directory}', {self.record_class.__qualname__})"
+
+
+class ColumnarArchive:
+    """Reads an archive written by :py:class:`pymaker.columnar.ColumnarExporter`.
+
+    Column files are memory-mapped, so only the parts actually accessed get read from disk.
+    Arrays returned by `column` are concatenated over all chunks, `chunk_columns` can be used
+    to process the archive chunk by chunk instead.
+
+    Requires `numpy`.
+
+    Args:
+        directory: Directory containing the archive.
+    """
+    def __init__(self, directory: str):
+        assert isinstance(directory, str)
+        _require_numpy()
+
+        self.directory = directory
+        with open(os.path.join(directory, INDEX_FILE), 'r') as file:
+            self.index = json.load(file)
+
+        self.record_class = _record_class(self.index['record_class'])
+        self._category_values = {name: [_decode_category(value) for value in values]
+                                 for name, values in self.index['categories'].items()}
+
+    def _column_name(self, name: str) -> str:
+        if name in self.index['columns']:
+            return name
+        elif f"_{name}" in self.index['columns']:
+            return f"_{name}"
+        else:
+            raise KeyError(f"{self.record_class.__qualname__} has no '{name}' column")
+
+    def chunk_columns(self, name: str) -> List:
+        """Returns the memory-mapped arrays of a column, one per chunk."""
+        name = self._column_name(name)
+        return [numpy.load(os.path.join(self.directory, f"{chunk['name']}.{name}.npy"), mmap_mode='r')
+                for chunk in self.index['chunks']]
+
+    def column(self, name: str):
+        """Returns a column as a single array.
+
+        Integer columns are returned as `int64`, dictionary-encoded columns as `uint32` codes
+        (see `categories`), byte and amount columns as `(rows, 32)` arrays of `uint8`.
+        """
+        chunks = self.chunk_columns(name)
+        if len(chunks) == 1:
+            return chunks[0]
+
+        spec = self.index['columns'][self._column_name(name)]
+        if len(chunks) == 0:
+            return numpy.zeros((0, 32) if spec['kind'] in ('bytes', 'amount') else 0)
+
+        return numpy.concatenate(chunks)
+
+    def categories(self, name: str) -> list:
+        """Returns the distinct values of a dictionary-encoded column, indexed by their codes."""
+        return self._category_values[self._column_name(name)]
+
+    def mask(self, name: str, value):
+        """Returns a boolean array selecting rows where a dictionary-encoded column equals `value`.
+
+        Args:
+            name: Name of the column, i.e. `ilk` or `urn`.
+            value: The value to select, i.e. `'ETH-A'` or an `Address`.
+        """
+        values = self.categories(name)
+        codes = self.column(name)
+        if value not in values:
+            return numpy.zeros(len(codes), dtype=bool)
+
+        return codes == values.index(value)
+
+    def amounts(self, name: str):
+        """Returns an amount column converted to `float64`, scaled down according to its type.
+
+        `Wad` amounts get divided by 10^18, `Ray` by 10^27 and `Rad` by 10^45. Precision is limited
+        to that of `float64`, which is good enough for analytics but not for accounting.
+        """
+        name = self._column_name(name)
+        spec = self.index['columns'][name]
+        assert spec['kind'] == 'amount', f"Column '{name}' is not an amount column"
+
+        raw = numpy.asarray(self.column(name))
+        weights = 256.0 ** numpy.arange(31, -1, -1)
+        result = raw.astype(numpy.float64) @ weights
+        if spec['signed']:
+            # two's complement gets inverted on the bytes, as `value - 2**256` would not fit in a float
+            negative = raw[:, 0] >= 128
+            result[negative] = -((~raw[negative]).astype(numpy.float64) @ weights + 1)
+
+        return result / 10.0**_DECIMALS.get(spec['wrapper'], 0)
+
+    def table(self) -> EventTable:
+        """Loads the whole archive back into an :py:class:`pymaker.events.EventTable`."""
+        table = EventTable(self.record_class)
+        for name, column in table.columns.items():
+            spec = self.index['columns'][name]
+            for array in self.chunk_columns(name):
+                if spec['kind'] == 'int':
+                    column.data.extend(int(value) for value in array)
+                elif spec['kind'] in ('bytes', 'amount'):
+                    column.data += numpy.ascontiguousarray(array).tobytes()
+                else:
+                    for code in array:
+                        column.append(self._category_values[name][code])
+
+        return table
+
+    def __len__(self):
+        return sum(chunk['rows'] for chunk in self.index['chunks'])
+
+    def __repr__(self):
+        return f"ColumnarArchive('{self.directory}', {self.record_class.__qualname__}, {len(self)} records)"
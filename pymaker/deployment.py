@@ -20,26 +20,20 @@ import os
 import re
 from typing import Dict, List, Optional
 
-import pkg_resources
 from pymaker.auctions import Flapper, Flopper, Flipper
 from web3 import Web3, HTTPProvider
 
-from pymaker import Address
-from pymaker.approval import directly, hope_directly
-from pymaker.auth import DSGuard
-from pymaker.etherdelta import EtherDelta
+from pymaker import Address, read_resource, ZERO_ADDRESS
+from pymaker.approval import hope_directly
 from pymaker.dss import Cat, Collateral, DaiJoin, GemJoin, GemJoin5, Ilk, Jug, Pot, Spotter, Vat, Vow
 from pymaker.proxy import ProxyRegistry, DssProxyActionsDsr
 from pymaker.feed import DSValue
 from pymaker.gas import DefaultGasPrice
 from pymaker.governance import DSPause, DSChief
 from pymaker.numeric import Wad, Ray
-from pymaker.oasis import MatchingMarket
 from pymaker.oracles import OSM
-from pymaker.sai import Tub, Tap, Top, Vox
 from pymaker.shutdown import ShutdownModule, End
 from pymaker.token import DSToken, DSEthToken
-from pymaker.vault import DSVault
 from pymaker.cdpmanager import CdpManager
 
 
@@ -58,8 +52,8 @@ def deploy_contract(web3: Web3, contract_name: str, args: Optional[list] = None)
     assert(isinstance(contract_name, str))
     assert(isinstance(args, list) or (args is None))
 
-    abi = json.loads(pkg_resources.resource_string('pymaker.deployment', f'abi/{contract_name}.abi'))
-    bytecode = str(pkg_resources.resource_string('pymaker.deployment', f'abi/{contract_name}.bin'), 'utf-8')
+    abi = json.loads(read_resource('pymaker.deployment', f'abi/{contract_name}.abi'))
+    bytecode = str(read_resource('pymaker.deployment', f'abi/{contract_name}.bin'), 'utf-8')
     if args is not None:
         tx_hash = web3.eth.contract(abi=abi, bytecode=bytecode).constructor(*args).transact()
     else:
@@ -76,6 +70,14 @@ class Deployment:
     unit tests for individual keepers.
     """
     def __init__(self):
+        # SCD contracts are only needed here, so their modules are not imported with `pymaker.deployment`
+        from pymaker.approval import directly
+        from pymaker.auth import DSGuard
+        from pymaker.etherdelta import EtherDelta
+        from pymaker.oasis import MatchingMarket
+        from pymaker.sai import Tub, Tap, Top, Vox
+        from pymaker.vault import DSVault
+
         web3 = Web3(HTTPProvider("http://localhost:8555"))
         web3.eth.defaultAccount = web3.eth.accounts[0]
         our_address = Address(web3.eth.defaultAccount)
@@ -100,7 +102,7 @@ class Deployment:
         etherdelta = EtherDelta.deploy(web3,
                                        admin=Address('0x1111100000999998888877777666665555544444'),
                                        fee_account=Address('0x8888877777666665555544444111110000099999'),
-                                       account_levels_addr=Address('0x0000000000000000000000000000000000000000'),
+                                       account_levels_addr=ZERO_ADDRESS,
                                        fee_make=Wad.from_number(0.01),
                                        fee_take=Wad.from_number(0.02),
                                        fee_rebate=Wad.from_number(0.03))
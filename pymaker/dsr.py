@@ -18,7 +18,7 @@
 import logging
 
 
-from pymaker import Address, Transact, Calldata
+from pymaker import Address, Transact, Calldata, ZERO_ADDRESS
 from pymaker.numeric import Wad, Ray
 from pymaker.proxy import DSProxy
 from pymaker.deployment import DssDeployment
@@ -31,7 +31,7 @@ class Dsr:
     """ DSR Client implementation
     """
 
-    _ZERO_ADDRESS = Address("0x0000000000000000000000000000000000000000")
+    _ZERO_ADDRESS = ZERO_ADDRESS
 
     def __init__(self, mcd: DssDeployment, owner: Address):
         assert (isinstance(mcd, DssDeployment))
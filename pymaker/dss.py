@@ -16,26 +16,30 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
+import warnings
 from collections import defaultdict
+from concurrent.futures import Executor
 from datetime import datetime
+from functools import partial
 from pprint import pformat
 from typing import Optional, List
 
 from hexbytes import HexBytes
 from web3 import Web3
+from web3.datastructures import AttributeDict
 
 from web3._utils.events import get_event_data
 
-from eth_abi.codec import ABICodec
-from eth_abi.registry import registry as default_registry
-
 from pymaker import Address, Contract, Transact
 from pymaker.approval import directly, hope_directly
 from pymaker.auctions import Flapper, Flipper, Flopper
+from pymaker.blocks import block_cache
+from pymaker.events import AmountColumn, BytesColumn, CategoryColumn, EventRecord, IntColumn, decode_logs
 from pymaker.gas import DefaultGasPrice
-from pymaker.logging import LogNote
+from pymaker.logging import LogNote, VAT_LAYOUT, codec
 from pymaker.token import DSToken, ERC20Token
 from pymaker.numeric import Wad, Ray, Rad
+from pymaker.subscriptions import LogSubscription, LogSubscriptions
 
 
 logger = logging.getLogger()
@@ -286,21 +290,32 @@ class Vat(Contract):
     """
 
     # Identifies CDP holders and collateral types they have frobbed
-    class LogFrob():
+    class LogFrob(EventRecord):
+        __slots__ = ('ilk', 'urn', 'collateral_owner', 'dai_recipient', 'dink', 'dart')
+
+        _columns = {'ilk': CategoryColumn,
+                    'urn': CategoryColumn,
+                    'collateral_owner': CategoryColumn,
+                    'dai_recipient': CategoryColumn,
+                    'dink': partial(AmountColumn, Wad, signed=True),
+                    'dart': partial(AmountColumn, Wad, signed=True),
+                    'block': IntColumn,
+                    '_tx_hash': BytesColumn}
+
         def __init__(self, lognote: LogNote):
             assert isinstance(lognote, LogNote)
 
-            self.ilk = str(Web3.toText(lognote.arg1)).replace('\x00', '')
-            self.urn = Address(Web3.toHex(lognote.arg2)[26:])
-            self.collateral_owner = Address(Web3.toHex(lognote.arg3)[26:])
-            self.dai_recipient = Address(Web3.toHex(lognote.get_bytes_at_index(3))[26:])
-            self.dink = Wad(int.from_bytes(lognote.get_bytes_at_index(4), byteorder="big", signed=True))
-            self.dart = Wad(int.from_bytes(lognote.get_bytes_at_index(5), byteorder="big", signed=True))
+            self.ilk = lognote.arg1.decode('utf-8').replace('\x00', '')
+            self.urn = Address(lognote.arg2[12:])
+            self.collateral_owner = Address(lognote.arg3[12:])
+            self.dai_recipient = lognote.get_address_at_index(3)
+            self.dink = Wad(lognote.get_int_at_index(4, signed=True))
+            self.dart = Wad(lognote.get_int_at_index(5, signed=True))
             self.block = lognote.block
-            self.tx_hash = lognote.tx_hash
+            self._tx_hash = lognote._tx_hash
 
         def __repr__(self):
-            return f"LogFrob({pformat(vars(self))})"
+            return f"LogFrob({pformat(self.to_dict())})"
 
     abi = Contract._load_abi(__name__, 'abi/Vat.abi')
     bin = Contract._load_bin(__name__, 'abi/Vat.bin')
@@ -337,11 +352,11 @@ class Vat(Contract):
 
         return bool(self._contract.functions.can(sender.address, usr.address).call())
 
-    def ilk(self, name: str) -> Ilk:
+    def ilk(self, name: str, block_identifier='latest') -> Ilk:
         assert isinstance(name, str)
 
         b32_ilk = Ilk(name).toBytes()
-        (art, rate, spot, line, dust) = self._contract.functions.ilks(b32_ilk).call()
+        (art, rate, spot, line, dust) = self._call('ilks', [b32_ilk], block_identifier)
 
         # We could get "ink" from the urn, but caller must provide an address.
         return Ilk(name, rate=Ray(rate), ink=Wad(0), art=Wad(art), spot=Ray(spot), line=Rad(line), dust=Rad(dust))
@@ -362,11 +377,11 @@ class Vat(Contract):
 
         return Rad(self._contract.functions.sin(urn.address).call())
 
-    def urn(self, ilk: Ilk, address: Address) -> Urn:
+    def urn(self, ilk: Ilk, address: Address, block_identifier='latest') -> Urn:
         assert isinstance(ilk, Ilk)
         assert isinstance(address, Address)
 
-        (ink, art) = self._contract.functions.urns(ilk.toBytes(), address.address).call()
+        (ink, art) = self._call('urns', [ilk.toBytes(), address.address], block_identifier)
         return Urn(address, ilk, Wad(ink), Wad(art))
 
     def urns(self, ilk=None, from_block=0) -> dict:
@@ -535,11 +550,12 @@ class Vat(Contract):
         assert rate != Ray(0)
         assert self.live()
 
-    def past_frobs(self, number_of_past_blocks: int, ilk=None) -> List[LogFrob]:
+    def past_frobs(self, number_of_past_blocks: int, ilk=None, executor: Optional[Executor] = None) -> List[LogFrob]:
         """Synchronously retrieve a list showing which ilks and urns have been frobbed.
          Args:
             number_of_past_blocks: Number of past Ethereum blocks to retrieve the events from.
             ilk: Optionally filter frobs by ilk.name
+            executor: Optional `ProcessPoolExecutor` to decode the events in, see :py:func:`pymaker.events.decode_logs`.
          Returns:
             List of past `LogFrob` events represented as :py:class:`pymaker.dss.Vat.LogFrob` class.
         """
@@ -554,17 +570,24 @@ class Vat(Contract):
         }
 
         logs = self.web3.eth.getLogs(filter_params)
-
-        lognotes = list(map(lambda l: LogNote.from_event(l, Vat.abi), logs))
-        # '0x7cdd3fde' is Vat.slip (from GemJoin.join) and '0x76088703' is Vat.frob
-        logfrobs = list(filter(lambda l: l.sig == '0x76088703', lognotes))
-        logfrobs = list(map(lambda l: Vat.LogFrob(l), logfrobs))
+        logfrobs = decode_logs(_decode_frob, logs, executor)
 
         if ilk is not None:
             logfrobs = list(filter(lambda l: l.ilk == ilk.name, logfrobs))
 
         return logfrobs
 
+    def on_frob(self, subscriptions: LogSubscriptions, handler) -> LogSubscription:
+        """Subscribe to new frobs.
+
+        Args:
+            subscriptions: Subscriptions to register with, i.e. `Lifecycle.subscriptions`.
+            handler: Function which will be called with each new frob, as :py:class:`pymaker.dss.Vat.LogFrob`.
+        """
+        assert isinstance(subscriptions, LogSubscriptions)
+
+        return subscriptions.subscribe(self.address, ['0x76088703' + '00' * 28], _decode_frob, handler)
+
     def heal(self, vice: Rad) -> Transact:
         assert isinstance(vice, Rad)
 
@@ -578,6 +601,16 @@ class Vat(Contract):
         return f"Vat('{self.address}')"
 
 
+def _decode_frob(log: dict) -> Optional[Vat.LogFrob]:
+    lognote = LogNote.from_log(log, VAT_LAYOUT)
+
+    # '0x7cdd3fde' is Vat.slip (from GemJoin.join) and '0x76088703' is Vat.frob
+    if lognote is not None and lognote.sig == '0x76088703':
+        return Vat.LogFrob(lognote)
+    else:
+        return None
+
+
 class Spotter(Contract):
     """A client for the `Spotter` contract, which interacts with Vat for the purpose of managing collateral prices.
     Users generally have no need to interact with this contract; it is included for unit testing purposes.
@@ -607,9 +640,9 @@ class Spotter(Contract):
     def par(self) -> Ray:
         return Ray(self._contract.functions.par().call())
 
-    def mat(self, ilk: Ilk) -> Ray:
+    def mat(self, ilk: Ilk, block_identifier='latest') -> Ray:
         assert isinstance(ilk, Ilk)
-        (pip, mat) = self._contract.functions.ilks(ilk.toBytes()).call()
+        (pip, mat) = self._call('ilks', [ilk.toBytes()], block_identifier)
 
         return Ray(mat)
 
@@ -746,15 +779,15 @@ class Jug(Contract):
     def base(self) -> Ray:
         return Ray(self._contract.functions.base().call())
 
-    def duty(self, ilk: Ilk) -> Ray:
+    def duty(self, ilk: Ilk, block_identifier='latest') -> Ray:
         assert isinstance(ilk, Ilk)
 
-        return Ray(self._contract.functions.ilks(ilk.toBytes()).call()[0])
+        return Ray(self._call('ilks', [ilk.toBytes()], block_identifier)[0])
 
-    def rho(self, ilk: Ilk) -> int:
+    def rho(self, ilk: Ilk, block_identifier='latest') -> int:
         assert isinstance(ilk, Ilk)
 
-        return Web3.toInt(self._contract.functions.ilks(ilk.toBytes()).call()[1])
+        return Web3.toInt(self._call('ilks', [ilk.toBytes()], block_identifier)[1])
 
     def __repr__(self):
         return f"Jug('{self.address}')"
@@ -768,15 +801,70 @@ class Cat(Contract):
     """
 
     # This information is read from the `Bite` event emitted from `Cat.bite`
-    class LogBite:
+    class LogBite(EventRecord):
+        __slots__ = ('_ilk', '_urn', 'ink', 'art', 'tab', 'flip', 'log_index', 'transaction_index',
+                     'address', '_block_hash')
+
+        _columns = {'_ilk': CategoryColumn,
+                    '_urn': CategoryColumn,
+                    'ink': partial(AmountColumn, Wad),
+                    'art': partial(AmountColumn, Wad),
+                    'tab': partial(AmountColumn, Rad),
+                    'flip': CategoryColumn,
+                    'block': IntColumn,
+                    '_tx_hash': BytesColumn,
+                    'log_index': IntColumn,
+                    'transaction_index': IntColumn,
+                    'address': CategoryColumn,
+                    '_block_hash': BytesColumn}
+
         def __init__(self, log):
-            self.ilk = Ilk.fromBytes(log['args']['ilk'])
-            self.urn = Urn(Address(log['args']['urn']))
+            self._ilk = Ilk.fromBytes(log['args']['ilk']).name
+            self._urn = Address(log['args']['urn'])
             self.ink = Wad(log['args']['ink'])
             self.art = Wad(log['args']['art'])
             self.tab = Rad(log['args']['tab'])
             self.flip = Address(log['args']['flip'])
-            self.raw = log
+            self.block = log['blockNumber']
+            self._tx_hash = bytes(log['transactionHash'])
+            self.log_index = log['logIndex']
+            self.transaction_index = log['transactionIndex']
+            self.address = Address(log['address'])
+            self._block_hash = bytes(log['blockHash'])
+
+        @property
+        def ilk(self) -> Ilk:
+            return Ilk(self._ilk)
+
+        @property
+        def block_hash(self) -> str:
+            return '0x' + self._block_hash.hex()
+
+        @property
+        def urn(self) -> Urn:
+            return Urn(self._urn)
+
+        @property
+        def location(self) -> dict:
+            """Location of the event, i.e. to look up its receipt."""
+            return {'blockNumber': self.block, 'transactionHash': HexBytes(self._tx_hash), 'logIndex': self.log_index}
+
+        @property
+        def raw(self) -> AttributeDict:
+            """The decoded log entry, as returned by `web3.py`.
+
+            Deprecated, as the entry is not kept to keep the record compact but rebuilt from its fields
+            on every access. Use the fields of the record or `location` instead.
+            """
+            warnings.warn("Cat.LogBite.raw is deprecated, use the fields of the record or `location` instead",
+                          DeprecationWarning, stacklevel=2)
+
+            args = AttributeDict({'ilk': Ilk(self._ilk).toBytes(), 'urn': self._urn.address, 'ink': self.ink.value,
+                                  'art': self.art.value, 'tab': self.tab.value, 'flip': self.flip.address})
+            return AttributeDict({'args': args, 'event': 'Bite', 'logIndex': self.log_index,
+                                  'transactionIndex': self.transaction_index,
+                                  'transactionHash': HexBytes(self._tx_hash), 'address': self.address.address,
+                                  'blockHash': HexBytes(self._block_hash), 'blockNumber': self.block})
 
         @classmethod
         def from_event(cls, event: dict):
@@ -785,7 +873,6 @@ class Cat(Contract):
             topics = event.get('topics')
             if topics and topics[0] == HexBytes('0x99b5620489b6ef926d4518936cfec15d305452712b88bd59da2d9c10fb0953e8'):
                 log_bite_abi = [abi for abi in Cat.abi if abi.get('name') == 'Bite'][0]
-                codec = ABICodec(default_registry)
                 event_data = get_event_data(codec, log_bite_abi, event)
 
                 return Cat.LogBite(event_data)
@@ -793,14 +880,10 @@ class Cat(Contract):
                 logging.warning(f'[from_event] Invalid topic in {event}')
 
         def era(self, web3: Web3):
-            return web3.eth.getBlock(self.raw['blockNumber'])['timestamp']
-
-        def __eq__(self, other):
-            assert isinstance(other, Cat.LogBite)
-            return self.__dict__ == other.__dict__
+            return block_cache(web3).timestamp(self.block)
 
         def __repr__(self):
-            return pformat(vars(self))
+            return pformat(self.to_dict())
 
     abi = Contract._load_abi(__name__, 'abi/Cat.abi')
     bin = Contract._load_bin(__name__, 'abi/Cat.bin')
@@ -837,16 +920,16 @@ class Cat(Contract):
         return Transact(self, self.web3, self.abi, self.address, self._contract,
                         'bite', [ilk.toBytes(), urn.address.address])
 
-    def lump(self, ilk: Ilk) -> Wad:
+    def lump(self, ilk: Ilk, block_identifier='latest') -> Wad:
         assert isinstance(ilk, Ilk)
 
-        (flip, chop, lump) = self._contract.functions.ilks(ilk.toBytes()).call()
+        (flip, chop, lump) = self._call('ilks', [ilk.toBytes()], block_identifier)
         return Wad(lump)
 
-    def chop(self, ilk: Ilk) -> Ray:
+    def chop(self, ilk: Ilk, block_identifier='latest') -> Ray:
         assert isinstance(ilk, Ilk)
 
-        (flip, chop, lump) = self._contract.functions.ilks(ilk.toBytes()).call()
+        (flip, chop, lump) = self._call('ilks', [ilk.toBytes()], block_identifier)
         return Ray(chop)
 
     def file_vow(self, vow: Vow) -> Transact:
@@ -855,13 +938,14 @@ class Cat(Contract):
         return Transact(self, self.web3, self.abi, self.address, self._contract,
                         'file(bytes32,address)', [Web3.toBytes(text="vow"), vow.address.address])
 
-    def flipper(self, ilk: Ilk) -> Address:
+    def flipper(self, ilk: Ilk, block_identifier='latest') -> Address:
         assert isinstance(ilk, Ilk)
 
-        (flip, chop, lump) = self._contract.functions.ilks(ilk.toBytes()).call()
+        (flip, chop, lump) = self._call('ilks', [ilk.toBytes()], block_identifier)
         return Address(flip)
 
-    def past_bites(self, number_of_past_blocks: int, event_filter: dict = None) -> List[LogBite]:
+    def past_bites(self, number_of_past_blocks: int, event_filter: dict = None,
+                   executor: Optional[Executor] = None) -> List[LogBite]:
         """Synchronously retrieve past LogBite events.
 
         `LogBite` events are emitted every time someone bites a CDP.
@@ -869,6 +953,7 @@ class Cat(Contract):
         Args:
             number_of_past_blocks: Number of past Ethereum blocks to retrieve the events from.
             event_filter: Filter which will be applied to returned events.
+            executor: Optional `ProcessPoolExecutor` to decode the events in, see :py:func:`pymaker.events.decode_logs`.
 
         Returns:
             List of past `LogBite` events represented as :py:class:`pymaker.dss.Cat.LogBite` class.
@@ -876,7 +961,18 @@ class Cat(Contract):
         assert isinstance(number_of_past_blocks, int)
         assert isinstance(event_filter, dict) or (event_filter is None)
 
-        return self._past_events(self._contract, 'Bite', Cat.LogBite, number_of_past_blocks, event_filter)
+        return self._past_events(self._contract, 'Bite', Cat.LogBite, number_of_past_blocks, event_filter, executor)
+
+    def on_bite(self, subscriptions: LogSubscriptions, handler) -> LogSubscription:
+        """Subscribe to new bites.
+
+        Args:
+            subscriptions: Subscriptions to register with, i.e. `Lifecycle.subscriptions`.
+            handler: Function which will be called with each new bite, as :py:class:`pymaker.dss.Cat.LogBite`.
+        """
+        assert isinstance(subscriptions, LogSubscriptions)
+
+        return self._on_event(self._contract, 'Bite', Cat.LogBite, subscriptions, handler)
 
     def __repr__(self):
         return f"Cat('{self.address}')"
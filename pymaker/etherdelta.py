@@ -26,7 +26,7 @@ from typing import List
 
 from web3 import Web3
 
-from pymaker import Contract, Address, Transact
+from pymaker import Contract, Address, Transact, ZERO_ADDRESS
 from pymaker.numeric import Wad
 from pymaker.sign import eth_sign, to_vrs
 from pymaker.tightly_packed import encode_address, encode_uint256
@@ -174,7 +174,7 @@ class EtherDelta(Contract):
     abi = Contract._load_abi(__name__, 'abi/EtherDelta.abi')
     bin = Contract._load_bin(__name__, 'abi/EtherDelta.bin')
 
-    ETH_TOKEN = Address('0x0000000000000000000000000000000000000000')
+    ETH_TOKEN = ZERO_ADDRESS
 
     @staticmethod
     def deploy(web3: Web3,
@@ -393,7 +393,7 @@ class EtherDelta(Contract):
         before placing an order, nobody will be able to take this order until some balance of
         'pay_token' is provided.
 
-        If you want to trade raw ETH, pass `Address('0x0000000000000000000000000000000000000000')`
+        If you want to trade raw ETH, pass `pymaker.ZERO_ADDRESS`
         as either `pay_token` or `buy_token`.
 
         Args:
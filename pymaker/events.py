@@ -0,0 +1,332 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 MakerDAO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from array import array
+from concurrent.futures import Executor
+from functools import partial
+from itertools import chain
+from pprint import pformat
+from typing import Callable, Iterable, Optional
+
+
+class EventRecord:
+    """Base class of compact event records, i.e. :py:class:`pymaker.dss.Vat.LogFrob`.
+
+    Subclasses declare their fields in `__slots__`, so records carry no per-instance `__dict__`.
+    The block number is kept as an `int` and the transaction hash as 32 raw bytes, the usual
+    hexadecimal representation is available as the `tx_hash` property.
+
+    Fields whose names start with an underscore are exposed under their public name by a property
+    of the subclass, i.e. `_tx_hash` as `tx_hash`. Subclasses which can be stored in an
+    :py:class:`pymaker.events.EventTable` declare a `_columns` dictionary, mapping field
+    names to column factories.
+
+    Attributes:
+        block: Number of the block the event has been emitted in.
+    """
+    __slots__ = ('block', '_tx_hash')
+
+    _columns = None
+
+    @property
+    def tx_hash(self) -> str:
+        return '0x' + self._tx_hash.hex()
+
+    @classmethod
+    def _fields(cls) -> tuple:
+        if '_fields_cache' not in cls.__dict__:
+            fields = []
+            for klass in reversed(cls.__mro__):
+                for name in klass.__dict__.get('__slots__', ()):
+                    if name not in fields:
+                        fields.append(name)
+
+            cls._fields_cache = tuple(fields)
+
+        return cls._fields_cache
+
+    @classmethod
+    def _from_fields(cls, fields: dict):
+        record = cls.__new__(cls)
+        for name, value in fields.items():
+            setattr(record, name, value)
+
+        return record
+
+    def to_dict(self) -> dict:
+        """Returns the fields of the record, using public names and values where available."""
+        result = {}
+        for name in self._fields():
+            public_name = name.lstrip('_')
+            if public_name != name and isinstance(getattr(type(self), public_name, None), property):
+                result[public_name] = getattr(self, public_name)
+            else:
+                result[name] = getattr(self, name)
+
+        return result
+
+    def __eq__(self, other):
+        assert isinstance(other, EventRecord)
+        return type(self) is type(other) and all(getattr(self, name) == getattr(other, name)
+                                                 for name in self._fields())
+
+    def __hash__(self):
+        return hash((type(self), self.block, self._tx_hash))
+
+    def __repr__(self):
+        return f"{type(self).__qualname__}({pformat(self.to_dict())})"
+
+
+class IntColumn:
+    """Column of machine-sized integers, i.e. block numbers or auction ids."""
+    def __init__(self, typecode: str = 'q'):
+        self.data = array(typecode)
+
+    def append(self, value):
+        self.data.append(value)
+
+    def __getitem__(self, index: int):
+        return self.data[index]
+
+    def __len__(self):
+        return len(self.data)
+
+
+class BytesColumn:
+    """Column of fixed-size byte strings, i.e. 32-byte transaction hashes, kept in a single `bytearray`."""
+    def __init__(self, size: int = 32):
+        self.size = size
+        self.data = bytearray()
+
+    def append(self, value: bytes):
+        assert len(value) == self.size
+        self.data += value
+
+    def __getitem__(self, index: int) -> bytes:
+        return bytes(self.data[index*self.size:(index+1)*self.size])
+
+    def __len__(self):
+        return len(self.data) // self.size
+
+
+class AmountColumn:
+    """Column of 256-bit amounts, i.e. `Wad` or `Rad`, packed as 32-byte big-endian words.
+
+    Args:
+        wrapper: Type the raw integers get wrapped in when read, i.e. `Wad`. Values appended
+            to the column are expected to be instances of this type as well.
+        signed: Whether the amounts can be negative.
+    """
+    def __init__(self, wrapper=None, signed: bool = False):
+        self.wrapper = wrapper
+        self.signed = signed
+        self.data = bytearray()
+
+    def append(self, value):
+        raw = value.value if self.wrapper is not None else value
+        self.data += raw.to_bytes(32, 'big', signed=self.signed)
+
+    def raw(self, index: int) -> int:
+        return int.from_bytes(self.data[index*32:(index+1)*32], 'big', signed=self.signed)
+
+    def __getitem__(self, index: int):
+        return self.wrapper(self.raw(index)) if self.wrapper is not None else self.raw(index)
+
+    def __len__(self):
+        return len(self.data) // 32
+
+
+class CategoryColumn:
+    """Dictionary-encoded column for values which repeat a lot, i.e. ilk names or urn addresses.
+
+    Each distinct value is kept only once, rows hold 32-bit codes pointing to it.
+
+    Args:
+        key: Optional function normalizing values before they get compared, it gets applied both
+            to the stored values and to the values the column gets filtered by.
+    """
+    def __init__(self, key=None):
+        self.key = key
+        self.values = []
+        self.codes = array('I')
+        self._index = {}
+
+    def code(self, value) -> Optional[int]:
+        """Returns the code of a value, or `None` if the value does not occur in the column."""
+        return self._index.get(self.key(value) if self.key is not None else value)
+
+    def append(self, value):
+        key = self.key(value) if self.key is not None else value
+        code = self._index.get(key)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self._index[key] = code
+
+        self.codes.append(code)
+
+    def __getitem__(self, index: int):
+        return self.values[self.codes[index]]
+
+    def __len__(self):
+        return len(self.codes)
+
+
+class EventTable:
+    """Columnar container of event records of a single type.
+
+    Records get decomposed into columns on `append`, so no Python object is kept per event.
+    Filtering and grouping work on the columns and return views sharing them, records only get
+    materialized when accessed by index or iterated over.
+
+    The typical usage pattern is as follows:
+
+        frobs = EventTable.from_records(Vat.LogFrob, vat.past_frobs(100000))
+        for urn, urn_frobs in frobs.filter(ilk='ETH-A').group_by('urn').items():
+            ...
+
+    Args:
+        record_class: Subclass of :py:class:`pymaker.events.EventRecord` declaring `_columns`.
+    """
+    def __init__(self, record_class, columns: Optional[dict] = None, indices: Optional[array] = None):
+        assert issubclass(record_class, EventRecord)
+        assert record_class._columns is not None
+
+        self.record_class = record_class
+        self.columns = columns if columns is not None else {name: factory()
+                                                            for name, factory in record_class._columns.items()}
+        self._indices = indices
+
+    @classmethod
+    def from_records(cls, record_class, records: Iterable[EventRecord]) -> 'EventTable':
+        table = cls(record_class)
+        table.extend(records)
+        return table
+
+    def append(self, record: EventRecord):
+        assert isinstance(record, self.record_class)
+        assert self._indices is None, "Records can not be appended to a filtered view"
+
+        for name, column in self.columns.items():
+            column.append(getattr(record, name))
+
+    def extend(self, records: Iterable[EventRecord]):
+        for record in records:
+            self.append(record)
+
+    def _column(self, name: str):
+        if name in self.columns:
+            return self.columns[name]
+        elif f"_{name}" in self.columns:
+            return self.columns[f"_{name}"]
+        else:
+            raise KeyError(f"{self.record_class.__qualname__} has no '{name}' column")
+
+    def _rows(self):
+        return self._indices if self._indices is not None else range(len(next(iter(self.columns.values()))))
+
+    def values(self, name: str) -> list:
+        """Returns values of a single column, without materializing the records."""
+        column = self._column(name)
+        return [column[row] for row in self._rows()]
+
+    def filter(self, **criteria) -> 'EventTable':
+        """Returns a view of the records matching all `criteria`.
+
+        Only dictionary-encoded columns can be filtered by, i.e. `filter(ilk='ETH-A', urn=address)`.
+        """
+        rows = self._rows()
+        for name, value in criteria.items():
+            column = self._column(name)
+            assert isinstance(column, CategoryColumn), f"Column '{name}' can not be filtered by"
+
+            code = column.code(value)
+            codes = column.codes
+            rows = array('I', (row for row in rows if codes[row] == code)) if code is not None else array('I')
+
+        return EventTable(self.record_class, self.columns, array('I', rows))
+
+    def between(self, from_block: int, to_block: int) -> 'EventTable':
+        """Returns a view of the records emitted in blocks from `from_block` to `to_block`, inclusive."""
+        blocks = self._column('block')
+        return EventTable(self.record_class, self.columns,
+                          array('I', (row for row in self._rows() if from_block <= blocks[row] <= to_block)))
+
+    def group_by(self, name: str) -> dict:
+        """Splits the records by the value of a dictionary-encoded column.
+
+        Returns:
+            Dictionary mapping the distinct values of the column to views of the matching records.
+        """
+        column = self._column(name)
+        assert isinstance(column, CategoryColumn), f"Column '{name}' can not be grouped by"
+
+        groups = {}
+        codes = column.codes
+        for row in self._rows():
+            groups.setdefault(codes[row], array('I')).append(row)
+
+        return {column.values[code]: EventTable(self.record_class, self.columns, rows)
+                for code, rows in groups.items()}
+
+    def __len__(self):
+        return len(self._rows())
+
+    def __getitem__(self, index: int) -> EventRecord:
+        row = self._rows()[index]
+        return self.record_class._from_fields({name: column[row] for name, column in self.columns.items()})
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __repr__(self):
+        return f"EventTable({self.record_class.__qualname__}, {len(self)} records)"
+
+
+def _decode_chunk(decoder: Callable, logs: list) -> list:
+    return [record for record in map(decoder, logs) if record is not None]
+
+
+def decode_logs(decoder: Callable, logs: list, executor: Optional[Executor] = None, chunk_size: int = 1000) -> list:
+    """Decodes raw logs, optionally in parallel.
+
+    Decoding is CPU-bound, so for bulk history scans it can be spread over all cores by passing
+    a :py:class:`concurrent.futures.ProcessPoolExecutor`. Logs are sent to the workers in chunks
+    of `chunk_size`, decoded records get sent back. In this case `decoder` needs to be picklable,
+    i.e. a module-level function or a `functools.partial` of one, and so do the records it returns.
+    :py:class:`pymaker.events.EventRecord` subclasses are.
+
+    Args:
+        decoder: Function turning a raw log into a record, or returning `None` for logs to be skipped.
+        logs: Raw log entries, as returned by `eth_getLogs`.
+        executor: Optional executor to decode the logs in, they get decoded in the calling thread if `None`.
+        chunk_size: Number of logs sent to a worker at once.
+
+    Returns:
+        List of decoded records, in the order of `logs`.
+    """
+    assert callable(decoder)
+    assert isinstance(logs, list)
+    assert isinstance(executor, Executor) or executor is None
+    assert isinstance(chunk_size, int) and chunk_size > 0
+
+    if executor is None or len(logs) <= chunk_size:
+        return _decode_chunk(decoder, logs)
+
+    chunks = [logs[index:index+chunk_size] for index in range(0, len(logs), chunk_size)]
+    return list(chain.from_iterable(executor.map(partial(_decode_chunk, decoder), chunks)))
@@ -22,6 +22,7 @@ from pprint import pformat
 
 from pymaker import Contract, Address, Transact, Wad
 from pymaker.auth import DSAuth
+from pymaker.subscriptions import LogSubscription, LogSubscriptions
 from pymaker.token import DSToken
 
 
@@ -255,3 +256,14 @@ class DSChief(Contract):
         assert(isinstance(event_filter, dict) or (event_filter is None))
 
         return self._past_events_in_block_range(self._contract, 'Etch', Etch, from_block, to_block, event_filter)
+
+    def on_etch(self, subscriptions: LogSubscriptions, handler) -> LogSubscription:
+        """Subscribe to new Etch events.
+
+        Args:
+            subscriptions: Subscriptions to register with, i.e. `Lifecycle.subscriptions`.
+            handler: Function which will be called with each new event, as :py:class:`pymaker.governance.Etch`.
+        """
+        assert(isinstance(subscriptions, LogSubscriptions))
+
+        return self._on_event(self._contract, 'Etch', Etch, subscriptions, handler)
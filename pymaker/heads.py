@@ -0,0 +1,141 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 MakerDAO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Callable
+
+import websockets
+
+from pymaker.blocks import BlockHeader
+
+
+class NewHeadsListener:
+    """Receives new block headers pushed by the node, using an `eth_subscribe('newHeads')` subscription.
+
+    The subscription runs over a websocket connection of its own, either in a background thread with
+    its own event loop (see `start`), or on the current event loop (see `listen`). Every header received
+    gets passed to `callback`, from that thread or that event loop respectively. If the connection fails
+    or gets closed, the listener reconnects after `reconnect_delay` seconds for as long as it is running.
+    `connected` can be used to fall back to polling in the meantime.
+
+    Args:
+        endpoint_uri: Websocket endpoint of the node, i.e. `ws://localhost:8546`.
+        callback: Function to be called with each new :py:class:`pymaker.blocks.BlockHeader`.
+        reconnect_delay: Delay before reconnecting (in seconds).
+    """
+    logger = logging.getLogger()
+
+    def __init__(self, endpoint_uri: str, callback: Callable[[BlockHeader], None], reconnect_delay: float = 5):
+        assert isinstance(endpoint_uri, str)
+        assert callable(callback)
+        assert isinstance(reconnect_delay, (int, float))
+
+        self.endpoint_uri = endpoint_uri
+        self.callback = callback
+        self.reconnect_delay = reconnect_delay
+
+        self.connected = False
+        self.last_header_time = None
+        self._running = False
+        self._thread = None
+        self._loop = None
+        self._task = None
+
+    def start(self):
+        assert self._thread is None, "Listener has already been started"
+
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._task is not None:
+            self._loop.call_soon_threadsafe(self._task.cancel)
+
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+    async def listen(self):
+        """Listens on the current event loop instead of a thread of its own, until cancelled.
+
+        `callback` is called from the event loop in that case, so it must not block."""
+        self._running = True
+        try:
+            await self._listen_forever()
+        finally:
+            self._running = False
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        self._task = self._loop.create_task(self._listen_forever())
+        try:
+            self._loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._loop.close()
+
+    async def _listen_forever(self):
+        while self._running:
+            try:
+                await self._listen()
+                self.logger.warning(f"Subscription to new heads at {self.endpoint_uri} closed by the node,"
+                                    f" reconnecting in {self.reconnect_delay} seconds")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.warning(f"Subscription to new heads at {self.endpoint_uri} failed ({e}),"
+                                    f" reconnecting in {self.reconnect_delay} seconds")
+            finally:
+                self.connected = False
+
+            if self._running:
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def _listen(self):
+        async with websockets.connect(self.endpoint_uri) as websocket:
+            await websocket.send(json.dumps({'jsonrpc': '2.0', 'id': 1,
+                                             'method': 'eth_subscribe', 'params': ['newHeads']}))
+
+            response = json.loads(await websocket.recv())
+            if 'result' not in response:
+                raise Exception(f"Subscription refused: {response.get('error')}")
+
+            subscription_id = response['result']
+            self.connected = True
+            self.logger.info(f"Subscribed to new heads at {self.endpoint_uri}")
+
+            async for message in websocket:
+                notification = json.loads(message)
+                params = notification.get('params', {})
+                if notification.get('method') == 'eth_subscription' and params.get('subscription') == subscription_id:
+                    self.last_header_time = time.time()
+                    self._handle(BlockHeader.from_rpc(params['result']))
+
+    def _handle(self, header: BlockHeader):
+        try:
+            self.callback(header)
+        except:
+            self.logger.exception(f"Failed to process new head #{header.number}")
+
+    def __repr__(self):
+        return f"NewHeadsListener('{self.endpoint_uri}')"
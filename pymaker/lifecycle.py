@@ -15,18 +15,28 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import asyncio
 import datetime
+import inspect
 import logging
 import signal
 import threading
 import time
+from functools import partial
+from typing import Optional
 
 import pytz
+from hexbytes import HexBytes
 from pymaker.sign import eth_sign
-from web3 import Web3
+from web3 import Web3, WebsocketProvider
 
 from pymaker import register_filter_thread, any_filter_thread_present, stop_all_filter_threads, all_filter_threads_alive
-from pymaker.util import AsyncCallback
+from pymaker.blocks import BlockCancelled, BlockContext, BlockHeader, BlockStream, block_cache, inherit_block_context
+from pymaker.heads import NewHeadsListener
+from pymaker.metrics import InMemoryMetrics, MetricsServer, MetricsSink
+from pymaker.pipeline import Pipeline, ProcessCallback, start_worker_pool
+from pymaker.scheduler import Scheduler
+from pymaker.subscriptions import LogSubscriptions
 
 
 def trigger_event(event: threading.Event):
@@ -35,6 +45,13 @@ def trigger_event(event: threading.Event):
     event.set()
 
 
+def _requires_argument(callback) -> bool:
+    # parameters with default values, `*args` and `**kwargs` can all be left out
+    return any(parameter.default is inspect.Parameter.empty
+               and parameter.kind in (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD)
+               for parameter in inspect.signature(callback).parameters.values())
+
+
 class Lifecycle:
     """Main keeper lifecycle controller.
 
@@ -52,7 +69,11 @@ class Lifecycle:
     Other quirk is the new block filter callback taking more time to execute that
     the time between subsequent blocks. If you do not handle it explicitly,
     the event queue will pile up and the keeper won't work as expected.
-    `Lifecycle` used :py:class:`pymaker.util.AsyncCallback` to handle it properly.
+    `Lifecycle` ignores new blocks while the previous callback is still running.
+
+    All callbacks run on a bounded pool of worker threads, timers and events are driven
+    by a single scheduler thread, see :py:class:`pymaker.scheduler.Scheduler`. The number of
+    runs, skipped runs and overruns of each callback are available in `scheduler.callbacks`.
 
     It also handles:
     - waiting for the node to have at least one peer and sync before starting the keeper,
@@ -71,13 +92,29 @@ class Lifecycle:
 
     once called like that, `Lifecycle` will enter an infinite loop.
 
+    Live events of contracts can be subscribed to using `subscriptions`, logs of each new block
+    are then fetched once for all of them, i.e. `vat.on_frob(lifecycle.subscriptions, self.handle_frob)`.
+    Chain reorganizations and confirmed blocks are reported by `block_stream`, i.e.
+    `lifecycle.block_stream.on_reorg(self.rebuild_order_book)`.
+
     Attributes:
         web3: Instance of the `Web3` class from `web3.py`. Optional.
+        subscriptions: Live log subscriptions, see :py:class:`pymaker.subscriptions.LogSubscriptions`.
+            Only available if `web3` has been passed.
+        block_stream: Stream of new blocks, see :py:class:`pymaker.blocks.BlockStream`.
+            Only available if `web3` has been passed.
+        pipeline: Pipeline registered with `on_block_pipeline`, see :py:class:`pymaker.pipeline.Pipeline`.
+        metrics_sink: Destination of callback metrics, see `report_metrics`.
+        metrics_server: Server exposing the metrics, if requested with `report_metrics`.
+        scheduler: Runs all the callbacks, see :py:class:`pymaker.scheduler.Scheduler`.
     """
     logger = logging.getLogger()
 
     def __init__(self, web3: Web3 = None):
         self.web3 = web3
+        self.subscriptions = LogSubscriptions(web3) if web3 is not None else None
+        self.block_stream = BlockStream(web3) if web3 is not None else None
+        self.scheduler = Scheduler()
 
         self.do_wait_for_sync = True
         self.delay = 0
@@ -85,6 +122,9 @@ class Lifecycle:
         self.startup_function = None
         self.shutdown_function = None
         self.block_function = None
+        self.pipeline = None
+        self.metrics_sink = None
+        self.metrics_server = None
         self.every_timers = []
         self.event_timers = []
 
@@ -94,54 +134,26 @@ class Lifecycle:
         self._at_least_one_every = False
         self._last_block_time = None
         self._on_block_callback = None
+        self._block_function_takes_context = False
+        self._last_triggered_block = None
+        self._cancel_stale_blocks = False
+        self._stale_block_lock = threading.Lock()
+        self._block_in_progress = None
+        self._pending_header = None
+        self._new_block_lock = threading.Lock()
+        self._new_heads_endpoint = None
+        self._new_heads_listener = None
+        self._process_callbacks = []
+        self._process_pool = None
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        # Initialization phase
-        if self.web3:
-            self.logger.info(f"Keeper connected to {self.web3.provider}")
-            if self.web3.eth.defaultAccount and self.web3.eth.defaultAccount != "0x0000000000000000000000000000000000000000":
-                self.logger.info(f"Keeper operating as {self.web3.eth.defaultAccount}")
-                self._check_account_unlocked()
-            else:
-                self.logger.info(f"Keeper not operating as any particular account")
-                # web3 calls do not work correctly if defaultAccount is empty
-                self.web3.eth.defaultAccount = "0x0000000000000000000000000000000000000000"
-        else:
-            self.logger.info(f"Keeper initializing")
-
-        # Wait for sync and peers
-        if self.web3 and self.do_wait_for_sync:
-            self._wait_for_init()
-
-        # Initial delay
-        if self.delay > 0:
-            self.logger.info(f"Waiting for {self.delay} seconds of initial delay...")
-            time.sleep(self.delay)
-
-        # Initial checks
-        if len(self.wait_for_functions) > 0:
-            self.logger.info("Waiting for initial checks to pass...")
-
-            for index, (wait_for_function, max_wait) in enumerate(self.wait_for_functions, start=1):
-                start_time = time.time()
-                while True:
-                    try:
-                        result = wait_for_function()
-                    except Exception as e:
-                        self.logger.exception(f"Initial check #{index} failed with an exception: '{e}'")
-                        result = False
-
-                    if result:
-                        break
-
-                    if time.time() - start_time >= max_wait:
-                        self.logger.warning(f"Initial check #{index} took more than {max_wait} seconds to pass, skipping")
-                        break
-
-                    time.sleep(0.1)
+        self._start_worker_processes()
+        self._initialize()
+        if self.metrics_server is not None:
+            self.metrics_server.start()
 
         # Startup phase
         if self.startup_function:
@@ -150,6 +162,7 @@ class Lifecycle:
 
         # Bind `on_block`, bind `every`
         # Enter the main loop
+        self.scheduler.start()
         self._start_watching_blocks()
         self._start_every_timers()
         self._main_loop()
@@ -158,6 +171,9 @@ class Lifecycle:
         self.logger.info("Shutting down the keeper")
 
         # Disable all filters
+        if self._new_heads_listener is not None:
+            self._new_heads_listener.stop()
+
         if any_filter_thread_present():
             self.logger.info("Waiting for all threads to terminate...")
             stop_all_filter_threads()
@@ -167,6 +183,10 @@ class Lifecycle:
             self.logger.info("Waiting for outstanding callback to terminate...")
             self._on_block_callback.wait()
 
+        # Let the pipeline process the blocks already passed to it
+        if self.pipeline is not None:
+            self.pipeline.stop()
+
         # If any every (timer) callback is still running, wait for it to terminate
         if len(self.every_timers) > 0:
             self.logger.info("Waiting for outstanding timers to terminate...")
@@ -179,14 +199,64 @@ class Lifecycle:
             for timer in self.event_timers:
                 timer[2].wait()
 
+        self.scheduler.stop()
+        self._stop_worker_processes()
+
         # Shutdown phase
         if self.shutdown_function:
             self.logger.info("Executing keeper shutdown logic...")
             self.shutdown_function()
             self.logger.info("Shutdown logic finished")
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
         self.logger.info("Keeper terminated")
         exit(10 if self.fatal_termination else 0)
 
+    def _initialize(self):
+        # Initialization phase
+        if self.web3:
+            self.logger.info(f"Keeper connected to {self.web3.provider}")
+            if self.web3.eth.defaultAccount and self.web3.eth.defaultAccount != "0x0000000000000000000000000000000000000000":
+                self.logger.info(f"Keeper operating as {self.web3.eth.defaultAccount}")
+                self._check_account_unlocked()
+            else:
+                self.logger.info(f"Keeper not operating as any particular account")
+                # web3 calls do not work correctly if defaultAccount is empty
+                self.web3.eth.defaultAccount = "0x0000000000000000000000000000000000000000"
+        else:
+            self.logger.info(f"Keeper initializing")
+
+        # Wait for sync and peers
+        if self.web3 and self.do_wait_for_sync:
+            self._wait_for_init()
+
+        # Initial delay
+        if self.delay > 0:
+            self.logger.info(f"Waiting for {self.delay} seconds of initial delay...")
+            time.sleep(self.delay)
+
+        # Initial checks
+        if len(self.wait_for_functions) > 0:
+            self.logger.info("Waiting for initial checks to pass...")
+
+            for index, (wait_for_function, max_wait) in enumerate(self.wait_for_functions, start=1):
+                start_time = time.time()
+                while True:
+                    try:
+                        result = wait_for_function()
+                    except Exception as e:
+                        self.logger.exception(f"Initial check #{index} failed with an exception: '{e}'")
+                        result = False
+
+                    if result:
+                        break
+
+                    if time.time() - start_time >= max_wait:
+                        self.logger.warning(f"Initial check #{index} took more than {max_wait} seconds to pass, skipping")
+                        break
+
+                    time.sleep(0.1)
+
     def _wait_for_init(self):
         # In unit-tests waiting for the node to sync does not work correctly.
         # So we skip it.
@@ -277,19 +347,129 @@ class Lifecycle:
 
         self.terminated_internally = True
 
-    def on_block(self, callback):
+    def subscribe_to_new_heads(self, endpoint_uri: Optional[str] = None):
+        """Make the node push new blocks to the keeper, instead of polling for them every second.
+
+        New blocks get received using an `eth_subscribe('newHeads')` subscription over a websocket,
+        see :py:class:`pymaker.heads.NewHeadsListener`, which cuts the delay between a block being
+        imported by the node and the `on_block` callback being called from up to a second to milliseconds.
+        Whenever the subscription is down, the keeper falls back to polling until it reconnects.
+
+        Args:
+            endpoint_uri: Websocket endpoint of the node, i.e. `ws://localhost:8546`. Can be omitted
+                if `web3` uses a `WebsocketProvider`, its endpoint is used in that case.
+        """
+        assert(isinstance(endpoint_uri, str) or (endpoint_uri is None))
+        assert(self.web3 is not None)
+
+        if endpoint_uri is None:
+            assert(isinstance(self.web3.provider, WebsocketProvider))
+            endpoint_uri = self.web3.provider.endpoint_uri
+
+        self._new_heads_endpoint = endpoint_uri
+
+    def report_metrics(self, metrics_sink: MetricsSink, port: Optional[int] = None, host: str = '127.0.0.1'):
+        """Make the keeper report metrics of its callbacks and, optionally, serve them over HTTP.
+
+        Durations of all callbacks get reported as the `lifecycle_callback_duration_seconds` histogram,
+        their failures, skipped triggers (because the previous run was still in progress) and overruns
+        of `every` periods as `lifecycle_callback_failures_total`, `lifecycle_callback_skipped_total`
+        and `lifecycle_callback_overruns_total` counters, all labelled with the `callback` name.
+        The lag between the timestamp of a block and the `on_block` callback starting to process it
+        gets reported as the `lifecycle_block_lag_seconds` histogram, the number of new blocks received
+        as the `lifecycle_blocks_total` counter.
+
+        If `port` is specified, metrics get served in the Prometheus text format under `/metrics`, see
+        :py:class:`pymaker.metrics.MetricsServer`. Setting `Transact.metrics_sink` to the same sink makes
+        transaction metrics available there as well.
+
+        Args:
+            metrics_sink: Destination of the metrics, an instance of :py:class:`pymaker.metrics.InMemoryMetrics`
+                if they are to be served.
+            port: Optional port to serve metrics on, `0` picks a free one.
+            host: Address to serve metrics on, localhost by default.
+        """
+        assert(isinstance(metrics_sink, MetricsSink))
+        assert(isinstance(port, int) or (port is None))
+        assert(isinstance(host, str))
+
+        self.metrics_sink = metrics_sink
+        self.scheduler.metrics_sink = metrics_sink
+        if port is not None:
+            assert(isinstance(metrics_sink, InMemoryMetrics))
+            self.metrics_server = MetricsServer(metrics_sink, port, host)
+
+    def on_block(self, callback, cancel_stale: bool = False, in_process: bool = False, act=None):
         """Register the specified callback to be run for each new block received by the node.
 
+        If the callback requires a positional argument, it gets called with a :py:class:`pymaker.blocks.BlockContext`
+        describing the block, including the blocks which have been skipped because the previous
+        callback run was still in progress.
+
+        By default new blocks are ignored while the callback is running. With `cancel_stale`, the block
+        being processed gets cancelled instead, which makes the callback raise :py:class:`pymaker.blocks.BlockCancelled`
+        at its next safe point (`BlockContext.read`, `BlockContext.check`, contract reads, past event
+        lookups or sending a transaction).
+        The callback is then restarted for the newest block, so the keeper never acts on state
+        more than one block old.
+
+        With `in_process`, CPU-heavy strategy code in the callback runs in a worker process, see
+        :py:class:`pymaker.pipeline.ProcessCallback`. It then gets called with the block header instead
+        of the context and its result gets passed to `act`, which runs in the keeper process and sends
+        the transactions.
+
         Args:
             callback: Function to be called for each new blocks.
+            cancel_stale: Whether to cancel processing of a block as soon as a newer one arrives.
+            in_process: Whether to run the callback in a worker process.
+            act: Function to be called with the context and the result of the callback, if run in a worker process.
         """
         assert(callable(callback))
+        assert(isinstance(cancel_stale, bool))
 
         assert(self.web3 is not None)
         assert(self.block_function is None)
-        self.block_function = callback
+        self.block_function = self._process_callback(callback, act) if in_process else callback
+        self._block_function_takes_context = _requires_argument(callback)
+        self._cancel_stale_blocks = cancel_stale
+
+    def on_block_pipeline(self, fetch, evaluate, act, queue_size: int = 1, evaluate_in_process: bool = False,
+                          max_workers: Optional[int] = None) -> Pipeline:
+        """Register a staged pipeline to be run for each new block received by the node.
+
+        `fetch` gets called with the :py:class:`pymaker.blocks.BlockContext` of a new block,
+        `evaluate` with the context and the result of `fetch`, `act` with the context and the result
+        of `evaluate`. Each stage runs on a thread of its own, so fetching state for a new block
+        overlaps evaluating and acting on the previous one. A stage returning `None` ends processing
+        of the block. See :py:class:`pymaker.pipeline.Pipeline` for details.
 
-    def on_event(self, event: threading.Event, min_frequency_in_seconds: int, callback):
+        With `evaluate_in_process`, CPU-heavy strategy code in `evaluate` runs in a pool of worker
+        processes. It then gets called with the block header and a pickled copy of the snapshot
+        returned by `fetch`, while `act` and all transactions stay in the keeper process.
+
+        Args:
+            fetch: Function reading the state the keeper needs.
+            evaluate: Function deciding what to do.
+            act: Function sending the transactions.
+            queue_size: Number of blocks each stage can have waiting, older ones get dropped.
+            evaluate_in_process: Whether to run `evaluate` in a worker process.
+            max_workers: Maximum number of worker processes, the number of processors if `None`.
+
+        Returns:
+            The pipeline, which collects per-stage latency metrics.
+        """
+        assert(callable(fetch))
+        assert(callable(evaluate))
+        assert(callable(act))
+        assert(isinstance(evaluate_in_process, bool))
+
+        self.pipeline = Pipeline([('fetch', fetch), ('evaluate', evaluate), ('act', act)], queue_size,
+                                 process_stages=['evaluate'] if evaluate_in_process else None, max_workers=max_workers)
+        self.on_block(self.pipeline.submit)
+        return self.pipeline
+
+    def on_event(self, event: threading.Event, min_frequency_in_seconds: int, callback,
+                 in_process: bool = False, act=None):
         """
         Register the specified callback to be called every time event is triggered,
         but at least once every `min_frequency_in_seconds`.
@@ -298,21 +478,56 @@ class Lifecycle:
             event: Event which should be monitored.
             min_frequency_in_seconds: Minimum execution frequency (in seconds).
             callback: Function to be called by the timer.
+            in_process: Whether to run the callback in a worker process, see `every`.
+            act: Function to be called with the result of the callback, if run in a worker process.
         """
         assert(isinstance(event, threading.Event))
         assert(isinstance(min_frequency_in_seconds, int))
         assert(callable(callback))
 
-        self.event_timers.append((event, min_frequency_in_seconds, AsyncCallback(callback)))
+        if in_process:
+            callback = self._process_callback(callback, act)
 
-    def every(self, frequency_in_seconds: int, callback):
+        name = f"event #{len(self.event_timers) + 1}"
+        self.event_timers.append((event, min_frequency_in_seconds, self.scheduler.callback(callback, name)))
+
+    def every(self, frequency_in_seconds: int, callback, in_process: bool = False, act=None):
         """Register the specified callback to be called by a timer.
 
+        With `in_process`, CPU-heavy strategy code in the callback runs in a worker process, so it
+        neither competes for the GIL with watching for new blocks nor is limited to a single core.
+        Its result gets pickled and passed to `act`, which runs in the keeper process and sends the
+        transactions. See :py:class:`pymaker.pipeline.ProcessCallback` for what the callback and its
+        result need to look like.
+
         Args:
             frequency_in_seconds: Execution frequency (in seconds).
             callback: Function to be called by the timer.
+            in_process: Whether to run the callback in a worker process.
+            act: Function to be called with the result of the callback, if run in a worker process.
         """
-        self.every_timers.append((frequency_in_seconds, AsyncCallback(callback)))
+        if in_process:
+            callback = self._process_callback(callback, act)
+
+        name = f"timer #{len(self.every_timers) + 1}"
+        self.every_timers.append((frequency_in_seconds,
+                                  self.scheduler.callback(callback, name, period=frequency_in_seconds)))
+
+    def _process_callback(self, callback, act) -> ProcessCallback:
+        process_callback = ProcessCallback(callback, act)
+        self._process_callbacks.append(process_callback)
+        return process_callback
+
+    def _start_worker_processes(self):
+        # workers get started before any other thread is, see `start_worker_pool`
+        if len(self._process_callbacks) > 0:
+            self._process_pool = start_worker_pool()
+            for process_callback in self._process_callbacks:
+                process_callback.process_pool = self._process_pool
+
+    def _stop_worker_processes(self):
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=True)
 
     def _sigint_sigterm_handler(self, sig, frame):
         if self.terminated_externally:
@@ -321,22 +536,123 @@ class Lifecycle:
             self.logger.warning("Keeper received SIGINT/SIGTERM signal, will terminate gracefully")
             self.terminated_externally = True
 
+    def _block_context(self, header: BlockHeader) -> BlockContext:
+        skipped = []
+        if self._last_triggered_block is not None:
+            for block_number in range(self._last_triggered_block + 1, header.number):
+                skipped_header = self.block_stream.canonical(block_number)
+                if skipped_header is not None:
+                    skipped.append(skipped_header)
+
+        return BlockContext(header, skipped)
+
+    def _trigger_cancellable(self, header: BlockHeader):
+        with self._stale_block_lock:
+            if self._block_in_progress is not None:
+                self.logger.debug(f"Cancelling block #{self._block_in_progress.number},"
+                                  f" as there is already block #{header.number} available")
+                self._block_in_progress.cancel()
+                self._pending_header = header
+                return
+
+            # so that blocks cancelled before the first run completes get reported as skipped too
+            if self._last_triggered_block is None:
+                self._last_triggered_block = header.number - 1
+
+            context = self._block_context(header)
+            self._block_in_progress = context
+
+        if not self._on_block_callback.trigger(args=(context,)):
+            # the previous run has just finished, but the worker has not released the callback yet
+            self._on_block_callback.wait()
+            self._on_block_callback.trigger(args=(context,))
+
+    def _run_cancellable(self, context: BlockContext):
+        while context is not None:
+            self.logger.debug(f"Processing block #{context.number} ({context.hash.hex()})")
+            self._report_block_start(context.header)
+            completed = False
+            try:
+                with context:
+                    self.block_function(*((context,) if self._block_function_takes_context else ()))
+                completed = True
+            except BlockCancelled:
+                self.logger.debug(f"Processing of block #{context.number} cancelled")
+            except:
+                self.logger.exception(f"Failed to process block #{context.number}")
+                completed = True
+
+            context = self._next_cancellable(context, completed)
+
+    def _next_cancellable(self, context: BlockContext, completed: bool) -> Optional[BlockContext]:
+        with self._stale_block_lock:
+            # cancelled blocks get reported as skipped to the next run
+            if completed:
+                self._last_triggered_block = context.number
+
+            header = self._pending_header
+            self._pending_header = None
+            if header is None or self.terminated_internally or self.terminated_externally or self.fatal_termination:
+                self._block_in_progress = None
+            else:
+                self._block_in_progress = self._block_context(header)
+
+            return self._block_in_progress
+
+    def _report_new_block(self):
+        if self.metrics_sink is not None:
+            self.metrics_sink.increment('lifecycle_blocks_total')
+
+    def _report_block_start(self, header: BlockHeader):
+        # lag between the block being mined and the keeper starting to act on it
+        if self.metrics_sink is not None:
+            self.metrics_sink.observe('lifecycle_block_lag_seconds', max(time.time() - header.timestamp, 0))
+
+    def _uninstall_filter(self, event_filter):
+        # the node may have dropped the filter already, in which case there is nothing to clean up
+        try:
+            self.web3.eth.uninstallFilter(event_filter.filter_id)
+        except Exception as e:
+            self.logger.debug(f"Failed to uninstall block filter {event_filter.filter_id} ({e})")
+
     def _start_watching_blocks(self):
-        def new_block_callback(block_hash):
-            self._last_block_time = datetime.datetime.now(tz=pytz.UTC)
-            block = self.web3.eth.getBlock(block_hash)
-            block_number = block['number']
-            if not self.web3.eth.syncing:
-                max_block_number = self.web3.eth.blockNumber
+        def new_block_callback(header: BlockHeader, pushed: bool):
+            with self._new_block_lock:
+                # the same block can be reported both by the subscription and by the fallback filter
+                known_header = self.block_stream.canonical(header.number)
+                if known_header is not None and known_header.hash == header.hash:
+                    return
+
+                self._last_block_time = datetime.datetime.now(tz=pytz.UTC)
+                self._report_new_block()
+                self.block_stream.add(header)
+
+            if self._on_block_callback is None:
+                return
+
+            block_number = header.number
+            block_hash = HexBytes(header.hash)
+
+            # pushed headers are the latest ones by definition, which saves two requests per block
+            if pushed or not self.web3.eth.syncing:
+                max_block_number = block_number if pushed else self.web3.eth.blockNumber
                 if block_number == max_block_number:
                     def on_start():
                         self.logger.debug(f"Processing block #{block_number} ({block_hash.hex()})")
+                        self._report_block_start(header)
 
                     def on_finish():
                         self.logger.debug(f"Finished processing block #{block_number} ({block_hash.hex()})")
 
                     if not self.terminated_internally and not self.terminated_externally and not self.fatal_termination:
-                        if not self._on_block_callback.trigger(on_start, on_finish):
+                        if self._cancel_stale_blocks:
+                            self._trigger_cancellable(header)
+                            return
+
+                        args = (self._block_context(header),) if self._block_function_takes_context else ()
+                        if self._on_block_callback.trigger(on_start, on_finish, args):
+                            self._last_triggered_block = block_number
+                        else:
                             self.logger.debug(f"Ignoring block #{block_number} ({block_hash.hex()}),"
                                               f" as previous callback is still running")
                     else:
@@ -348,19 +664,42 @@ class Lifecycle:
                 self.logger.info(f"Ignoring block #{block_number} ({block_hash.hex()}), as the node is syncing")
 
         def new_block_watch():
-            event_filter = self.web3.eth.filter('latest')
+            event_filter = None
             while True:
                 try:
-                    for event in event_filter.get_new_entries():
-                        new_block_callback(event)
+                    # polling only happens if new heads are not being pushed by the node
+                    if self._new_heads_listener is not None and self._new_heads_listener.connected:
+                        if event_filter is not None:
+                            self._uninstall_filter(event_filter)
+                            event_filter = None
+                    else:
+                        if event_filter is None:
+                            event_filter = self.web3.eth.filter('latest')
+
+                        for event in event_filter.get_new_entries():
+                            new_block_callback(block_cache(self.web3).get(event), pushed=False)
                 except ValueError:
                     self.logger.warning("Node dropped event emitter; recreating latest block filter")
+                    if event_filter is not None:
+                        self._uninstall_filter(event_filter)
                     event_filter = self.web3.eth.filter('latest')
                 finally:
                     time.sleep(1)
 
-        if self.block_function:
-            self._on_block_callback = AsyncCallback(self.block_function)
+        if self.web3 is not None and (self.block_function or len(self.subscriptions) > 0
+                                      or self.block_stream.has_handlers()):
+            self.block_stream.on_new_block(self.subscriptions.process_block)
+            if self.pipeline is not None:
+                self.pipeline.start()
+
+            if self.block_function:
+                self._on_block_callback = self.scheduler.callback(self._run_cancellable if self._cancel_stale_blocks
+                                                                  else self.block_function, "on_block")
+
+            if self._new_heads_endpoint is not None:
+                self._new_heads_listener = NewHeadsListener(self._new_heads_endpoint,
+                                                            lambda header: new_block_callback(header, pushed=True))
+                self._new_heads_listener.start()
 
             block_filter = threading.Thread(target=new_block_watch, daemon=True)
             block_filter.start()
@@ -368,17 +707,6 @@ class Lifecycle:
 
             self.logger.info("Watching for new blocks")
 
-    def _start_thread_safely(self, t: threading.Thread):
-        delay = 10
-
-        while True:
-            try:
-                t.start()
-                break
-            except Exception as e:
-                self.logger.critical(f"Failed to start a thread ({e}), trying again in {delay} seconds")
-                time.sleep(delay)
-
     def _start_every_timers(self):
         for idx, timer in enumerate(self.every_timers, start=1):
             self._start_every_timer(idx, timer[0], timer[1])
@@ -393,65 +721,39 @@ class Lifecycle:
             self.logger.info(f"Started {len(self.event_timers)} event(s)")
 
     def _start_every_timer(self, idx: int, frequency_in_seconds: int, callback):
-        def setup_timer(delay):
-            timer = threading.Timer(delay, func)
-            timer.daemon = True
-
-            self._start_thread_safely(timer)
-
         def func():
-            try:
-                if not self.terminated_internally and not self.terminated_externally and not self.fatal_termination:
-                    def on_start():
-                        self.logger.debug(f"Processing the timer #{idx}")
+            if not self.terminated_internally and not self.terminated_externally and not self.fatal_termination:
+                def on_start():
+                    self.logger.debug(f"Processing the timer #{idx}")
 
-                    def on_finish():
-                        self.logger.debug(f"Finished processing the timer #{idx}")
+                def on_finish():
+                    self.logger.debug(f"Finished processing the timer #{idx}")
 
-                    if not callback.trigger(on_start, on_finish):
-                        self.logger.debug(f"Ignoring timer #{idx} as previous one is already running")
-                else:
-                    self.logger.debug(f"Ignoring timer #{idx} as keeper is already terminating")
-            except:
-                setup_timer(frequency_in_seconds)
-                raise
-            setup_timer(frequency_in_seconds)
+                if not callback.trigger(on_start, on_finish):
+                    self.logger.debug(f"Ignoring timer #{idx} as previous one is already running")
+            else:
+                self.logger.debug(f"Ignoring timer #{idx} as keeper is already terminating")
 
-        setup_timer(1)
+        self.scheduler.every(frequency_in_seconds, func, initial_delay=1)
         self._at_least_one_every = True
 
     def _start_event_timer(self, idx: int, event: threading.Event, min_frequency_in_seconds: int, callback):
-        def setup_thread():
-            self._start_thread_safely(threading.Thread(target=func, daemon=True))
-
-        def func():
-            event_happened = False
-
-            while True:
-                try:
-                    if not self.terminated_internally and not self.terminated_externally and not self.fatal_termination:
-                        def on_start():
-                            self.logger.debug(f"Processing the event #{idx}" if event_happened
-                                              else f"Processing the event #{idx} because of minimum frequency")
+        def func(event_happened: bool):
+            if not self.terminated_internally and not self.terminated_externally and not self.fatal_termination:
+                def on_start():
+                    self.logger.debug(f"Processing the event #{idx}" if event_happened
+                                      else f"Processing the event #{idx} because of minimum frequency")
 
-                        def on_finish():
-                            self.logger.debug(f"Finished processing the event #{idx}" if event_happened
-                                              else f"Finished processing the event #{idx} because of minimum frequency")
+                def on_finish():
+                    self.logger.debug(f"Finished processing the event #{idx}" if event_happened
+                                      else f"Finished processing the event #{idx} because of minimum frequency")
 
-                        assert callback.trigger(on_start, on_finish)
-                        callback.wait()
-
-                    else:
-                        self.logger.debug(f"Ignoring event #{idx} as keeper is terminating" if event_happened
-                                          else f"Ignoring event #{idx} because of minimum frequency as keeper is terminating")
-                except:
-                    setup_thread()
-                    raise
-
-                event_happened = event.wait(timeout=min_frequency_in_seconds)
-                event.clear()
+                callback.trigger(on_start, on_finish)
+            else:
+                self.logger.debug(f"Ignoring event #{idx} as keeper is terminating" if event_happened
+                                  else f"Ignoring event #{idx} because of minimum frequency as keeper is terminating")
 
-        setup_thread()
+        self.scheduler.watch(event, min_frequency_in_seconds, callback, func)
         self._at_least_one_every = True
 
     def _main_loop(self):
@@ -498,3 +800,387 @@ class Lifecycle:
                     self.logger.fatal("No new blocks received for 300 seconds, the keeper will terminate")
                     self.fatal_termination = True
                     break
+
+
+class _AsyncCallback:
+    """Runs a callback of :py:class:`pymaker.lifecycle.AsyncLifecycle` as a task, one invocation at a time.
+
+    Coroutine functions are awaited on the event loop, plain functions are run in its default executor.
+    Metrics get reported to `metrics_sink` of the lifecycle, the same way as by :py:class:`pymaker.scheduler.ScheduledCallback`.
+    """
+    logger = logging.getLogger()
+
+    def __init__(self, callback, name: str, lifecycle: Lifecycle):
+        assert(callable(callback))
+        assert(isinstance(name, str))
+        assert(isinstance(lifecycle, Lifecycle))
+
+        self.callback = callback
+        self.name = name
+        self.task = None
+        self._lifecycle = lifecycle
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def trigger(self, args: tuple = ()) -> bool:
+        if self.running:
+            self._report('increment', 'lifecycle_callback_skipped_total', 1)
+            return False
+
+        self.task = asyncio.ensure_future(self._run(args))
+        return True
+
+    async def wait(self):
+        if self.task is not None:
+            await asyncio.wait([self.task])
+
+    async def _run(self, args: tuple):
+        self.logger.debug(f"Processing {self.name}")
+        started = time.monotonic()
+        try:
+            await _call(self.callback, *args)
+        except (asyncio.CancelledError, BlockCancelled):
+            self.logger.debug(f"Processing {self.name} cancelled")
+            return
+        except:
+            self._report('increment', 'lifecycle_callback_failures_total', 1)
+            self.logger.exception(f"Callback {self.name} failed")
+        finally:
+            self._report('observe', 'lifecycle_callback_duration_seconds', time.monotonic() - started)
+        self.logger.debug(f"Finished processing {self.name}")
+
+    def _report(self, method: str, name: str, value):
+        metrics_sink = self._lifecycle.metrics_sink
+        if metrics_sink is not None:
+            getattr(metrics_sink, method)(name, value, {'callback': self.name})
+
+
+async def _call(callback, *args):
+    if asyncio.iscoroutinefunction(callback):
+        return await callback(*args)
+    else:
+        return await asyncio.get_event_loop().run_in_executor(None, partial(callback, *args))
+
+
+class AsyncLifecycle(Lifecycle):
+    """Keeper lifecycle controller running on a single asyncio event loop.
+
+    Offers the same API as :py:class:`pymaker.lifecycle.Lifecycle`, but callbacks can be
+    coroutine functions. These get awaited on the event loop, so they can await
+    `Transact.transact_async` or any other coroutine directly and thousands of them
+    can wait concurrently without holding a thread each. `Transact.transact_async` makes its
+    calls to the node from the default executor of the loop, so these never block the loop,
+    but the number of calls in flight at the same time is limited by the size of that executor.
+    Plain functions are still accepted, they get run in the default executor of the loop too.
+
+    Timers, events and watching for new blocks are tasks on the same loop. New blocks are pushed
+    over a websocket if `subscribe_to_new_heads` has been called, otherwise the latest block filter
+    gets polled in the executor. Events passed to `on_event` need to be instances of `asyncio.Event`.
+
+    With `on_block(..., cancel_stale=True)`, coroutines stop at the same safe points as functions do,
+    also within the tasks they create. Transactions which have already been sent are still awaited.
+
+    The typical usage pattern is as follows:
+
+        with AsyncLifecycle(self.web3) as lifecycle:
+            lifecycle.on_block(self.check_auctions)
+            lifecycle.every(15, self.rebalance)
+
+        async def check_auctions(self, block: BlockContext):
+            await asyncio.gather(*[self.bid(auction) for auction in self.auctions])
+
+    `run` can be awaited instead, if the keeper already runs an event loop of its own.
+    """
+
+    def __init__(self, web3: Web3 = None):
+        super().__init__(web3)
+        self._tasks = []
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # the default loop, as events passed to `on_event` are bound to it on Python < 3.10
+        asyncio.get_event_loop().run_until_complete(self.run())
+
+        exit(10 if self.fatal_termination else 0)
+
+    def on_event(self, event: asyncio.Event, min_frequency_in_seconds: int, callback,
+                 in_process: bool = False, act=None):
+        """
+        Register the specified callback to be called every time event is triggered,
+        but at least once every `min_frequency_in_seconds`.
+
+        Args:
+            event: Event which should be monitored. Can only be set from the event loop, other threads
+                need to use `loop.call_soon_threadsafe(event.set)`.
+            min_frequency_in_seconds: Minimum execution frequency (in seconds).
+            callback: Function or coroutine function to be called.
+            in_process: Whether to run the callback in a worker process, see `Lifecycle.every`.
+            act: Function to be called with the result of the callback, if run in a worker process.
+        """
+        assert(isinstance(event, asyncio.Event))
+        assert(isinstance(min_frequency_in_seconds, int))
+        assert(callable(callback))
+
+        if in_process:
+            callback = self._process_callback(callback, act)
+
+        name = f"event #{len(self.event_timers) + 1}"
+        self.event_timers.append((event, min_frequency_in_seconds, _AsyncCallback(callback, name, self)))
+
+    def every(self, frequency_in_seconds: int, callback, in_process: bool = False, act=None):
+        """Register the specified callback to be called by a timer.
+
+        Args:
+            frequency_in_seconds: Execution frequency (in seconds).
+            callback: Function or coroutine function to be called by the timer.
+            in_process: Whether to run the callback in a worker process, see `Lifecycle.every`.
+            act: Function to be called with the result of the callback, if run in a worker process.
+        """
+        assert(isinstance(frequency_in_seconds, int))
+        assert(callable(callback))
+
+        if in_process:
+            callback = self._process_callback(callback, act)
+
+        name = f"timer #{len(self.every_timers) + 1}"
+        self.every_timers.append((frequency_in_seconds, _AsyncCallback(callback, name, self)))
+
+    async def run(self):
+        """Runs the keeper on the current event loop, until it terminates."""
+        loop = asyncio.get_event_loop()
+        inherit_block_context(loop)
+        self._start_worker_processes()
+        await loop.run_in_executor(None, self._initialize)
+        if self.metrics_server is not None:
+            self.metrics_server.start()
+
+        # Startup phase
+        if self.startup_function:
+            self.logger.info("Executing keeper startup logic")
+            await _call(self.startup_function)
+
+        # terminate gracefully on either SIGINT or SIGTERM
+        try:
+            loop.add_signal_handler(signal.SIGINT, self._sigint_sigterm_handler, signal.SIGINT, None)
+            loop.add_signal_handler(signal.SIGTERM, self._sigint_sigterm_handler, signal.SIGTERM, None)
+        except (NotImplementedError, RuntimeError):
+            self.logger.warning("Cannot handle SIGINT/SIGTERM outside of the main thread")
+
+        if self.web3 is not None and (self.block_function or len(self.subscriptions) > 0
+                                      or self.block_stream.has_handlers()):
+            self._start_watching_blocks_async()
+
+        for idx, (frequency_in_seconds, callback) in enumerate(self.every_timers, start=1):
+            self._tasks.append(asyncio.ensure_future(self._every(idx, frequency_in_seconds, callback)))
+
+        for idx, (event, min_frequency_in_seconds, callback) in enumerate(self.event_timers, start=1):
+            self._tasks.append(asyncio.ensure_future(self._event(idx, event, min_frequency_in_seconds, callback)))
+
+        await self._main_loop_async()
+
+        # Enter shutdown process
+        self.logger.info("Shutting down the keeper")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        # If any callback is still running, wait for it to terminate
+        callbacks = [timer[1] for timer in self.every_timers] + [timer[2] for timer in self.event_timers]
+        if self._on_block_callback is not None:
+            callbacks.append(self._on_block_callback)
+        if any(callback.running for callback in callbacks):
+            self.logger.info("Waiting for outstanding callbacks to terminate...")
+            for callback in callbacks:
+                await callback.wait()
+
+        # Let the pipeline process the blocks already passed to it
+        if self.pipeline is not None:
+            await asyncio.get_event_loop().run_in_executor(None, self.pipeline.stop)
+        await loop.run_in_executor(None, self._stop_worker_processes)
+
+        # Shutdown phase
+        if self.shutdown_function:
+            self.logger.info("Executing keeper shutdown logic...")
+            await _call(self.shutdown_function)
+            self.logger.info("Shutdown logic finished")
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        self.logger.info("Keeper terminated")
+
+    def _start_watching_blocks_async(self):
+        self.block_stream.on_new_block(self.subscriptions.process_block)
+        if self.pipeline is not None:
+            self.pipeline.start()
+
+        if self.block_function:
+            self._on_block_callback = _AsyncCallback(self._run_block_function, "on_block", self)
+
+        queue = asyncio.Queue()
+        if self._new_heads_endpoint is not None:
+            self._new_heads_listener = NewHeadsListener(self._new_heads_endpoint,
+                                                        lambda header: queue.put_nowait((header, True)))
+            self._tasks.append(asyncio.ensure_future(self._new_heads_listener.listen()))
+
+        self._tasks.append(asyncio.ensure_future(self._poll_blocks(queue)))
+        self._tasks.append(asyncio.ensure_future(self._process_blocks(queue)))
+        self.logger.info("Watching for new blocks")
+
+    async def _poll_blocks(self, queue: asyncio.Queue):
+        loop = asyncio.get_event_loop()
+        event_filter = None
+        while True:
+            try:
+                # polling only happens if new heads are not being pushed by the node
+                if self._new_heads_listener is not None and self._new_heads_listener.connected:
+                    if event_filter is not None:
+                        await loop.run_in_executor(None, self._uninstall_filter, event_filter)
+                        event_filter = None
+                else:
+                    if event_filter is None:
+                        event_filter = await loop.run_in_executor(None, self.web3.eth.filter, 'latest')
+
+                    for block_hash in await loop.run_in_executor(None, event_filter.get_new_entries):
+                        header = await loop.run_in_executor(None, block_cache(self.web3).get, block_hash)
+                        queue.put_nowait((header, False))
+            except ValueError:
+                self.logger.warning("Node dropped event emitter; recreating latest block filter")
+                if event_filter is not None:
+                    await loop.run_in_executor(None, self._uninstall_filter, event_filter)
+                    event_filter = None
+
+            await asyncio.sleep(1)
+
+    async def _process_blocks(self, queue: asyncio.Queue):
+        loop = asyncio.get_event_loop()
+        while True:
+            header, pushed = await queue.get()
+            try:
+                await self._process_block(loop, header, pushed)
+            except Exception as e:
+                self.logger.warning(f"Failed to process block #{header.number} ({e})")
+
+    async def _process_block(self, loop, header: BlockHeader, pushed: bool):
+        # the same block can be reported both by the subscription and by the fallback filter
+        known_header = self.block_stream.canonical(header.number)
+        if known_header is not None and known_header.hash == header.hash:
+            return
+
+        self._last_block_time = datetime.datetime.now(tz=pytz.UTC)
+        self._report_new_block()
+        await loop.run_in_executor(None, self.block_stream.add, header)
+
+        if self._on_block_callback is None:
+            return
+
+        block_number = header.number
+
+        # pushed headers are the latest ones by definition, which saves two requests per block
+        if not pushed:
+            if await loop.run_in_executor(None, lambda: self.web3.eth.syncing):
+                self.logger.info(f"Ignoring block #{block_number}, as the node is syncing")
+                return
+
+            max_block_number = await loop.run_in_executor(None, lambda: self.web3.eth.blockNumber)
+            if block_number != max_block_number:
+                self.logger.debug(f"Ignoring block #{block_number},"
+                                  f" as there is already block #{max_block_number} available")
+                return
+
+        if self.terminated_internally or self.terminated_externally or self.fatal_termination:
+            self.logger.debug(f"Ignoring block #{block_number} as keeper is already terminating")
+            return
+
+        if self._cancel_stale_blocks and self._on_block_callback.running:
+            self.logger.debug(f"Cancelling block #{self._block_in_progress.number},"
+                              f" as there is already block #{block_number} available")
+            # not cancelling the task, so that transactions which have already been sent are still awaited
+            self._block_in_progress.cancel()
+            await self._on_block_callback.wait()
+
+        # so that blocks cancelled before the first run completes get reported as skipped too
+        if self._cancel_stale_blocks and self._last_triggered_block is None:
+            self._last_triggered_block = block_number - 1
+
+        context = self._block_context(header)
+        if self._on_block_callback.trigger((context,)):
+            self._block_in_progress = context
+            if not self._cancel_stale_blocks:
+                self._last_triggered_block = block_number
+        else:
+            self.logger.debug(f"Ignoring block #{block_number}, as previous callback is still running")
+
+    async def _run_block_function(self, context: BlockContext):
+        self._report_block_start(context.header)
+        args = (context,) if self._block_function_takes_context else ()
+        if asyncio.iscoroutinefunction(self.block_function):
+            with context:
+                await self.block_function(*args)
+        else:
+            def run():
+                with context:
+                    self.block_function(*args)
+
+            await asyncio.get_event_loop().run_in_executor(None, run)
+
+        # cancelled blocks get reported as skipped to the next run
+        if self._cancel_stale_blocks:
+            self._last_triggered_block = context.number
+
+    async def _every(self, idx: int, frequency_in_seconds: int, callback: _AsyncCallback):
+        await asyncio.sleep(1)
+        while True:
+            if not self.terminated_internally and not self.terminated_externally and not self.fatal_termination:
+                if not callback.trigger():
+                    self.logger.debug(f"Ignoring timer #{idx} as previous one is already running")
+            else:
+                self.logger.debug(f"Ignoring timer #{idx} as keeper is already terminating")
+
+            await asyncio.sleep(frequency_in_seconds)
+
+    async def _event(self, idx: int, event: asyncio.Event, min_frequency_in_seconds: int, callback: _AsyncCallback):
+        event_happened = False
+        while True:
+            if not self.terminated_internally and not self.terminated_externally and not self.fatal_termination:
+                if event_happened:
+                    self.logger.debug(f"Event #{idx} triggered")
+                callback.trigger()
+                await callback.wait()
+            else:
+                self.logger.debug(f"Ignoring event #{idx} as keeper is terminating")
+
+            try:
+                await asyncio.wait_for(event.wait(), timeout=min_frequency_in_seconds)
+                event_happened = True
+            except asyncio.TimeoutError:
+                event_happened = False
+            event.clear()
+
+    async def _main_loop_async(self):
+        # in case nothing has been set up, the keeper will terminate soon after it started
+        while len(self._tasks) > 0:
+            await asyncio.sleep(1)
+
+            # if the keeper logic asked us to terminate, we do so
+            if self.terminated_internally:
+                self.logger.warning("Keeper logic asked for termination, the keeper will terminate")
+                break
+
+            # if SIGINT/SIGTERM asked us to terminate, we do so
+            if self.terminated_externally:
+                self.logger.warning("The keeper is terminating due do SIGINT/SIGTERM signal received")
+                break
+
+            # none of the tasks is supposed to ever finish
+            if any(task.done() for task in self._tasks):
+                self.logger.fatal("One of watching tasks is dead, the keeper will terminate")
+                self.fatal_termination = True
+                break
+
+            # if we are watching for new blocks and no new block has been reported during
+            # some time, we assume the node stopped reporting them and terminate the keeper
+            if self._last_block_time and (datetime.datetime.now(tz=pytz.UTC) - self._last_block_time).total_seconds() > 300:
+                if not await asyncio.get_event_loop().run_in_executor(None, lambda: self.web3.eth.syncing):
+                    self.logger.fatal("No new blocks received for 300 seconds, the keeper will terminate")
+                    self.fatal_termination = True
+                    break
@@ -16,15 +16,47 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
-from pprint import pformat
+from typing import Optional
+
 from web3 import Web3
 from web3._utils.events import get_event_data
 
 from eth_abi.codec import ABICodec
 from eth_abi.registry import registry as default_registry
 
+from pymaker import Address
+from pymaker.events import EventRecord
+
+# Stateless, so a single instance can be shared by all generic decodes
+codec = ABICodec(default_registry)
+
+# LogNote layouts supported by `LogNote.from_log`, keyed by the names of the event inputs
+USR_LAYOUT = ('sig', 'usr', 'arg1', 'arg2', 'data')
+VAT_LAYOUT = ('sig', 'arg1', 'arg2', 'arg3', 'data')
+
+_layouts = {}
+
+
+def _log_note_layout(contract_abi: list) -> Optional[tuple]:
+    # We keep a reference to `contract_abi` so its id can not get reused while cached.
+    cached = _layouts.get(id(contract_abi))
+    if cached is None:
+        log_note_abi = [abi for abi in contract_abi if abi.get('name') == 'LogNote'][0]
+        layout = tuple(input['name'] for input in log_note_abi['inputs'])
+        cached = (contract_abi, log_note_abi, layout if layout in (USR_LAYOUT, VAT_LAYOUT) else None)
+        _layouts[id(contract_abi)] = cached
+
+    return cached
+
+
+def _to_bytes(value) -> bytes:
+    return bytes.fromhex(value[2:]) if isinstance(value, str) else bytes(value)
+
+
 # Shared between DSNote and many MCD contracts
-class LogNote:
+class LogNote(EventRecord):
+    __slots__ = ('sig', 'usr', 'arg1', 'arg2', 'arg3', '_data')
+
     def __init__(self, log):
         args = log['args']
         self.sig = Web3.toHex(args['sig'])
@@ -33,7 +65,7 @@ class LogNote:
         self.arg2 = args['arg2'] if 'arg2' in args else None
         self.arg3 = args['arg3'] if 'arg3' in args else None  # Special variant used for vat.frob
         self.block = log['blockNumber']
-        self.tx_hash = log['transactionHash'].hex()
+        self._tx_hash = bytes(log['transactionHash'])
         self._data = args['data']
 
     @classmethod
@@ -41,26 +73,88 @@ class LogNote:
         assert isinstance(event, dict)
         assert isinstance(contract_abi, list)
 
-        log_note_abi = [abi for abi in contract_abi if abi.get('name') == 'LogNote'][0]
+        _, log_note_abi, layout = _log_note_layout(contract_abi)
+        if layout is not None:
+            return cls.from_log(event, layout)
+
         try:
-            codec = ABICodec(default_registry)
             event_data = get_event_data(codec, log_note_abi, event)
             return LogNote(event_data)
         except ValueError:
             # event is not a LogNote
             return None
 
-    def get_bytes_at_index(self, index: int) -> bytes:
-        assert isinstance(index, int)
+    @classmethod
+    def from_log(cls, log: dict, layout: tuple = USR_LAYOUT):
+        """Decodes a raw log entry directly, without going through the generic event ABI machinery.
+
+        The anonymous `LogNote` event keeps the function signature and the indexed arguments
+        in topics, and the calldata of the call in `data`. These are sliced directly.
+
+        Args:
+            log: Raw log entry, as returned by `eth_getLogs`.
+            layout: Either `USR_LAYOUT` (sig, usr, arg1, arg2) used by most MCD contracts,
+                or `VAT_LAYOUT` (sig, arg1, arg2, arg3) used by the `Vat`.
+
+        Returns:
+            A `LogNote` instance, or `None` if the log entry is not a `LogNote`.
+        """
+        assert layout in (USR_LAYOUT, VAT_LAYOUT)
+
+        topics = [_to_bytes(topic) for topic in log['topics']]
+        if len(topics) != 4 or any(len(topic) != 32 for topic in topics) or any(topics[0][4:]):
+            return None
+
+        # `data` is ABI-encoded `bytes`: an offset word, a length word and the calldata itself
+        data = memoryview(_to_bytes(log['data']))
+        if len(data) < 64 or int.from_bytes(data[0:32], 'big') != 32:
+            return None
+
+        length = int.from_bytes(data[32:64], 'big')
+        if len(data) < 64 + length:
+            return None
+
+        lognote = cls.__new__(cls)
+        lognote.sig = '0x' + topics[0][:4].hex()
+        if layout == USR_LAYOUT:
+            if any(topics[1][:12]):
+                return None
+
+            lognote.usr = Address(topics[1][12:]).address
+            lognote.arg1 = topics[2]
+            lognote.arg2 = topics[3]
+            lognote.arg3 = None
+        else:
+            lognote.usr = None
+            lognote.arg1 = topics[1]
+            lognote.arg2 = topics[2]
+            lognote.arg3 = topics[3]
+        lognote.block = log['blockNumber']
+        lognote._tx_hash = _to_bytes(log['transactionHash'])
+        lognote._data = data[64:64 + length].tobytes()
+        return lognote
+
+    def _word_at_index(self, index: int) -> memoryview:
         if index > 5:
             raise ValueError("Only six words of calldata are provided")
 
         start_index = len(self._data) - ((6-index) * 32) - 28
-        return self._data[start_index:start_index+32]
+        return memoryview(self._data)[start_index:start_index+32]
+
+    def get_bytes_at_index(self, index: int) -> bytes:
+        assert isinstance(index, int)
+
+        return self._word_at_index(index).tobytes()
 
-    def __eq__(self, other):
-        assert isinstance(other, LogNote)
-        return self.__dict__ == other.__dict__
+    def get_int_at_index(self, index: int, signed: bool = False) -> int:
+        """Returns a calldata word as an integer, without copying it first."""
+        assert isinstance(index, int)
+        assert isinstance(signed, bool)
+
+        return int.from_bytes(self._word_at_index(index), byteorder='big', signed=signed)
+
+    def get_address_at_index(self, index: int) -> Address:
+        """Returns a calldata word as an :py:class:`pymaker.Address`."""
+        assert isinstance(index, int)
 
-    def __repr__(self):
-        return f"LogNote({pformat(vars(self))})"
+        return Address(self._word_at_index(index)[12:].tobytes())
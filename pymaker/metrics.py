@@ -0,0 +1,364 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 MakerDAO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import bisect
+import logging
+import math
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from typing import Optional, Tuple
+
+
+# Bucket upper bounds suitable for durations in seconds.
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+                   120.0, 300.0, 600.0)
+
+# Bucket upper bounds suitable for small counts, i.e. number of transaction replacements.
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Bucket upper bounds suitable for gas amounts.
+GAS_BUCKETS = (21000, 50000, 100000, 200000, 300000, 500000, 1000000, 2000000, 4000000, 8000000, 12500000)
+
+# Bucket upper bounds suitable for gas prices (in Wei).
+GAS_PRICE_BUCKETS = (1000000000, 2000000000, 5000000000, 10000000000, 20000000000, 50000000000, 100000000000,
+                     200000000000, 500000000000, 1000000000000)
+
+# Bucket upper bounds suitable for amounts of ETH.
+ETH_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class Histogram:
+    """Keeps the distribution of observed values in a set of buckets.
+
+    Apart from the bucket counts, the total number of observations, their sum
+    and the minimum and maximum observed value are tracked as well.
+
+    Attributes:
+        buckets: Ascending upper bounds of the buckets. An implicit `+Inf` bucket is always present.
+    """
+    def __init__(self, buckets: Tuple = SECONDS_BUCKETS):
+        assert(isinstance(buckets, tuple))
+        assert(list(buckets) == sorted(buckets))
+
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        """Records one observation.
+
+        Args:
+            value: The value observed.
+        """
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count > 0 else None
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimates the `q`-quantile of the observed values.
+
+        The estimate is the upper bound of the bucket the quantile falls into, capped
+        by the maximum value observed so far.
+
+        Args:
+            q: Quantile to estimate, between 0 and 1.
+
+        Returns:
+            The estimated quantile, or `None` if nothing has been observed yet.
+        """
+        assert(0 <= q <= 1)
+
+        if self.count == 0:
+            return None
+
+        rank = max(math.ceil(q * self.count), 1)
+        cumulative = 0
+        for index, bucket_count in enumerate(self.bucket_counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return min(self.buckets[index], self.max) if index < len(self.buckets) else self.max
+
+        return self.max
+
+    def cumulative_counts(self) -> list:
+        """Returns a list of `(upper_bound, count)` pairs, the last upper bound being `math.inf`."""
+        result = []
+        cumulative = 0
+        for upper_bound, bucket_count in zip(self.buckets + (math.inf,), self.bucket_counts):
+            cumulative += bucket_count
+            result.append((upper_bound, cumulative))
+
+        return result
+
+    def to_dict(self) -> dict:
+        return {'count': self.count,
+                'sum': self.sum,
+                'min': self.min,
+                'max': self.max,
+                'mean': self.mean(),
+                'p50': self.quantile(0.5),
+                'p90': self.quantile(0.9),
+                'p99': self.quantile(0.99)}
+
+    def __repr__(self):
+        return f"Histogram({self.to_dict()})"
+
+
+class MetricsSink:
+    """Abstract class, which can be inherited for implementing different metrics destinations.
+
+    Metrics are identified by a name and an optional dictionary of labels, for example
+    `observe("transact_gas_used", 52340, {"origin": "Vat", "function": "frob"})`.
+    An implementation could for example forward them to StatsD or Prometheus,
+    :py:class:`pymaker.metrics.InMemoryMetrics` keeps them in memory.
+    """
+
+    def observe(self, name: str, value, labels: Optional[dict] = None):
+        """Records one observation of a value, which will be part of a distribution.
+
+        Args:
+            name: Name of the metric.
+            value: The value observed.
+            labels: Optional dictionary of labels.
+        """
+        raise NotImplementedError("Please implement this method")
+
+    def increment(self, name: str, value=1, labels: Optional[dict] = None):
+        """Increments a counter.
+
+        Args:
+            name: Name of the counter, ending with `_total` by convention, i.e. `transact_total`.
+            value: The amount to increment the counter by, defaults to 1.
+            labels: Optional dictionary of labels.
+        """
+        raise NotImplementedError("Please implement this method")
+
+
+class InMemoryMetrics(MetricsSink):
+    """Keeps histograms and counters in memory.
+
+    Histograms get created on first observation. Bucket bounds can be configured per metric name,
+    if not configured `DEFAULT_BUCKETS` are consulted and `SECONDS_BUCKETS` are used as the last resort.
+
+    Attributes:
+        buckets: Optional dictionary mapping metric names to bucket upper bounds.
+    """
+
+    DEFAULT_BUCKETS = {
+        'transact_replacements': COUNT_BUCKETS,
+        'transact_gas_used': GAS_BUCKETS,
+        'transact_gas_price': GAS_PRICE_BUCKETS,
+        'transact_cost_eth': ETH_BUCKETS
+    }
+
+    def __init__(self, buckets: Optional[dict] = None):
+        assert(isinstance(buckets, dict) or (buckets is None))
+
+        self.buckets = {**self.DEFAULT_BUCKETS, **(buckets or {})}
+        self.histograms = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: Optional[dict]) -> tuple:
+        return name, tuple(sorted(labels.items())) if labels else ()
+
+    def observe(self, name: str, value, labels: Optional[dict] = None):
+        key = self._key(name, labels)
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(self.buckets.get(name, SECONDS_BUCKETS))
+
+            self.histograms[key].observe(value)
+
+    def increment(self, name: str, value=1, labels: Optional[dict] = None):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def histogram(self, name: str, labels: Optional[dict] = None) -> Optional[Histogram]:
+        """Returns the histogram of a metric, or `None` if nothing has been observed yet."""
+        return self.histograms.get(self._key(name, labels))
+
+    def counter(self, name: str, labels: Optional[dict] = None):
+        """Returns the current value of a counter, zero if it has never been incremented."""
+        return self.counters.get(self._key(name, labels), 0)
+
+    def snapshot(self) -> dict:
+        """Returns a summary of all metrics collected so far.
+
+        Returns:
+            Dictionary with `histograms` and `counters` keys. Each of them is a list of dictionaries
+            having `name`, `labels` and either histogram statistics or counter `value`.
+        """
+        with self._lock:
+            histograms = [{'name': name, 'labels': dict(labels), **histogram.to_dict()}
+                          for (name, labels), histogram in self.histograms.items()]
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in self.counters.items()]
+
+        return {'histograms': histograms, 'counters': counters}
+
+    def reset(self):
+        """Forgets all metrics collected so far."""
+        with self._lock:
+            self.histograms = {}
+            self.counters = {}
+
+    def __repr__(self):
+        return f"InMemoryMetrics({len(self.histograms)} histograms, {len(self.counters)} counters)"
+
+
+def _prometheus_name(name: str) -> str:
+    name = re.sub(r'[^a-zA-Z0-9_:]', '_', name)
+    return f"_{name}" if name[0].isdigit() else name
+
+
+def _prometheus_labels(labels: dict, extra: Optional[dict] = None) -> str:
+    items = {**labels, **(extra or {})}
+    if len(items) == 0:
+        return ''
+
+    def escape(value) -> str:
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    return '{' + ','.join(f'{_prometheus_name(key)}="{escape(value)}"' for key, value in items.items()) + '}'
+
+
+def _prometheus_value(value) -> str:
+    if value == math.inf:
+        return '+Inf'
+
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def prometheus_text(metrics: InMemoryMetrics) -> str:
+    """Renders all metrics kept by `metrics` in the Prometheus text exposition format.
+
+    Histograms are exposed as `<name>_bucket`, `<name>_sum` and `<name>_count` series,
+    counters as they are, so counter names should end with `_total` rather than `_count`.
+
+    Args:
+        metrics: Metrics to be rendered.
+
+    Returns:
+        The metrics as text, ready to be served under `/metrics`.
+    """
+    assert(isinstance(metrics, InMemoryMetrics))
+
+    with metrics._lock:
+        histograms = [(name, dict(labels), histogram.cumulative_counts(), histogram.sum, histogram.count)
+                      for (name, labels), histogram in metrics.histograms.items()]
+        counters = [(name, dict(labels), value) for (name, labels), value in metrics.counters.items()]
+
+    lines = []
+    for name in sorted(set(item[0] for item in histograms)):
+        metric_name = _prometheus_name(name)
+        lines.append(f"# TYPE {metric_name} histogram")
+        for _, labels, cumulative_counts, total, count in filter(lambda item: item[0] == name, histograms):
+            for upper_bound, cumulative_count in cumulative_counts:
+                le = {'le': _prometheus_value(upper_bound)}
+                lines.append(f"{metric_name}_bucket{_prometheus_labels(labels, le)} {cumulative_count}")
+            lines.append(f"{metric_name}_sum{_prometheus_labels(labels)} {_prometheus_value(total)}")
+            lines.append(f"{metric_name}_count{_prometheus_labels(labels)} {count}")
+
+    for name in sorted(set(item[0] for item in counters)):
+        metric_name = _prometheus_name(name)
+        lines.append(f"# TYPE {metric_name} counter")
+        for _, labels, value in filter(lambda item: item[0] == name, counters):
+            lines.append(f"{metric_name}{_prometheus_labels(labels)} {_prometheus_value(value)}")
+
+    return '\n'.join(lines) + '\n'
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class MetricsServer:
+    """Serves metrics kept by :py:class:`pymaker.metrics.InMemoryMetrics` over HTTP, for Prometheus to scrape.
+
+    Metrics are available under `/metrics`, in the Prometheus text exposition format.
+    The server listens on localhost only by default.
+
+    Args:
+        metrics: Metrics to be served.
+        port: Port to listen on, `0` picks a free one.
+        host: Address to listen on.
+
+    Attributes:
+        port: Port the server actually listens on, once started.
+    """
+    logger = logging.getLogger()
+
+    def __init__(self, metrics: InMemoryMetrics, port: int, host: str = '127.0.0.1'):
+        assert(isinstance(metrics, InMemoryMetrics))
+        assert(isinstance(port, int))
+        assert(isinstance(host, str))
+
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        assert(self._server is None)
+
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+
+                body = prometheus_text(metrics).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = _ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        self.logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+    def __repr__(self):
+        return f"MetricsServer('{self.host}:{self.port}')"
@@ -18,7 +18,7 @@
 from pprint import pformat
 from typing import Optional, List
 
-from pymaker import Address
+from pymaker import Address, ZERO_ADDRESS
 from pymaker.numeric import Wad
 
 
@@ -45,7 +45,7 @@ class Token:
         return amount * Wad.from_number(10 ** (self.decimals - 18))
 
     def is_eth(self) -> bool:
-        return self.address == Address('0x0000000000000000000000000000000000000000')
+        return self.address == ZERO_ADDRESS
 
     def __eq__(self, other):
         assert(isinstance(other, Token))
@@ -38,6 +38,8 @@ class Wad:
         as decimal places. It is similar to the representation used in Maker contracts (`uint128`).
     """
 
+    __slots__ = ('value',)
+
     def __init__(self, value):
         """Creates a new Wad number.
 
@@ -159,6 +161,8 @@ class Ray:
         as decimal places. It is similar to the representation used in Maker contracts (`uint128`).
     """
 
+    __slots__ = ('value',)
+
     def __init__(self, value):
         """Creates a new Ray number.
 
@@ -279,6 +283,8 @@ class Rad:
         as decimal places.
     """
 
+    __slots__ = ('value',)
+
     def __init__(self, value):
         """Creates a new Rad number.
 
@@ -27,6 +27,7 @@ from eth_abi.registry import registry as default_registry
 
 from pymaker import Contract, Address, Transact, Receipt
 from pymaker.numeric import Wad
+from pymaker.subscriptions import LogSubscription, LogSubscriptions
 from pymaker.token import ERC20Token
 from pymaker.util import int_to_bytes32, bytes_to_int
 from pymaker.model import Token
@@ -305,6 +306,45 @@ class SimpleMarket(Contract):
 
         return self._past_events(self._contract, 'LogKill', LogKill, number_of_past_blocks, event_filter)
 
+    def on_make(self, subscriptions: LogSubscriptions, handler) -> LogSubscription:
+        """Subscribe to new LogMake events.
+
+        `LogMake` events are emitted by the Oasis contract every time someone places an order.
+
+        Args:
+            subscriptions: Subscriptions to register with, i.e. `Lifecycle.subscriptions`.
+            handler: Function which will be called with each new event, as :py:class:`pymaker.oasis.LogMake`.
+        """
+        assert(isinstance(subscriptions, LogSubscriptions))
+
+        return self._on_event(self._contract, 'LogMake', LogMake, subscriptions, handler)
+
+    def on_take(self, subscriptions: LogSubscriptions, handler) -> LogSubscription:
+        """Subscribe to new LogTake events.
+
+        `LogTake` events are emitted by the Oasis contract every time someone takes an order.
+
+        Args:
+            subscriptions: Subscriptions to register with, i.e. `Lifecycle.subscriptions`.
+            handler: Function which will be called with each new event, as :py:class:`pymaker.oasis.LogTake`.
+        """
+        assert(isinstance(subscriptions, LogSubscriptions))
+
+        return self._on_event(self._contract, 'LogTake', LogTake, subscriptions, handler)
+
+    def on_kill(self, subscriptions: LogSubscriptions, handler) -> LogSubscription:
+        """Subscribe to new LogKill events.
+
+        `LogKill` events are emitted by the Oasis contract every time someone cancels an order.
+
+        Args:
+            subscriptions: Subscriptions to register with, i.e. `Lifecycle.subscriptions`.
+            handler: Function which will be called with each new event, as :py:class:`pymaker.oasis.LogKill`.
+        """
+        assert(isinstance(subscriptions, LogSubscriptions))
+
+        return self._on_event(self._contract, 'LogKill', LogKill, subscriptions, handler)
+
     def get_last_order_id(self) -> int:
         """Get the id of the last order created on the market.
 
@@ -313,11 +353,12 @@ class SimpleMarket(Contract):
         """
         return self._contract.functions.last_offer_id().call()
 
-    def get_order(self, order_id: int) -> Optional[Order]:
+    def get_order(self, order_id: int, block_identifier='latest') -> Optional[Order]:
         """Get order details.
 
         Args:
             order_id: The id of the order to get the details of.
+            block_identifier: Block at which to read the details, `latest` by default.
 
         Returns:
             An instance of `Order` if the order is still active, or `None` if the order has been
@@ -325,7 +366,7 @@ class SimpleMarket(Contract):
         """
         assert(isinstance(order_id, int))
 
-        array = self._contract.functions.offers(order_id).call()
+        array = self._call('offers', [order_id], block_identifier)
         if array[5] == 0:
             return None
         else:
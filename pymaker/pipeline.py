@@ -0,0 +1,308 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 MakerDAO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import inspect
+import logging
+import multiprocessing
+import pickle
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from queue import Empty, Full, Queue
+from typing import Callable, List, Optional, Tuple
+
+from pymaker.blocks import BlockContext, BlockHeader
+
+_STOP = object()
+
+
+class StageMetrics:
+    """Figures collected for a single stage of a :py:class:`pymaker.pipeline.Pipeline`.
+
+    Attributes:
+        processed: Number of blocks the stage has finished processing.
+        failed: Number of blocks the stage has raised an exception for.
+        dropped: Number of blocks dropped from the input queue of the stage, as newer blocks were waiting.
+        last_latency: Time the stage took to process the last block (in seconds).
+        max_latency: Longest time the stage took to process a block (in seconds).
+        total_latency: Total time spent processing blocks (in seconds).
+        last_input_size: Size of the last serialised input (in bytes), only for stages run in a worker process.
+        last_output_size: Size of the last serialised output (in bytes), only for stages run in a worker process.
+    """
+    def __init__(self):
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.last_latency = None
+        self.max_latency = None
+        self.total_latency = 0.0
+        self.last_input_size = None
+        self.last_output_size = None
+
+    @property
+    def mean_latency(self) -> Optional[float]:
+        runs = self.processed + self.failed
+        return self.total_latency / runs if runs > 0 else None
+
+    def record(self, latency: float, failed: bool):
+        if failed:
+            self.failed += 1
+        else:
+            self.processed += 1
+
+        self.last_latency = latency
+        self.max_latency = max(self.max_latency or 0.0, latency)
+        self.total_latency += latency
+
+    def __repr__(self):
+        return f"StageMetrics({self.__dict__})"
+
+
+def _noop():
+    pass
+
+
+def _run_in_process(payload: bytes) -> bytes:
+    function, args = pickle.loads(payload)
+    return pickle.dumps(function(*args), protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def start_worker_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Starts a pool of worker processes for running CPU-heavy keeper code.
+
+    Forking while other threads run can deadlock the workers, so they are spawned from scratch
+    using the `spawn` start method on Python 3.7+. Otherwise they get forked straight away, so it should
+    happen before any other threads are started. Either way the main module of the keeper needs to be
+    guarded by `if __name__ == '__main__'`.
+
+    Args:
+        max_workers: Maximum number of worker processes, the number of processors if `None`.
+
+    Returns:
+        The pool, as a `ProcessPoolExecutor`.
+    """
+    assert isinstance(max_workers, int) or max_workers is None
+
+    if sys.version_info >= (3, 7):
+        process_pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+    else:
+        process_pool = ProcessPoolExecutor(max_workers=max_workers)
+
+    process_pool.submit(_noop).result()
+    return process_pool
+
+
+class ProcessCallback:
+    """Runs a keeper callback in a worker process, while transactions still get sent from the keeper process.
+
+    The arguments the callback gets called with are pickled and passed to a worker process, with
+    a :py:class:`pymaker.blocks.BlockContext` replaced by its :py:class:`pymaker.blocks.BlockHeader`.
+    The result gets pickled too and, unless it is `None`, `act` gets called in the keeper process
+    with the same arguments followed by the result. Inputs and results should therefore be compact
+    snapshots of plain data, and `function` needs to be defined at the top level of a module, the same
+    as for stages of a :py:class:`pymaker.pipeline.Pipeline` run in worker processes.
+
+    Usually created by registering a callback with `in_process=True`, see :py:meth:`pymaker.lifecycle.Lifecycle.every`.
+
+    Args:
+        function: Function to be run in a worker process.
+        act: Function to be called with the result in the keeper process, i.e. to send transactions. Optional.
+
+    Attributes:
+        process_pool: Pool of worker processes to run `function` in, set by the lifecycle on startup.
+        last_input_size: Size of the last serialised input (in bytes).
+        last_output_size: Size of the last serialised output (in bytes).
+    """
+    def __init__(self, function: Callable, act: Optional[Callable] = None):
+        assert callable(function)
+        assert not inspect.iscoroutinefunction(function)
+        assert callable(act) or act is None
+
+        self.function = function
+        self.act = act
+        self.process_pool = None
+        self.last_input_size = None
+        self.last_output_size = None
+
+    def __call__(self, *args):
+        assert self.process_pool is not None, "Worker processes have not been started"
+
+        inputs = tuple(arg.header if isinstance(arg, BlockContext) else arg for arg in args)
+        payload = pickle.dumps((self.function, inputs), protocol=pickle.HIGHEST_PROTOCOL)
+        self.last_input_size = len(payload)
+
+        output = self.process_pool.submit(_run_in_process, payload).result()
+        self.last_output_size = len(output)
+
+        result = pickle.loads(output)
+        if self.act is not None and result is not None:
+            return self.act(*args, result)
+
+        return result
+
+    def __repr__(self):
+        return f"ProcessCallback({self.function})"
+
+
+class Pipeline:
+    """Processes blocks in stages, each running on a thread of its own, so processing of
+    consecutive blocks overlaps, i.e. the first stage can fetch state for block N+1 while
+    later stages are still evaluating it or sending transactions for block N.
+
+    The first stage gets called with the :py:class:`pymaker.blocks.BlockContext` of a block, every
+    following one with the context and the result of the previous stage. If a stage returns `None`,
+    the block does not get passed any further. Stages are connected by queues of `queue_size` blocks.
+    If a queue is full, the oldest block in it gets dropped in favour of the newest one, so stages
+    never work on a backlog of stale blocks.
+
+    CPU-heavy stages can be run in worker processes, so they neither compete for the GIL with
+    watching for new blocks nor are limited to a single core. Such a stage gets called with the
+    :py:class:`pymaker.blocks.BlockHeader` of the block instead of its context, and both its input
+    and its result get pickled, so they should be compact snapshots of plain data (`Wad`, `Address`,
+    lists, dictionaries...) rather than contracts or `Transact` objects. The function itself needs
+    to be picklable, i.e. defined at the top level of a module. A stage can not be the first one
+    to run in a worker process, as it would have no snapshot to work on. Worker processes get started
+    by `start`, using the `spawn` start method on Python 3.7+, so the main module of the keeper
+    needs to be guarded by `if __name__ == '__main__'`.
+
+    Usually created with :py:meth:`pymaker.lifecycle.Lifecycle.on_block_pipeline`.
+
+    Args:
+        stages: Names and functions of the stages, in order.
+        queue_size: Number of blocks each stage can have waiting.
+        process_stages: Names of the stages to be run in worker processes.
+        max_workers: Maximum number of worker processes, the number of processors if `None`.
+
+    Attributes:
+        metrics: Dictionary of :py:class:`pymaker.pipeline.StageMetrics` by stage name.
+        last_block_latency: Time between the last block being submitted and the last stage
+            finishing processing it (in seconds).
+    """
+    logger = logging.getLogger()
+
+    def __init__(self, stages: List[Tuple[str, Callable]], queue_size: int = 1,
+                 process_stages: Optional[List[str]] = None, max_workers: Optional[int] = None):
+        assert isinstance(stages, list)
+        assert len(stages) > 0
+        assert all(isinstance(name, str) and callable(function) for name, function in stages)
+        assert isinstance(queue_size, int)
+        assert queue_size > 0
+        assert isinstance(process_stages, list) or process_stages is None
+        assert isinstance(max_workers, int) or max_workers is None
+
+        self.stages = stages
+        self.process_stages = process_stages or []
+        assert all(name in [stage[0] for stage in stages[1:]] for name in self.process_stages)
+
+        self.max_workers = max_workers
+        self.metrics = {name: StageMetrics() for name, _ in stages}
+        self.last_block_latency = None
+
+        self._queues = [Queue(maxsize=queue_size) for _ in stages]
+        self._threads = []
+        self._process_pool = None
+
+    def start(self):
+        assert len(self._threads) == 0, "Pipeline has already been started"
+
+        # workers get started before any stage thread is, see `start_worker_pool`
+        if len(self.process_stages) > 0:
+            self._process_pool = start_worker_pool(self.max_workers)
+
+        for index, (name, function) in enumerate(self.stages):
+            thread = threading.Thread(target=self._run_stage, args=(index,), name=f"pipeline-{name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Lets all stages finish the blocks they have been passed, then stops them."""
+        if len(self._threads) > 0:
+            self._queues[0].put(_STOP)
+            for thread in self._threads:
+                thread.join()
+
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=True)
+
+    def submit(self, context: BlockContext):
+        """Passes a new block to the first stage."""
+        assert isinstance(context, BlockContext)
+
+        self._put(0, (context, None, time.monotonic()))
+
+    def _put(self, index: int, item):
+        queue = self._queues[index]
+        while True:
+            try:
+                queue.put_nowait(item)
+                return
+            except Full:
+                try:
+                    dropped = queue.get_nowait()
+                    if dropped is _STOP:
+                        queue.put(dropped)
+                        return
+
+                    self.metrics[self.stages[index][0]].dropped += 1
+                    self.logger.debug(f"Dropping block #{dropped[0].number} from stage {self.stages[index][0]},"
+                                      f" as block #{item[0].number} is waiting")
+                except Empty:
+                    pass
+
+    def _run_stage(self, index: int):
+        name, function = self.stages[index]
+        metrics = self.metrics[name]
+        last_stage = index == len(self.stages) - 1
+
+        while True:
+            item = self._queues[index].get()
+            if item is _STOP:
+                if not last_stage:
+                    self._queues[index + 1].put(_STOP)
+                return
+
+            context, previous_result, submitted = item
+            started = time.monotonic()
+            failed = False
+            result = None
+            try:
+                if name in self.process_stages:
+                    result = self._call_in_process(metrics, function, context.header, previous_result)
+                else:
+                    result = function(context) if index == 0 else function(context, previous_result)
+            except:
+                failed = True
+                self.logger.exception(f"Stage {name} failed to process block #{context.number}")
+            finally:
+                metrics.record(time.monotonic() - started, failed)
+
+            if last_stage:
+                self.last_block_latency = time.monotonic() - submitted
+            elif not failed and result is not None:
+                self._put(index + 1, (context, result, submitted))
+
+    def _call_in_process(self, metrics: StageMetrics, function: Callable, header: BlockHeader, previous_result):
+        payload = pickle.dumps((function, (header, previous_result)), protocol=pickle.HIGHEST_PROTOCOL)
+        metrics.last_input_size = len(payload)
+
+        result = self._process_pool.submit(_run_in_process, payload).result()
+        metrics.last_output_size = len(result)
+        return pickle.loads(result)
+
+    def __repr__(self):
+        return f"Pipeline({[name for name, _ in self.stages]})"
@@ -23,7 +23,7 @@ from web3._utils.events import get_event_data
 from eth_abi.codec import ABICodec
 from eth_abi.registry import registry as default_registry
 
-from pymaker import Address, Contract, Transact, Receipt, Calldata
+from pymaker import Address, Contract, Transact, Receipt, Calldata, ZERO_ADDRESS
 from pymaker.util import hexstring_to_bytes
 
 
@@ -57,7 +57,7 @@ class DSProxyCache(Contract):
             b32_code = hexstring_to_bytes('0x' + code)
         address = Address(self._contract.functions.read(b32_code).call())
 
-        if address == Address('0x0000000000000000000000000000000000000000'):
+        if address == ZERO_ADDRESS:
             return None
         else:
             return address
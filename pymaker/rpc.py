@@ -0,0 +1,251 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 MakerDAO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+from web3 import Web3
+
+from pymaker import Transact
+from pymaker.metrics import MetricsSink
+
+
+_context = threading.local()
+
+
+@contextmanager
+def rpc_origin(origin: str):
+    """Attributes all JSON-RPC calls made within the `with` block to `origin`.
+
+    Calls are attributed automatically to the innermost pymaker method on the call stack,
+    this context manager can be used to override it, i.e. in keeper code:
+
+        with rpc_origin("AuctionKeeper.check_all_auctions"):
+            ...
+
+    Args:
+        origin: Name the calls should be attributed to.
+    """
+    assert(isinstance(origin, str))
+
+    if not hasattr(_context, 'origins'):
+        _context.origins = []
+
+    _context.origins.append(origin)
+    try:
+        yield
+    finally:
+        _context.origins.pop()
+
+
+class RpcStats:
+    """Statistics of JSON-RPC calls of one method made by one origin.
+
+    Attributes:
+        method: JSON-RPC method name, i.e. `eth_call`.
+        origin: Name of the class and method which made the calls, i.e. `Vat.urn`.
+        count: Number of calls made.
+        errors: Number of calls which raised an exception or returned an error.
+        total_time: Total time spent in the calls (in seconds).
+        max_time: The longest time spent in a single call (in seconds).
+    """
+    def __init__(self, method: str, origin: str):
+        self.method = method
+        self.origin = origin
+        self.count = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def to_dict(self) -> dict:
+        return {'method': self.method,
+                'origin': self.origin,
+                'count': self.count,
+                'errors': self.errors,
+                'total_time': self.total_time,
+                'max_time': self.max_time}
+
+    def __repr__(self):
+        return f"RpcStats({self.to_dict()})"
+
+
+class RpcAccounting:
+    """Counts and times every JSON-RPC call made through a `Web3` instance.
+
+    Each call is attributed to the `Contract` subclass (or any other class) and method it
+    originated from, i.e. `Vat.urn`, `Flipper.bids` or `Lifecycle.new_block_callback`. The
+    innermost method on the call stack defined in one of `modules` is used, unless overridden
+    with :py:func:`pymaker.rpc.rpc_origin`. Calls made while executing a :py:class:`pymaker.Transact`
+    are attributed to the contract method the transaction invokes, i.e. `Cat.bite`.
+
+    The typical usage pattern is as follows:
+
+        rpc_accounting = RpcAccounting()
+        rpc_accounting.install(web3)
+        ...
+        lifecycle.every(60, rpc_accounting.log_summary)
+
+    Attributes:
+        metrics_sink: Optional :py:class:`pymaker.metrics.MetricsSink` the call counts and timings
+            should also be reported to, as `rpc_requests_total` and `rpc_seconds` metrics.
+        modules: Prefixes of module names whose methods calls can be attributed to.
+    """
+    logger = logging.getLogger()
+
+    def __init__(self, metrics_sink: Optional[MetricsSink] = None, modules: Tuple[str, ...] = ('pymaker',)):
+        assert(isinstance(metrics_sink, MetricsSink) or (metrics_sink is None))
+        assert(isinstance(modules, tuple))
+
+        self.metrics_sink = metrics_sink
+        self.modules = modules
+        self.web3 = None
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._last_summary = None
+
+    def install(self, web3: Web3):
+        """Adds the accounting middleware to the `Web3` instance.
+
+        Args:
+            web3: An instance of `Web3` from `web3.py`.
+        """
+        assert(isinstance(web3, Web3))
+
+        self.web3 = web3
+        web3.middleware_onion.add(self.middleware, name='rpc_accounting')
+
+    def middleware(self, make_request, web3):
+        """The `web3.py` middleware. Use `install` unless you need to control the middleware ordering."""
+        def accounting_middleware(method, params):
+            origin = self.origin()
+            start = time.perf_counter()
+            failed = True
+            try:
+                response = make_request(method, params)
+                failed = 'error' in response
+                return response
+            finally:
+                self._record(method, origin, time.perf_counter() - start, failed)
+
+        return accounting_middleware
+
+    def origin(self) -> str:
+        """Returns the name of the class and method the current call should be attributed to."""
+        origins = getattr(_context, 'origins', None)
+        if origins:
+            return origins[-1]
+
+        frame = sys._getframe(1)
+        while frame is not None:
+            module = frame.f_globals.get('__name__', '')
+            if module != __name__ and module.startswith(self.modules):
+                instance = frame.f_locals.get('self')
+                if isinstance(instance, Transact) and instance.origin is not None:
+                    return f"{type(instance.origin).__name__}.{instance.function_name}"
+                elif instance is not None:
+                    return f"{type(instance).__name__}.{frame.f_code.co_name}"
+
+            frame = frame.f_back
+
+        return "unknown"
+
+    def _record(self, method: str, origin: str, duration: float, failed: bool):
+        with self._lock:
+            key = (method, origin)
+            if key not in self._stats:
+                self._stats[key] = RpcStats(method, origin)
+
+            stats = self._stats[key]
+            stats.count += 1
+            stats.errors += 1 if failed else 0
+            stats.total_time += duration
+            stats.max_time = max(stats.max_time, duration)
+
+        if self.metrics_sink is not None:
+            labels = {'method': method, 'origin': origin}
+            self.metrics_sink.increment("rpc_requests_total", 1, labels)
+            self.metrics_sink.observe("rpc_seconds", duration, labels)
+
+    def snapshot(self) -> list:
+        """Returns the statistics collected so far.
+
+        Returns:
+            A list of dictionaries, one per each (method, origin) pair, having the same keys as the
+            attributes of :py:class:`pymaker.rpc.RpcStats`. Sorted by total time spent, descending.
+        """
+        with self._lock:
+            result = [stats.to_dict() for stats in self._stats.values()]
+
+        return sorted(result, key=lambda stats: stats['total_time'], reverse=True)
+
+    def totals_by_origin(self) -> dict:
+        """Returns the number of calls made by each origin, regardless of the JSON-RPC method."""
+        result = {}
+        for stats in self.snapshot():
+            result[stats['origin']] = result.get(stats['origin'], 0) + stats['count']
+
+        return result
+
+    def reset(self):
+        """Forgets the statistics collected so far, including those of the last summary logged."""
+        with self._lock:
+            self._stats = {}
+            self._last_summary = None
+
+    def log_summary(self, top: int = 10):
+        """Logs a summary of the calls made so far, meant to be called periodically.
+
+        Apart from the `top` most expensive (method, origin) pairs, the number of calls made since the last
+        summary is logged. If the accounting has been installed with `install`, it is also related to
+        the number of blocks mined in the meantime.
+
+        Args:
+            top: Number of most expensive (method, origin) pairs to log.
+        """
+        assert(isinstance(top, int))
+
+        snapshot = self.snapshot()
+        total_calls = sum(stats['count'] for stats in snapshot)
+
+        block_number = None
+        if self.web3 is not None:
+            with rpc_origin("RpcAccounting.log_summary"):
+                block_number = self.web3.eth.blockNumber
+
+        if self._last_summary is not None:
+            last_block_number, last_total_calls = self._last_summary
+            calls = total_calls - last_total_calls
+            if block_number is not None and last_block_number is not None and block_number > last_block_number:
+                self.logger.info(f"Made {calls} RPC calls in the last {block_number - last_block_number} block(s),"
+                                 f" {calls / (block_number - last_block_number):.1f} per block")
+            else:
+                self.logger.info(f"Made {calls} RPC calls since the last summary")
+
+        self._last_summary = (block_number, total_calls)
+
+        self.logger.info(f"Made {total_calls} RPC calls in total, top {min(top, len(snapshot))} by time spent:")
+        for stats in snapshot[:top]:
+            self.logger.info(f"  {stats['origin']} {stats['method']}: {stats['count']} call(s),"
+                             f" {stats['total_time']:.3f}s total, {stats['max_time']:.3f}s max,"
+                             f" {stats['errors']} error(s)")
+
+    def __repr__(self):
+        return f"RpcAccounting()"
@@ -0,0 +1,318 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 MakerDAO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Optional
+
+from pymaker.metrics import MetricsSink
+
+
+class ScheduledCallback:
+    """A callback run on the worker pool of a :py:class:`pymaker.scheduler.Scheduler`.
+
+    Behaves like :py:class:`pymaker.util.AsyncCallback`, i.e. triggering it while the previous
+    invocation is still queued or running does nothing, but it does not start a thread of its own.
+    Exceptions raised by the callback get logged.
+
+    Attributes:
+        callback: The callback function.
+        name: Name of the callback, used for logging.
+        period: Expected interval between invocations (in seconds), invocations taking longer
+            count as overruns. `None` if the callback is not invoked regularly.
+        runs: Number of finished invocations.
+        failures: Number of invocations which raised an exception.
+        skipped: Number of triggers ignored because the previous invocation had not finished yet.
+        overruns: Number of invocations which took longer than `period`.
+        last_duration: Duration of the last finished invocation (in seconds).
+        last_finished: `time.monotonic()` of the end of the last finished invocation.
+
+    If `metrics_sink` of the scheduler is set, invocation durations get reported as the
+    `lifecycle_callback_duration_seconds` histogram, failures, skipped triggers and overruns
+    as `lifecycle_callback_failures_total`, `lifecycle_callback_skipped_total` and
+    `lifecycle_callback_overruns_total` counters, all labelled with the `callback` name.
+    """
+    logger = logging.getLogger()
+
+    def __init__(self, scheduler: 'Scheduler', callback: Callable, name: str, period: Optional[float] = None):
+        assert isinstance(scheduler, Scheduler)
+        assert callable(callback)
+        assert isinstance(name, str)
+        assert isinstance(period, (int, float)) or period is None
+
+        self.callback = callback
+        self.name = name
+        self.period = period
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.overruns = 0
+        self.last_duration = None
+        self.last_finished = None
+
+        self._scheduler = scheduler
+        self._future = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        """`True` if an invocation is queued or running."""
+        future = self._future
+        return future is not None and not future.done()
+
+    def trigger(self, on_start=None, on_finish=None, args: tuple = ()) -> bool:
+        """Queues an invocation of the callback on the worker pool, unless one is already queued or running.
+
+        Arguments:
+            on_start: Optional method to be called before the actual callback. Can be `None`.
+            on_finish: Optional method to be called after the actual callback. Can be `None`.
+            args: Optional arguments to invoke the callback with.
+
+        Returns:
+            `True` if the callback has been queued, `False` if the previous invocation still hasn't finished.
+        """
+        with self._lock:
+            if self.running:
+                self.skipped += 1
+                self._increment('lifecycle_callback_skipped_total')
+                return False
+
+            self._future = self._scheduler.submit(self._run, on_start, on_finish, args)
+            return True
+
+    def wait(self):
+        """Waits for the currently queued or running invocation to finish.
+
+        If the callback isn't running or hasn't even been invoked once, returns instantly."""
+        future = self._future
+        if future is not None:
+            wait([future])
+
+    def _run(self, on_start, on_finish, args: tuple):
+        started = time.monotonic()
+        try:
+            if on_start is not None:
+                on_start()
+            self.callback(*args)
+            if on_finish is not None:
+                on_finish()
+        except:
+            self.failures += 1
+            self._increment('lifecycle_callback_failures_total')
+            self.logger.exception(f"Callback {self.name} failed")
+        finally:
+            self.last_finished = time.monotonic()
+            self.last_duration = self.last_finished - started
+            self.runs += 1
+            self._observe('lifecycle_callback_duration_seconds', self.last_duration)
+            if self.period is not None and self.last_duration > self.period:
+                self.overruns += 1
+                self._increment('lifecycle_callback_overruns_total')
+                self.logger.warning(f"Callback {self.name} took {self.last_duration:.1f} seconds,"
+                                    f" longer than its period of {self.period} seconds")
+
+    def _observe(self, name: str, value: float):
+        if self._scheduler.metrics_sink is not None:
+            self._scheduler.metrics_sink.observe(name, value, {'callback': self.name})
+
+    def _increment(self, name: str):
+        if self._scheduler.metrics_sink is not None:
+            self._scheduler.metrics_sink.increment(name, 1, {'callback': self.name})
+
+    def __repr__(self):
+        return f"ScheduledCallback('{self.name}')"
+
+
+class _Watch:
+    def __init__(self, event: threading.Event, min_frequency: float, callback: ScheduledCallback, function: Callable):
+        self.event = event
+        self.min_frequency = min_frequency
+        self.callback = callback
+        self.function = function
+        self.last_fired = None
+
+    def due(self, now: float) -> bool:
+        if self.last_fired is None:
+            return True
+
+        last_finished = self.callback.last_finished
+        since = max(self.last_fired, last_finished) if last_finished is not None else self.last_fired
+        return now >= since + self.min_frequency
+
+
+class Scheduler:
+    """Runs the timers and event watches of a keeper on a single thread, and callbacks on a bounded worker pool.
+
+    Timers are kept in a heap ordered by their next deadline. Functions registered with `every` and
+    `watch` are called from the scheduler thread, so they should only trigger callbacks created
+    with `callback` and return quickly. Events are checked every `poll_interval` seconds.
+
+    Args:
+        max_workers: Maximum number of callbacks running at the same time.
+        poll_interval: Interval of checking the events being watched (in seconds).
+
+    Attributes:
+        callbacks: All callbacks created with `callback`.
+        metrics_sink: Optional :py:class:`pymaker.metrics.MetricsSink` the callbacks report to.
+    """
+    logger = logging.getLogger()
+
+    def __init__(self, max_workers: int = 8, poll_interval: float = 0.1):
+        assert isinstance(max_workers, int)
+        assert max_workers > 0
+        assert isinstance(poll_interval, (int, float))
+
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.callbacks = []
+        self.metrics_sink: Optional[MetricsSink] = None
+
+        self._timers = []
+        self._watches = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._executor = None
+        self._thread = None
+        self._running = False
+
+    def callback(self, callback: Callable, name: str, period: Optional[float] = None) -> ScheduledCallback:
+        """Creates a callback to be run on the worker pool, see :py:class:`pymaker.scheduler.ScheduledCallback`."""
+        scheduled_callback = ScheduledCallback(self, callback, name, period)
+        self.callbacks.append(scheduled_callback)
+        return scheduled_callback
+
+    def every(self, interval: float, function: Callable, initial_delay: Optional[float] = None):
+        """Calls `function` from the scheduler thread every `interval` seconds.
+
+        Args:
+            interval: Interval between calls (in seconds).
+            function: Function to be called, with no arguments.
+            initial_delay: Delay before the first call (in seconds), `interval` if `None`.
+        """
+        assert isinstance(interval, (int, float))
+        assert interval > 0
+        assert callable(function)
+
+        first = time.monotonic() + (initial_delay if initial_delay is not None else interval)
+        with self._condition:
+            heapq.heappush(self._timers, (first, next(self._sequence), interval, function))
+            self._condition.notify()
+
+    def watch(self, event: threading.Event, min_frequency: float, callback: ScheduledCallback, function: Callable):
+        """Calls `function` from the scheduler thread whenever `event` gets set, but at least every
+        `min_frequency` seconds after `callback` last finished. Never calls it while `callback` is running.
+
+        Args:
+            event: Event to be watched, it gets cleared before `function` is called.
+            min_frequency: Maximum time between `callback` finishing and the next call (in seconds).
+            callback: Callback triggered by `function`.
+            function: Function to be called with `True` if `event` has been set, `False` otherwise.
+        """
+        assert isinstance(event, threading.Event)
+        assert isinstance(min_frequency, (int, float))
+        assert isinstance(callback, ScheduledCallback)
+        assert callable(function)
+
+        with self._condition:
+            self._watches.append(_Watch(event, min_frequency, callback, function))
+            self._condition.notify()
+
+    def submit(self, function: Callable, *args):
+        assert self._executor is not None, "Scheduler has not been started"
+
+        return self._executor.submit(function, *args)
+
+    def start(self):
+        assert self._thread is None, "Scheduler has already been started"
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='keeper-worker')
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='keeper-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops calling timers and watches, then waits for all queued callbacks to finish."""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+
+        if self._thread is not None:
+            self._thread.join()
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._running:
+                    break
+
+                self._condition.wait(self._timeout(time.monotonic()))
+
+                if not self._running:
+                    break
+
+                now = time.monotonic()
+                due = []
+                while len(self._timers) > 0 and self._timers[0][0] <= now:
+                    when, sequence, interval, function = heapq.heappop(self._timers)
+                    due.append(function)
+
+                    # deadlines missed while the scheduler was late are not caught up on
+                    when = when + interval if when + interval > now else now + interval
+                    heapq.heappush(self._timers, (when, sequence, interval, function))
+
+                watches = list(self._watches)
+
+            for function in due:
+                self._call(function)
+
+            for watch in watches:
+                if watch.callback.running:
+                    continue
+
+                if watch.event.is_set():
+                    watch.event.clear()
+                    watch.last_fired = now
+                    self._call(watch.function, True)
+                elif watch.due(now):
+                    watch.last_fired = now
+                    self._call(watch.function, False)
+
+    def _timeout(self, now: float) -> Optional[float]:
+        timeout = None
+        if len(self._timers) > 0:
+            timeout = max(self._timers[0][0] - now, 0)
+
+        if len(self._watches) > 0:
+            timeout = min(timeout, self.poll_interval) if timeout is not None else self.poll_interval
+
+        return timeout
+
+    def _call(self, function: Callable, *args):
+        try:
+            function(*args)
+        except:
+            self.logger.exception(f"Scheduled function {function} failed")
+
+    def __repr__(self):
+        return f"Scheduler({self.max_workers} workers, {len(self.callbacks)} callbacks)"
@@ -0,0 +1,149 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 MakerDAO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+from threading import Lock
+from typing import Callable, Optional
+
+from web3 import Web3
+
+from pymaker import Address
+from pymaker.blocks import BlockHeader, LogInterest, get_block_logs
+
+
+class LogSubscription:
+    """A single subscription registered with :py:class:`pymaker.subscriptions.LogSubscriptions`.
+
+    Attributes:
+        interest: Logs the subscription selects.
+        decoder: Function turning a raw log into an event, or `None` to pass raw logs to `handler`.
+        handler: Function called with each decoded event.
+    """
+    def __init__(self, subscriptions: 'LogSubscriptions', interest: LogInterest, decoder: Optional[Callable],
+                 handler: Callable):
+        self._subscriptions = subscriptions
+        self.interest = interest
+        self.decoder = decoder
+        self.handler = handler
+
+    def cancel(self):
+        """Stops dispatching events to the handler."""
+        self._subscriptions.unsubscribe(self)
+
+    def __repr__(self):
+        return f"LogSubscription({self.interest})"
+
+
+class LogSubscriptions:
+    """Multiplexes live log subscriptions of many contracts onto the stream of new blocks.
+
+    Instead of every contract polling its own filter, subscriptions are registered here and
+    each new block is handled by at most one `eth_getLogs` call for all of them. The call is
+    skipped altogether if the `logsBloom` of the block rules out all subscriptions.
+
+    Events get dispatched in the order their logs appear in the block, from the thread
+    `process_block` is called by. :py:class:`pymaker.lifecycle.Lifecycle` calls it for every new
+    block, so the typical usage pattern is as follows:
+
+        with Lifecycle(self.web3) as lifecycle:
+            self.vat.on_frob(lifecycle.subscriptions, self.handle_frob)
+            self.cat.on_bite(lifecycle.subscriptions, self.handle_bite)
+
+    Handlers should return quickly, any exception they raise gets logged and ignored.
+
+    Args:
+        web3: An instance of `Web` from `web3.py`.
+    """
+    logger = logging.getLogger()
+
+    def __init__(self, web3: Web3):
+        self.web3 = web3
+        self._subscriptions = []
+        self._lock = Lock()
+
+    def subscribe(self, address: Address, topics: Optional[list], decoder: Optional[Callable],
+                  handler: Callable) -> LogSubscription:
+        """Subscribes to logs emitted by a contract.
+
+        Args:
+            address: Address of the contract.
+            topics: Optional list of first topics (event signatures) to select, all logs are selected if `None`.
+            decoder: Function turning a raw log into an event, or returning `None` for logs to be skipped.
+                Raw logs are passed to `handler` if `None`.
+            handler: Function to be called with each event.
+
+        Returns:
+            The subscription, which can be used to cancel it.
+        """
+        assert isinstance(address, Address)
+        assert callable(decoder) or decoder is None
+        assert callable(handler)
+
+        subscription = LogSubscription(self, LogInterest(address, topics), decoder, handler)
+        with self._lock:
+            self._subscriptions = self._subscriptions + [subscription]
+
+        return subscription
+
+    def unsubscribe(self, subscription: LogSubscription):
+        assert isinstance(subscription, LogSubscription)
+
+        with self._lock:
+            self._subscriptions = [item for item in self._subscriptions if item is not subscription]
+
+    def process_block(self, header: BlockHeader) -> int:
+        """Fetches logs of a block and dispatches them to the subscriptions they are selected by.
+
+        Args:
+            header: Header of the new block.
+
+        Returns:
+            The number of events dispatched.
+        """
+        assert isinstance(header, BlockHeader)
+
+        subscriptions = self._subscriptions
+        if len(subscriptions) == 0:
+            return 0
+
+        dispatched = 0
+        for log in get_block_logs(self.web3, header, [subscription.interest for subscription in subscriptions]):
+            for subscription in subscriptions:
+                if subscription.interest.matches(log):
+                    if self._dispatch(subscription, log):
+                        dispatched += 1
+
+        return dispatched
+
+    def _dispatch(self, subscription: LogSubscription, log: dict) -> bool:
+        try:
+            event = subscription.decoder(log) if subscription.decoder is not None else log
+            if event is None:
+                return False
+
+            subscription.handler(event)
+            return True
+        except:
+            self.logger.exception(f"Failed to handle log of {subscription.interest.address}"
+                                  f" in block #{log.get('blockNumber')}")
+            return False
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    def __repr__(self):
+        return f"LogSubscriptions({len(self)} subscriptions)"
@@ -18,9 +18,12 @@
 import asyncio
 import logging
 import threading
+import time
+from typing import Optional
 
 from web3 import Web3
 
+from pymaker.metrics import MetricsSink
 from pymaker.numeric import Wad
 
 
@@ -110,14 +113,24 @@ class AsyncCallback:
     Invoking the callback logic in a separate thread allows the web3.py Filter thread
     to keep calling `eth_getFilterChanges` regularly, so the filter stays active.
 
+    If `metrics_sink` is set, durations of invocations get reported as the `lifecycle_callback_duration_seconds`
+    histogram and ignored triggers as the `lifecycle_callback_skipped_total` counter, labelled with `name`.
+
     Attributes:
         callback: The callback function to be invoked in a separate thread.
+        name: Optional name of the callback, used for labelling metrics.
+        metrics_sink: Optional :py:class:`pymaker.metrics.MetricsSink` to report to.
     """
-    def __init__(self, callback):
+    def __init__(self, callback, name: str = '', metrics_sink: Optional[MetricsSink] = None):
+        assert(isinstance(name, str))
+        assert(isinstance(metrics_sink, MetricsSink) or (metrics_sink is None))
+
         self.callback = callback
+        self.name = name
+        self.metrics_sink = metrics_sink
         self.thread = None
 
-    def trigger(self, on_start=None, on_finish=None) -> bool:
+    def trigger(self, on_start=None, on_finish=None, args: tuple = ()) -> bool:
         """Invokes the callback in a separate thread, unless one is already running.
 
         If callback isn't currently running, invokes it in a separate thread and returns `True`.
@@ -127,6 +140,7 @@ class AsyncCallback:
         Arguments:
             on_start: Optional method to be called before the actual callback. Can be `None`.
             on_finish: Optional method to be called after the actual callback. Can be `None`.
+            args: Optional arguments to invoke the callback with.
 
         Returns:
             `True` if callback has been invoked, or if it invocation attempt failed.
@@ -136,7 +150,13 @@ class AsyncCallback:
             def thread_target():
                 if on_start is not None:
                     on_start()
-                self.callback()
+                started = time.monotonic()
+                try:
+                    self.callback(*args)
+                finally:
+                    if self.metrics_sink is not None:
+                        self.metrics_sink.observe('lifecycle_callback_duration_seconds', time.monotonic() - started,
+                                                  {'callback': self.name})
                 if on_finish is not None:
                     on_finish()
 
@@ -151,6 +171,9 @@ class AsyncCallback:
 
             return True
         else:
+            if self.metrics_sink is not None:
+                self.metrics_sink.increment('lifecycle_callback_skipped_total', 1, {'callback': self.name})
+
             return False
 
     def wait(self):
@@ -30,7 +30,7 @@ from web3._utils.events import get_event_data
 from eth_abi.codec import ABICodec
 from eth_abi.registry import registry as default_registry
 
-from pymaker import Contract, Address, Transact
+from pymaker import Contract, Address, Transact, ZERO_ADDRESS
 from pymaker.numeric import Wad
 from pymaker.sign import eth_sign, to_vrs
 from pymaker.token import ERC20Token
@@ -265,7 +265,7 @@ class ZrxExchange(Contract):
     abi = Contract._load_abi(__name__, 'abi/Exchange.abi')
     bin = Contract._load_bin(__name__, 'abi/Exchange.bin')
 
-    _ZERO_ADDRESS = Address("0x0000000000000000000000000000000000000000")
+    _ZERO_ADDRESS = ZERO_ADDRESS
 
     @staticmethod
     def deploy(web3: Web3, zrx_token: Address, token_transfer_proxy: Address):
@@ -32,9 +32,10 @@ from web3._utils.events import get_event_data
 from eth_abi.codec import ABICodec
 from eth_abi.registry import registry as default_registry
 
-from pymaker import Contract, Address, Transact
+from pymaker import Contract, Address, Transact, ZERO_ADDRESS
 from pymaker.numeric import Wad
 from pymaker.sign import eth_sign, to_vrs
+from pymaker.subscriptions import LogSubscription, LogSubscriptions
 from pymaker.token import ERC20Token
 from pymaker.util import bytes_to_hexstring, hexstring_to_bytes, http_response_summary
 
@@ -309,7 +310,7 @@ class ZrxExchangeV2(Contract):
     abi = Contract._load_abi(__name__, 'abi/ExchangeV2.abi')
     bin = Contract._load_bin(__name__, 'abi/ExchangeV2.bin')
 
-    _ZERO_ADDRESS = Address("0x0000000000000000000000000000000000000000")
+    _ZERO_ADDRESS = ZERO_ADDRESS
 
     ORDER_INFO_TYPE = '(address,address,address,address,uint256,uint256,uint256,uint256,uint256,uint256,bytes,bytes)'
 
@@ -399,6 +400,17 @@ class ZrxExchangeV2(Contract):
 
         return self._past_events(self._contract, 'Fill', LogFill, number_of_past_blocks, event_filter)
 
+    def on_fill(self, subscriptions: LogSubscriptions, handler) -> LogSubscription:
+        """Subscribe to new LogFill events.
+
+        Args:
+            subscriptions: Subscriptions to register with, i.e. `Lifecycle.subscriptions`.
+            handler: Function which will be called with each new event, as :py:class:`pymaker.zrxv2.LogFill`.
+        """
+        assert(isinstance(subscriptions, LogSubscriptions))
+
+        return self._on_event(self._contract, 'Fill', LogFill, subscriptions, handler)
+
     def past_cancel(self, number_of_past_blocks: int, event_filter: dict = None) -> List[LogCancel]:
         """Synchronously retrieve past LogCancel events.
 
@@ -52,4 +52,9 @@ setup(
         'requests==2.22.0',
         'eth-keys<0.3.0,>=0.2.1'
         ],
+
+    # Optional dependencies, i.e. `pip install pymaker[columnar]`.
+    extras_require={
+        'columnar': ['numpy'],
+    },
 )
@@ -0,0 +1,362 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 MakerDAO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from unittest.mock import Mock
+
+import pytest
+
+from eth_utils import keccak
+from hexbytes import HexBytes
+from web3 import Web3
+
+from pymaker import Address
+from pymaker.blocks import BlockCancelled, BlockContext, BlockHeader, BlockHeaderCache, BlockStream, LogInterest, block_cache, bloom_may_contain, \
+    current_block_context, get_block_logs
+
+VAT = Address('0x0000011111000001111100000111110000011111')
+CAT = Address('0x00000000001111111111000000000011111111AB')
+FROB = bytes.fromhex('76088703' + '00' * 28)
+BITE = keccak(text='Bite(bytes32,address,uint256,uint256,uint256,address,uint256)')
+
+
+def block(number: int, fork: int = 0) -> dict:
+    return {'number': number,
+            'hash': HexBytes(bytes([fork]) + number.to_bytes(31, 'big')),
+            'parentHash': HexBytes(bytes([fork]) + (number - 1).to_bytes(31, 'big')),
+            'timestamp': 1500000000 + number * 15,
+            'logsBloom': HexBytes(bytes(256))}
+
+
+def mock_web3() -> Mock:
+    web3 = Mock(Web3)
+    web3.eth = Mock()
+    web3.eth.getBlock = Mock(side_effect=lambda identifier: block(identifier) if isinstance(identifier, int)
+                             else block(int.from_bytes(HexBytes(identifier)[1:], 'big')))
+    return web3
+
+
+def logs_bloom(*values: bytes) -> bytes:
+    # the way `eth-bloom` builds blooms, as a 2048-bit integer
+    bloom = 0
+    for value in values:
+        value_hash = keccak(value)
+        for i in (0, 2, 4):
+            bloom |= 1 << (((value_hash[i] << 8) + value_hash[i+1]) & 2047)
+
+    return bloom.to_bytes(256, 'big')
+
+
+def header_with_bloom(*values: bytes) -> BlockHeader:
+    return BlockHeader(7, b'\x07' * 32, b'\x06' * 32, 1500000000, logs_bloom(*values))
+
+
+class TestBlockHeaderCache:
+    def test_should_fetch_once(self):
+        # given
+        web3 = mock_web3()
+        cache = BlockHeaderCache(web3)
+
+        # when
+        first = cache.timestamp(10)
+        second = cache.timestamp(10)
+
+        # then
+        assert first == second == 1500000150
+        assert web3.eth.getBlock.call_count == 1
+
+    def test_should_find_headers_by_hash(self):
+        # given
+        web3 = mock_web3()
+        cache = BlockHeaderCache(web3)
+        cache.put(BlockHeader.from_block(block(7)))
+
+        # expect
+        assert cache.get(block(7)['hash']).number == 7
+        assert cache.get(block(7)['hash'].hex()).number == 7
+        assert web3.eth.getBlock.call_count == 0
+
+    def test_should_replace_reorged_headers(self):
+        # given
+        cache = BlockHeaderCache(mock_web3())
+        cache.put(BlockHeader.from_block(block(7)))
+
+        # when
+        cache.put(BlockHeader.from_block(block(7, fork=1)))
+
+        # then
+        assert cache.cached(7).hash == bytes(block(7, fork=1)['hash'])
+        assert cache.cached(block(7)['hash']) is None
+
+    def test_should_not_replace_canonical_headers_with_ones_fetched_by_hash(self):
+        # given
+        web3 = mock_web3()
+        web3.eth.getBlock = Mock(return_value=block(7, fork=1))
+        cache = BlockHeaderCache(web3)
+        cache.put(BlockHeader.from_block(block(7)))
+
+        # when
+        orphan = cache.get(block(7, fork=1)['hash'])
+
+        # then
+        assert orphan.hash == bytes(block(7, fork=1)['hash'])
+        assert cache.cached(7).hash == bytes(block(7)['hash'])
+        assert cache.cached(block(7, fork=1)['hash']) == orphan
+        assert web3.eth.getBlock.call_count == 1
+
+    def test_should_evict_least_recently_used(self):
+        # given
+        cache = BlockHeaderCache(mock_web3(), max_size=2)
+        cache.put(BlockHeader.from_block(block(1)))
+        cache.put(BlockHeader.from_block(block(2)))
+        cache.cached(1)
+
+        # when
+        cache.put(BlockHeader.from_block(block(3)))
+
+        # then
+        assert len(cache) == 2
+        assert cache.cached(2) is None
+        assert cache.cached(1) is not None
+
+    def test_should_backfill_missing_headers(self):
+        # given
+        web3 = mock_web3()
+        cache = BlockHeaderCache(web3)
+        cache.put(BlockHeader.from_block(block(5)))
+
+        # when
+        headers = cache.backfill(1, 10)
+
+        # then
+        assert [header.number for header in headers] == list(range(1, 11))
+        assert web3.eth.getBlock.call_count == 9
+        assert cache.timestamp(3) == 1500000045
+        assert web3.eth.getBlock.call_count == 9
+
+    def test_should_be_shared_per_web3(self):
+        # given
+        web3 = mock_web3()
+
+        # expect
+        assert block_cache(web3) is block_cache(web3)
+        assert block_cache(web3) is not block_cache(mock_web3())
+
+
+class TestLogsBloom:
+    def test_should_find_values(self):
+        # given
+        bloom = logs_bloom(VAT.as_bytes(), FROB)
+
+        # expect
+        assert bloom_may_contain(bloom, VAT.as_bytes())
+        assert bloom_may_contain(bloom, FROB)
+        assert not bloom_may_contain(bloom, CAT.as_bytes())
+        assert not bloom_may_contain(bytes(256), FROB)
+
+    def test_should_check_interests(self):
+        # given
+        header = header_with_bloom(VAT.as_bytes(), FROB)
+
+        # expect
+        assert LogInterest(VAT).may_match(header)
+        assert LogInterest(VAT, [FROB]).may_match(header)
+        assert LogInterest(VAT, ['0x' + BITE.hex(), '0x' + FROB.hex()]).may_match(header)
+        assert not LogInterest(VAT, [BITE]).may_match(header)
+        assert not LogInterest(CAT).may_match(header)
+
+    def test_should_not_fetch_logs_if_bloom_does_not_match(self):
+        # given
+        web3 = mock_web3()
+        web3.eth.getLogs = Mock(return_value=[])
+
+        # when
+        logs = get_block_logs(web3, header_with_bloom(VAT.as_bytes(), FROB), [LogInterest(CAT, [BITE])])
+
+        # then
+        assert logs == []
+        assert web3.eth.getLogs.call_count == 0
+
+    def test_should_fetch_matching_logs(self):
+        # given
+        frob_log = {'address': VAT.address, 'topics': [HexBytes(FROB)]}
+        slip_log = {'address': VAT.address, 'topics': [HexBytes(bytes.fromhex('7cdd3fde' + '00' * 28))]}
+        web3 = mock_web3()
+        web3.eth.getLogs = Mock(return_value=[frob_log, slip_log])
+
+        # when
+        logs = get_block_logs(web3, header_with_bloom(VAT.as_bytes(), FROB), [LogInterest(VAT, [FROB]),
+                                                                            LogInterest(CAT, [BITE])])
+
+        # then
+        assert logs == [frob_log]
+        assert web3.eth.getLogs.call_args[0][0] == {'blockHash': '0x' + '07' * 32,
+                                                    'address': [VAT.address],
+                                                    'topics': [['0x' + FROB.hex()]]}
+
+
+class TestBlockStream:
+    def setup_method(self):
+        self.web3 = mock_web3()
+        self.stream = BlockStream(self.web3, confirmations=2)
+        self.events = []
+        self.stream.on_new_block(lambda header: self.events.append(('new', header.number, header.hash[0])))
+        self.stream.on_reorg(lambda removed, added: self.events.append(('reorg', [h.number for h in removed],
+                                                                        [h.number for h in added])))
+        self.stream.on_confirmed(lambda header: self.events.append(('confirmed', header.number)))
+
+    def test_should_emit_new_and_confirmed_blocks(self):
+        # when
+        for number in range(10, 14):
+            self.stream.add(BlockHeader.from_block(block(number)))
+
+        # then
+        assert self.events == [('new', 10, 0), ('new', 11, 0), ('new', 12, 0), ('confirmed', 10),
+                               ('new', 13, 0), ('confirmed', 11)]
+        assert self.web3.eth.getBlock.call_count == 0
+
+    def test_should_fill_gaps(self):
+        # given
+        self.stream.add(BlockHeader.from_block(block(10)))
+
+        # when
+        self.stream.add(BlockHeader.from_block(block(13)))
+
+        # then
+        assert [event[1] for event in self.events if event[0] == 'new'] == [10, 11, 12, 13]
+        assert self.stream.canonical(12).hash == bytes(block(12)['hash'])
+
+    def test_should_fill_gaps_longer_than_max_depth(self):
+        # given
+        stream = BlockStream(self.web3, confirmations=2, max_depth=5)
+        events = []
+        stream.on_new_block(lambda header: events.append(('new', header.number)))
+        stream.on_reorg(lambda removed, added: events.append(('reorg', len(removed))))
+        stream.add(BlockHeader.from_block(block(10)))
+
+        # when
+        stream.add(BlockHeader.from_block(block(30)))
+
+        # then
+        assert events == [('new', number) for number in range(10, 31)]
+        assert stream.head.number == 30
+        assert stream.canonical(28).hash == bytes(block(28)['hash'])
+
+    def test_should_backfill_gaps_by_number(self):
+        # given
+        self.stream.add(BlockHeader.from_block(block(10)))
+
+        # when
+        self.stream.add(BlockHeader.from_block(block(20)))
+
+        # then
+        assert sorted(call[0][0] for call in self.web3.eth.getBlock.call_args_list) == list(range(11, 20))
+
+    def test_should_skip_blocks_added_while_fetching_a_gap(self):
+        # given
+        self.stream.add(BlockHeader.from_block(block(10)))
+        branch = self.stream._branch(BlockHeader.from_block(block(13)))
+
+        # when
+        self.stream.add(BlockHeader.from_block(block(11)))
+        self.stream._extend(BlockHeader.from_block(block(13)), branch)
+
+        # then
+        assert [header.number for header in self.stream._chain] == [10, 11, 12, 13]
+        assert [header.number for header in branch] == [11, 12, 13]
+
+    def test_should_detect_reorgs(self):
+        # given
+        for number in range(10, 14):
+            self.stream.add(BlockHeader.from_block(block(number)))
+        self.events.clear()
+
+        # and
+        fork = {number: BlockHeader.from_block(block(number, fork=1)) for number in (12, 13, 14)}
+        fork[12].parent_hash = bytes(block(11)['hash'])
+        block_cache(self.web3).put(fork[12])
+        block_cache(self.web3).put(fork[13])
+
+        # when
+        self.stream.add(fork[14])
+
+        # then
+        assert self.events == [('reorg', [12, 13], [12, 13, 14]),
+                               ('new', 12, 1), ('new', 13, 1), ('new', 14, 1), ('confirmed', 12)]
+        assert self.stream.head == fork[14]
+        assert block_cache(self.web3).cached(13) == fork[13]
+        assert self.web3.eth.getBlock.call_count == 0
+
+    def test_should_ignore_known_blocks(self):
+        # given
+        self.stream.add(BlockHeader.from_block(block(10)))
+        self.stream.add(BlockHeader.from_block(block(11)))
+
+        # when
+        self.stream.add(BlockHeader.from_block(block(10)))
+
+        # then
+        assert self.events == [('new', 10, 0), ('new', 11, 0)]
+
+
+class TestBlockContext:
+    def test_should_expose_header_fields(self):
+        # given
+        context = BlockContext(BlockHeader.from_block(block(12)), [BlockHeader.from_block(block(11))])
+
+        # expect
+        assert context.number == 12
+        assert context.hash == bytes(block(12)['hash'])
+        assert context.parent_hash == bytes(block(11)['hash'])
+        assert context.timestamp == 1500000180
+        assert [header.number for header in context.skipped] == [11]
+
+    def test_should_cache_reads(self):
+        # given
+        context = BlockContext(BlockHeader.from_block(block(12)), [])
+        read = Mock(return_value=42)
+
+        # when
+        first = context.read('ilk', read)
+        second = context.read('ilk', read)
+
+        # then
+        assert first == second == 42
+        assert read.call_count == 1
+
+    def test_should_raise_once_cancelled(self):
+        # given
+        context = BlockContext(BlockHeader.from_block(block(12)), [])
+        context.read('ilk', lambda: 42)
+
+        # when
+        context.cancel()
+
+        # then
+        assert context.cancelled
+        with pytest.raises(BlockCancelled):
+            context.check()
+        with pytest.raises(BlockCancelled):
+            context.read('ilk', lambda: 42)
+
+    def test_should_bind_to_current_thread(self):
+        # given
+        context = BlockContext(BlockHeader.from_block(block(12)), [])
+
+        # expect
+        with context:
+            assert current_block_context() is context
+        assert current_block_context() is None
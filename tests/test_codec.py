@@ -0,0 +1,206 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 MakerDAO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from unittest.mock import Mock
+
+import pytest
+from eth_abi import encode_abi
+from web3 import Web3
+from web3.exceptions import BadFunctionCallOutput
+
+from pymaker import Address, Calldata, Transact
+from pymaker.auctions import Flipper
+from pymaker.blocks import BlockCancelled, BlockContext, BlockHeader
+from pymaker.codec import function_encoder, output_decoder, signature_encoder
+from pymaker.dss import Cat, Ilk, Urn, Vat
+from pymaker.numeric import Wad
+from pymaker.oasis import SimpleMarket
+from pymaker.util import bytes_to_hexstring
+
+URN = '0x00000000001111111111000000000011111111AB'
+GUY = '0x0000011111000001111100000111110000011111'
+
+
+def web3_encoded(abi: list, function_name: str, args: list) -> str:
+    return Web3().eth.contract(abi=abi).encodeABI(fn_name=function_name, args=args)
+
+
+class TestFunctionEncoder:
+    @pytest.mark.parametrize("abi, function_name, args", [
+        (Vat.abi, 'frob', [Ilk('ETH-A').toBytes(), URN, GUY, GUY, 10**18, -5 * 10**18]),
+        (Vat.abi, 'hope', [GUY]),
+        (Cat.abi, 'bite', [Ilk('ETH-A').toBytes(), URN]),
+        (Flipper.abi, 'tend', [17, 10**18, 2 * 10**45]),
+        (Flipper.abi, 'dent', [17, 10**18, 2 * 10**45]),
+        (Flipper.abi, 'deal', [17]),
+        (SimpleMarket.abi, 'kill', [b'\x01'.rjust(32, b'\x00')]),
+        (SimpleMarket.abi, 'offer', [10**18, GUY, 2 * 10**18, URN]),
+    ])
+    def test_should_encode_the_same_way_as_web3(self, abi, function_name, args):
+        # given
+        encoder = function_encoder(abi, function_name)
+
+        # expect
+        assert encoder is not None
+        assert bytes_to_hexstring(encoder.encode(args)) == web3_encoded(abi, function_name, args)
+
+    def test_should_be_cached(self):
+        # expect
+        assert function_encoder(Vat.abi, 'frob') is function_encoder(Vat.abi, 'frob')
+
+    def test_should_resolve_functions_by_signature(self):
+        # expect
+        assert function_encoder(Vat.abi, 'hope(address)').signature == 'hope(address)'
+
+    def test_should_not_support_dynamic_types(self):
+        # given
+        abi = [{'type': 'function', 'name': 'set', 'inputs': [{'name': 'value', 'type': 'string'}], 'outputs': []}]
+
+        # expect
+        assert function_encoder(abi, 'set') is None
+
+    def test_should_not_support_overloaded_functions(self):
+        # given
+        abi = [{'type': 'function', 'name': 'set', 'inputs': [{'name': 'value', 'type': 'uint256'}], 'outputs': []},
+               {'type': 'function', 'name': 'set', 'inputs': [{'name': 'value', 'type': 'address'}], 'outputs': []}]
+
+        # expect
+        assert function_encoder(abi, 'set') is None
+        assert function_encoder(abi, 'set(address)') is not None
+
+    def test_should_leave_unsupported_values_to_web3(self):
+        # given
+        encoder = function_encoder(Vat.abi, 'hope')
+
+        # expect
+        assert encoder.encode([GUY.lower().replace('0x', '0X')]) is None
+        assert encoder.encode(['0x00000000001111111111000000000011111111ab']) is None
+        assert encoder.encode([GUY, GUY]) is None
+        assert function_encoder(Flipper.abi, 'deal').encode([-1]) is None
+        assert function_encoder(Flipper.abi, 'deal').encode([True]) is None
+
+    def test_should_encode_signatures(self):
+        # expect
+        assert Calldata.from_signature(Web3(), "transfer(address,uint256)", [GUY, 1000]) == \
+               Calldata(web3_encoded([{'type': 'function', 'name': 'transfer', 'outputs': [],
+                                       'inputs': [{'name': 'a', 'type': 'address'},
+                                                  {'name': 'b', 'type': 'uint256'}]}], 'transfer', [GUY, 1000]))
+        assert signature_encoder("transfer(address,uint256)") is signature_encoder("transfer(address,uint256)")
+
+
+class TestOutputDecoder:
+    def test_should_decode_static_tuples(self):
+        # given
+        decoder = output_decoder(Flipper.abi, 'bids')
+        values = [2 * 10**45, 10**18, GUY, 1500000000, 1500001000, URN, GUY, 3 * 10**45]
+        data = encode_abi(list(decoder.types), values)
+
+        # when
+        decoded = decoder.decode(data)
+
+        # then
+        assert decoded[:2] == (2 * 10**45, 10**18)
+        assert decoded[2] == Web3.toChecksumAddress(GUY)
+        assert decoded[6] == Web3.toChecksumAddress(GUY)
+        assert decoded[3:5] == (1500000000, 1500001000)
+        assert decoded[5] == Web3.toChecksumAddress(URN)
+        assert decoded[7] == 3 * 10**45
+
+    def test_should_decode_signed_ints_bools_and_bytes(self):
+        # given
+        abi = [{'type': 'function', 'name': 'get', 'inputs': [],
+                'outputs': [{'name': 'a', 'type': 'int256'}, {'name': 'b', 'type': 'bool'},
+                            {'name': 'c', 'type': 'bytes32'}, {'name': 'd', 'type': 'uint64'}]}]
+        values = [-17, True, Ilk('ETH-A').toBytes(), 2**64 - 1]
+
+        # expect
+        assert output_decoder(abi, 'get').decode(encode_abi(['int256', 'bool', 'bytes32', 'uint64'], values)) == \
+               tuple(values)
+
+    def test_should_fail_on_short_data(self):
+        # expect
+        with pytest.raises(BadFunctionCallOutput):
+            output_decoder(Vat.abi, 'urns').decode(b'')
+
+    def test_should_not_support_dynamic_types(self):
+        # given
+        abi = [{'type': 'function', 'name': 'get', 'inputs': [], 'outputs': [{'name': 'a', 'type': 'string'}]}]
+
+        # expect
+        assert output_decoder(abi, 'get') is None
+
+
+class TestContractCall:
+    def setup_method(self):
+        self.web3 = Mock(Web3)
+        self.web3.eth = Mock()
+        self.web3.eth.getCode = Mock(return_value=b'\x60\x80')
+        self.vat = Vat(self.web3, Address(URN))
+
+    def test_should_call_and_decode_without_web3_contract(self):
+        # given
+        self.web3.eth.call = Mock(return_value=encode_abi(['uint256', 'uint256'], [3 * 10**18, 2 * 10**18]))
+
+        # when
+        urn = self.vat.urn(Ilk('ETH-A'), Address(GUY))
+
+        # then
+        assert urn == Urn(Address(GUY), Ilk('ETH-A'), Wad(3 * 10**18), Wad(2 * 10**18))
+        assert self.web3.eth.call.call_args[0][0] == \
+               {'to': URN, 'data': web3_encoded(Vat.abi, 'urns', [Ilk('ETH-A').toBytes(), GUY])}
+
+
+    def test_should_read_at_block(self):
+        # given
+        self.web3.eth.call = Mock(return_value=encode_abi(['uint256', 'uint256', 'uint256', 'uint256', 'uint256'],
+                                                          [1, 2, 3, 4, 5]))
+
+        # when
+        ilk = self.vat.ilk('ETH-A', block_identifier=10)
+
+        # then
+        assert ilk.art == Wad(1)
+        assert self.web3.eth.call.call_args[0][1] == 10
+
+    def test_should_not_read_for_stale_blocks(self):
+        # given
+        self.web3.eth.call = Mock(return_value=encode_abi(['uint256', 'uint256'], [3 * 10**18, 2 * 10**18]))
+        context = BlockContext(BlockHeader(10, b'\x0a' * 32, b'\x09' * 32, 1500000000, bytes(256)), [])
+        context.cancel()
+
+        # expect
+        with context:
+            with pytest.raises(BlockCancelled):
+                self.vat.urn(Ilk('ETH-A'), Address(GUY))
+        assert self.web3.eth.call.call_count == 0
+
+
+class TestTransactCalldata:
+    def test_should_encode_calldata_once(self):
+        # given
+        contract = Mock()
+        args = [Ilk('ETH-A').toBytes(), URN]
+        transact = Transact(None, Web3(), Cat.abi, Address(URN), contract, 'bite', args)
+
+        # when
+        first = transact._calldata()
+        second = transact.invocation().calldata.value
+
+        # then
+        assert first == web3_encoded(Cat.abi, 'bite', args)
+        assert second == first
+        assert contract.get_function_by_name.call_count == 0
@@ -0,0 +1,116 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 MakerDAO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+
+import pytest
+
+from pymaker.columnar import ColumnarArchive, ColumnarExporter
+from pymaker.dss import Cat, Vat
+from pymaker.events import EventTable
+from tests.test_events import URN1, URN2, log_bite, log_frob
+
+numpy = pytest.importorskip('numpy')
+
+
+@pytest.fixture()
+def frobs() -> list:
+    return [log_frob(1, 'ETH-A', URN1, 10, 5),
+            log_frob(2, 'ETH-A', URN2, 20, -5),
+            log_frob(3, 'BAT-A', URN1, -3, 0),
+            log_frob(4, 'ETH-A', URN1, 1, 1),
+            log_frob(5, 'BAT-A', URN2, 2, 2)]
+
+
+class TestColumnar:
+    def test_should_write_chunks(self, tmpdir, frobs):
+        # when
+        with ColumnarExporter(str(tmpdir), Vat.LogFrob, chunk_size=2) as exporter:
+            exporter.write(frobs)
+
+        # then
+        archive = ColumnarArchive(str(tmpdir))
+        assert len(archive) == 5
+        assert [chunk['rows'] for chunk in archive.index['chunks']] == [2, 2, 1]
+        assert os.path.exists(os.path.join(str(tmpdir), 'chunk-000002.dart.npy'))
+
+    def test_should_read_records_back(self, tmpdir, frobs):
+        # given
+        with ColumnarExporter(str(tmpdir), Vat.LogFrob, chunk_size=2) as exporter:
+            exporter.write(frobs)
+
+        # when
+        table = ColumnarArchive(str(tmpdir)).table()
+
+        # then
+        assert isinstance(table, EventTable)
+        assert list(table) == frobs
+        assert table.filter(ilk='BAT-A').values('block') == [3, 5]
+
+    def test_should_expose_memory_mapped_columns(self, tmpdir, frobs):
+        # given
+        with ColumnarExporter(str(tmpdir), Vat.LogFrob, chunk_size=2) as exporter:
+            exporter.write(frobs)
+
+        # when
+        archive = ColumnarArchive(str(tmpdir))
+
+        # then
+        assert isinstance(archive.chunk_columns('block')[0], numpy.memmap)
+        assert archive.column('block').tolist() == [1, 2, 3, 4, 5]
+        assert archive.column('dart').shape == (5, 32)
+        assert archive.amounts('dink') == pytest.approx([10.0, 20.0, -3.0, 1.0, 2.0])
+        assert archive.amounts('dart') == pytest.approx([5.0, -5.0, 0.0, 1.0, 2.0])
+        assert archive.categories('urn') == [URN1, URN2]
+        assert archive.mask('ilk', 'ETH-A').tolist() == [True, True, False, True, False]
+        assert archive.mask('ilk', 'USDC-A').tolist() == [False] * 5
+
+    def test_should_resume_export(self, tmpdir, frobs):
+        # given
+        with ColumnarExporter(str(tmpdir), Vat.LogFrob) as exporter:
+            exporter.write(frobs[:3])
+
+        # when
+        with ColumnarExporter(str(tmpdir), Vat.LogFrob) as exporter:
+            exporter.write(frobs[3:])
+
+        # then
+        archive = ColumnarArchive(str(tmpdir))
+        assert len(archive.index['chunks']) == 2
+        assert list(archive.table()) == frobs
+
+    def test_should_not_mix_record_types(self, tmpdir, frobs):
+        # given
+        with ColumnarExporter(str(tmpdir), Vat.LogFrob) as exporter:
+            exporter.write(frobs)
+
+        # expect
+        with pytest.raises(AssertionError):
+            ColumnarExporter(str(tmpdir), Cat.LogBite)
+
+    def test_should_export_bites(self, tmpdir):
+        # given
+        bites = [log_bite(1), log_bite(2)]
+
+        # when
+        with ColumnarExporter(str(tmpdir), Cat.LogBite) as exporter:
+            exporter.write(bites)
+
+        # then
+        archive = ColumnarArchive(str(tmpdir))
+        assert list(archive.table()) == bites
+        assert archive.amounts('tab') == pytest.approx([3.0, 3.0])
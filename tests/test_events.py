@@ -0,0 +1,167 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 MakerDAO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import pickle
+
+import pytest
+from hexbytes import HexBytes
+
+from pymaker import Address
+from pymaker.auctions import Flipper
+from pymaker.dss import Cat, Ilk, Urn, Vat
+from pymaker.events import EventTable
+from pymaker.numeric import Wad, Rad
+
+URN1 = Address('0x0000011111000001111100000111110000011111')
+URN2 = Address('0x0000011111000001111100000111110000022222')
+CAT = Address('0x0000011111000001111100000111110000033333')
+
+
+def log_frob(block: int, ilk: str, urn: Address, dink: int, dart: int) -> Vat.LogFrob:
+    return Vat.LogFrob._from_fields({'ilk': ilk, 'urn': urn, 'collateral_owner': urn, 'dai_recipient': urn,
+                                     'dink': Wad.from_number(dink), 'dart': Wad.from_number(dart),
+                                     'block': block, '_tx_hash': block.to_bytes(32, 'big')})
+
+
+def log_bite(block: int) -> Cat.LogBite:
+    return Cat.LogBite(log_bite_raw(block))
+
+
+def log_bite_raw(block: int) -> dict:
+    return {'args': {'ilk': Ilk('ETH-A').toBytes(), 'urn': URN1.address,
+                     'ink': 10**18, 'art': 2 * 10**18, 'tab': 3 * 10**45, 'flip': URN2.address},
+            'event': 'Bite',
+            'logIndex': 2,
+            'transactionIndex': 1,
+            'transactionHash': HexBytes(block.to_bytes(32, 'big')),
+            'address': CAT.address,
+            'blockHash': HexBytes(bytes([block]) * 32),
+            'blockNumber': block}
+
+
+@pytest.fixture()
+def frobs() -> list:
+    return [log_frob(1, 'ETH-A', URN1, 10, 5),
+            log_frob(2, 'ETH-A', URN2, 20, -5),
+            log_frob(3, 'BAT-A', URN1, -3, 0),
+            log_frob(4, 'ETH-A', URN1, 1, 1)]
+
+
+class TestEventRecord:
+    def test_should_not_have_instance_dict(self, frobs):
+        # expect
+        assert not hasattr(frobs[0], '__dict__')
+        assert not hasattr(log_bite(1), '__dict__')
+        assert not hasattr(Wad(1), '__dict__')
+
+    def test_should_expose_tx_hash_as_hex(self, frobs):
+        # expect
+        assert frobs[0].tx_hash == '0x' + '00' * 31 + '01'
+
+    def test_equality(self, frobs):
+        # expect
+        assert frobs[0] == log_frob(1, 'ETH-A', URN1, 10, 5)
+        assert frobs[0] != frobs[1]
+
+    def test_should_be_picklable(self, frobs):
+        # expect
+        assert pickle.loads(pickle.dumps(frobs[1])) == frobs[1]
+        assert pickle.loads(pickle.dumps(log_bite(7))) == log_bite(7)
+
+    def test_log_bite_properties(self):
+        # given
+        bite = log_bite(7)
+
+        # expect
+        assert bite.ilk == Ilk('ETH-A')
+        assert bite.urn == Urn(URN1)
+        assert bite.tab == Rad(3 * 10**45)
+        assert bite.location == {'blockNumber': 7, 'transactionHash': HexBytes(7 .to_bytes(32, 'big')), 'logIndex': 2}
+        assert 'ilk' in repr(bite)
+
+    def test_log_bite_should_rebuild_deprecated_raw_log(self):
+        # given
+        bite = log_bite(7)
+
+        # when
+        with pytest.deprecated_call():
+            raw = bite.raw
+
+        # then
+        assert raw == log_bite_raw(7)
+        assert raw['args']['urn'] == URN1.address
+
+
+class TestEventTable:
+    def test_should_store_and_materialize_records(self, frobs):
+        # when
+        table = EventTable.from_records(Vat.LogFrob, frobs)
+
+        # then
+        assert len(table) == 4
+        assert list(table) == frobs
+        assert table[1].dart == Wad.from_number(-5)
+
+    def test_should_filter_without_materializing(self, frobs):
+        # given
+        table = EventTable.from_records(Vat.LogFrob, frobs)
+
+        # when
+        eth_frobs = table.filter(ilk='ETH-A')
+
+        # then
+        assert len(eth_frobs) == 3
+        assert eth_frobs.values('block') == [1, 2, 4]
+        assert eth_frobs.filter(urn=URN1).values('dink') == [Wad.from_number(10), Wad.from_number(1)]
+        assert len(table.filter(ilk='USDC-A')) == 0
+        assert table.between(2, 3).values('block') == [2, 3]
+
+    def test_should_group(self, frobs):
+        # given
+        table = EventTable.from_records(Vat.LogFrob, frobs)
+
+        # when
+        groups = table.filter(ilk='ETH-A').group_by('urn')
+
+        # then
+        assert set(groups.keys()) == {URN1, URN2}
+        assert list(groups[URN1]) == [frobs[0], frobs[3]]
+        assert list(groups[URN2]) == [frobs[1]]
+
+    def test_should_filter_by_public_names(self):
+        # given
+        table = EventTable.from_records(Cat.LogBite, [log_bite(1), log_bite(2)])
+
+        # expect
+        assert len(table.filter(ilk='ETH-A', urn=URN1)) == 2
+        assert table[0] == log_bite(1)
+
+    def test_should_not_append_to_views(self, frobs):
+        # given
+        view = EventTable.from_records(Vat.LogFrob, frobs).filter(ilk='ETH-A')
+
+        # expect
+        with pytest.raises(AssertionError):
+            view.append(frobs[0])
+
+    def test_should_support_auction_logs(self):
+        # given
+        tend = Flipper.TendLog._from_fields({'guy': URN1, 'id': 3, 'lot': Wad(1), 'bid': Rad(2),
+                                            'block': 5, '_tx_hash': bytes(32)})
+
+        # expect
+        assert list(EventTable.from_records(Flipper.TendLog, [tend])) == [tend]
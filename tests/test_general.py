@@ -15,10 +15,15 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import copy
+import pickle
+from unittest.mock import Mock
+
 import pytest
 from hexbytes import HexBytes
+from web3 import Web3
 
-from pymaker import Address, Calldata, Receipt, Transfer
+from pymaker import Address, Calldata, Contract, Receipt, Transfer, ZERO_ADDRESS
 from pymaker.numeric import Wad
 from tests.helpers import is_hashable
 
@@ -92,6 +97,112 @@ class TestAddress:
         assert address1 < address3
         assert address1 <= address3
 
+    def test_creation_from_bytes(self):
+        # expect
+        assert Address(b'\0\0\x01\x11\x11\0\0\x01\x11\x11\0\0\x01\x11\x11\0\0\x01\x11\x11') == \
+               Address('0x0000011111000001111100000111110000011111')
+
+    def test_checksum(self):
+        # expect
+        assert Address('0xd26114cd6ee289accf82350c8d8487fedb8a0c07').address == \
+               '0xd26114cd6EE289AccF82350c8d8487fedB8A0C07'
+        assert Address('0xD26114CD6EE289ACCF82350C8D8487FEDB8A0C07').address == \
+               '0xd26114cd6EE289AccF82350c8d8487fedB8A0C07'
+
+    def test_should_intern_instances(self):
+        # expect
+        assert Address('0x0000011111000001111100000111110000011111') is \
+               Address('0x0000011111000001111100000111110000011111')
+        assert Address('0xd26114cd6ee289accf82350c8d8487fedb8a0c07') is \
+               Address('0xd26114cd6EE289AccF82350c8d8487fedB8A0C07')
+
+    def test_should_be_immutable(self):
+        # given
+        address = Address('0x0000011111000001111100000111110000011111')
+
+        # expect
+        with pytest.raises(AttributeError):
+            address.address = '0x0000011111000001111100000111110000022222'
+
+    def test_should_be_picklable(self):
+        # given
+        address = Address('0xd26114cd6ee289accf82350c8d8487fedb8a0c07')
+
+        # expect
+        assert pickle.loads(pickle.dumps(address)) == address
+        assert copy.copy(address) == address
+
+    def test_zero_address(self):
+        # expect
+        assert ZERO_ADDRESS == Address('0x0000000000000000000000000000000000000000')
+        assert ZERO_ADDRESS.as_bytes() == bytes(20)
+
+
+class TestContract:
+    def setup_method(self):
+        self.web3 = Mock(Web3)
+        self.web3.eth = Mock()
+        self.web3.eth.getCode = Mock(return_value=b'\x60\x80')
+        self.abi = [{'constant': True, 'inputs': [], 'name': 'live', 'outputs': [{'name': '', 'type': 'uint256'}],
+                     'payable': False, 'stateMutability': 'view', 'type': 'function'}]
+        Contract._addresses_with_code = {}
+
+    def test_should_reuse_contract_factory_for_the_same_abi(self):
+        # when
+        Contract._get_contract(self.web3, self.abi, Address('0x0000011111000001111100000111110000011111'))
+        Contract._get_contract(self.web3, self.abi, Address('0x0000011111000001111100000111110000022222'))
+
+        # then
+        assert self.web3.eth.contract.call_count == 1
+
+    def test_should_check_code_only_once_per_address(self):
+        # when
+        Contract._get_contract(self.web3, self.abi, Address('0x0000011111000001111100000111110000011111'))
+        Contract._get_contract(self.web3, self.abi, Address('0x0000011111000001111100000111110000011111'))
+
+        # then
+        assert self.web3.eth.getCode.call_count == 1
+
+    def test_should_check_code_once_per_node(self):
+        # given
+        other_web3 = Mock(Web3)
+        other_web3.eth = Mock()
+        other_web3.eth.getCode = Mock(return_value=b'')
+
+        # when
+        Contract._get_contract(self.web3, self.abi, Address('0x0000011111000001111100000111110000011111'))
+
+        # then
+        with pytest.raises(Exception):
+            Contract._get_contract(other_web3, self.abi, Address('0x0000011111000001111100000111110000011111'))
+        assert other_web3.eth.getCode.call_count == 1
+
+    def test_should_fail_if_no_code(self):
+        # given
+        self.web3.eth.getCode = Mock(return_value=b'')
+
+        # expect
+        with pytest.raises(Exception):
+            Contract._get_contract(self.web3, self.abi, Address('0x0000011111000001111100000111110000033333'))
+
+        # and
+        with pytest.raises(Exception):
+            Contract._get_contract(self.web3, self.abi, Address('0x0000011111000001111100000111110000033333'))
+        assert self.web3.eth.getCode.call_count == 2
+
+    def test_should_skip_code_check_if_disabled(self):
+        # given
+        Contract.check_code = False
+
+        # when
+        try:
+            Contract._get_contract(self.web3, self.abi, Address('0x0000011111000001111100000111110000044444'))
+        finally:
+            Contract.check_code = True
+
+        # then
+        assert self.web3.eth.getCode.call_count == 0
+
 
 class TestCalldata:
     def test_creation(self):
@@ -16,12 +16,16 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import asyncio
+import time
+
 import pytest
 from mock import MagicMock
 from web3 import Web3, HTTPProvider
 
-from pymaker import Address, eth_transfer, TransactStatus, Calldata, Receipt
+from pymaker import Address, eth_transfer, TransactStatus, Calldata, Receipt, Transact
+from pymaker.blocks import BlockHeader, block_cache
 from pymaker.gas import FixedGasPrice
+from pymaker.metrics import InMemoryMetrics
 from pymaker.numeric import Wad
 from pymaker.proxy import DSProxy, DSProxyCache
 from pymaker.token import DSToken
@@ -201,6 +205,131 @@ class TestTransact:
         assert eth_balance(self.web3, self.second_address) < initial_balance_second_address
         assert eth_balance(self.web3, self.third_address) == initial_balance_third_address + Wad.from_number(1.5)
 
+    def test_idempotent_transactions_in_progress_should_only_be_sent_once(self):
+        # given
+        transact_1 = self.token.transfer(self.second_address, Wad(500))
+        transact_2 = self.token.transfer(self.second_address, Wad(500))
+
+        # when
+        receipts = synchronize([transact_1.transact_async(idempotency_key=("transfer", self.second_address)),
+                                transact_2.transact_async(idempotency_key=("transfer", self.second_address))])
+
+        # then
+        assert receipts[0] is not None
+        assert receipts[0] is receipts[1]
+        assert self.token.balance_of(self.second_address) == Wad(500)
+        # and
+        assert transact_1.status == TransactStatus.FINISHED
+        assert transact_2.status == TransactStatus.FINISHED
+
+    def test_idempotent_transaction_mined_recently_should_not_be_sent_again(self):
+        # given
+        receipt_1 = self.token.transfer(self.second_address, Wad(500)).transact(idempotency_key="recent")
+
+        # when
+        receipt_2 = self.token.transfer(self.second_address, Wad(500)).transact(idempotency_key="recent")
+
+        # then
+        assert receipt_2 is receipt_1
+        assert self.token.balance_of(self.second_address) == Wad(500)
+
+    def test_different_idempotency_keys_should_not_interfere(self):
+        # when
+        self.token.transfer(self.second_address, Wad(500)).transact(idempotency_key="first")
+        self.token.transfer(self.second_address, Wad(500)).transact(idempotency_key="second")
+
+        # then
+        assert self.token.balance_of(self.second_address) == Wad(1000)
+
+    def test_should_not_send_transaction_after_deadline_block(self):
+        # when
+        receipt = self.token.transfer(self.second_address, Wad(500)) \
+            .transact(deadline_block=self.web3.eth.blockNumber)
+
+        # then
+        assert receipt is None
+        assert self.token.balance_of(self.second_address) == Wad(0)
+
+    def test_should_not_send_transaction_after_deadline_timestamp(self):
+        # when
+        receipt = self.token.transfer(self.second_address, Wad(500)) \
+            .transact(deadline_timestamp=int(time.time()) - 1)
+
+        # then
+        assert receipt is None
+        assert self.token.balance_of(self.second_address) == Wad(0)
+
+    def test_should_send_transaction_before_deadline(self):
+        # when
+        receipt = self.token.transfer(self.second_address, Wad(500)) \
+            .transact(deadline_block=self.web3.eth.blockNumber + 10, deadline_timestamp=int(time.time()) + 600)
+
+        # then
+        assert receipt is not None
+        assert self.token.balance_of(self.second_address) == Wad(500)
+
+    @pytest.mark.asyncio
+    @pytest.mark.timeout(30)
+    async def test_should_cancel_pending_transaction_after_deadline(self):
+        # given
+        original_send_transaction = self.web3.eth.sendTransaction
+        nonce = self.web3.eth.getTransactionCount(self.our_address.address)
+        sent = []
+
+        def send_transaction(transaction):
+            sent.append(transaction)
+            if len(sent) == 1:
+                # the transfer never gets mined
+                return '0xaaaaaaaaaabbbbbbbbbbccccccccccdddddddddd'
+            elif len(sent) == 2:
+                raise ValueError("Node unavailable")
+            else:
+                return original_send_transaction(transaction)
+
+        self.web3.eth.sendTransaction = MagicMock(side_effect=send_transaction)
+
+        # when
+        try:
+            transact = self.token.transfer(self.second_address, Wad(500))
+            receipt = await transact.transact_async(deadline_timestamp=int(time.time()) + 2)
+        finally:
+            self.web3.eth.sendTransaction = original_send_transaction
+
+        # then
+        assert receipt is None
+        assert transact.metrics.cancelled
+        assert self.token.balance_of(self.second_address) == Wad(0)
+        # and
+        assert len(sent) == 3
+        assert sent[2]['nonce'] == nonce
+        assert sent[2]['to'] == sent[2]['from'] == self.our_address.address
+        assert sent[2]['value'] == 0
+        assert self.web3.eth.getTransactionCount(self.our_address.address) == nonce + 1
+
+    def test_should_report_metrics(self):
+        # given
+        metrics = InMemoryMetrics()
+        Transact.metrics_sink = metrics
+
+        # when
+        try:
+            transact = self.token.transfer(self.second_address, Wad(500))
+            receipt = transact.transact(gas_price=FixedGasPrice(25000000300))
+        finally:
+            Transact.metrics_sink = None
+
+        # then
+        labels = {'origin': 'DSToken', 'function': 'transfer'}
+        assert metrics.counter("transact_total", {**labels, 'outcome': 'successful'}) == 1
+        assert metrics.histogram("transact_estimate_gas_seconds", labels).count == 1
+        assert metrics.histogram("transact_send_seconds", labels).count == 1
+        assert metrics.histogram("transact_inclusion_seconds", labels).count == 1
+        assert metrics.histogram("transact_replacements", labels).sum == 0
+        assert metrics.histogram("transact_gas_used", labels).sum == receipt.gas_used
+        assert metrics.histogram("transact_gas_price", labels).sum == 25000000300
+        # and
+        assert transact.metrics.cost == receipt.gas_used * 25000000300 / 10**18
+
     def test_should_raise_exception_on_unknown_kwarg(self):
         # expect
         with pytest.raises(Exception):
@@ -211,6 +340,115 @@ class TestTransact:
             synchronize([self.token.transfer(self.second_address, Wad(123)).transact_async(unknown_kwarg="some_value")])
 
 
+class TestTransactMetrics:
+    def test_should_report_cost_of_reverted_transactions(self):
+        # given
+        metrics = InMemoryMetrics()
+        web3 = MagicMock(Web3)
+        web3.eth = MagicMock()
+        web3.eth.getTransaction = MagicMock(return_value={'gasPrice': 20000000000})
+        transact = Transact(None, web3, None, Address('0x0000011111000001111100000111110000011111'), None,
+                            'transfer', [])
+        # and
+        transact.metrics.gas_price = 30000000000
+        transact._mined_receipt = Receipt({'transactionHash': b'\x01' * 32, 'gasUsed': 50000, 'logs': []})
+
+        # when
+        Transact.metrics_sink = metrics
+        try:
+            transact._report_metrics("failed")
+        finally:
+            Transact.metrics_sink = None
+
+        # then
+        labels = {'origin': '', 'function': 'transfer'}
+        assert metrics.counter("transact_total", {**labels, 'outcome': 'failed'}) == 1
+        assert metrics.histogram("transact_gas_price", labels).sum == 20000000000
+        assert metrics.histogram("transact_cost_eth", labels).sum == 50000 * 20000000000 / 10**18
+
+
+class TestTransactDeadline:
+    def setup_method(self):
+        self.web3 = MagicMock(Web3)
+        self.web3.eth = MagicMock()
+        self.web3.eth.blockNumber = 10
+        self.transact = Transact(None, self.web3, None, Address('0x0000011111000001111100000111110000011111'), None,
+                                 'transfer', [])
+
+    def test_should_check_block_number_at_most_once_a_second(self):
+        # expect
+        assert not self.transact._deadline_passed(20, None)
+
+        # when
+        self.web3.eth.blockNumber = 20
+
+        # then
+        assert not self.transact._deadline_passed(20, None)
+        time.sleep(1)
+        assert self.transact._deadline_passed(20, None)
+
+    def test_should_use_cached_block_headers(self):
+        # given
+        block_cache(self.web3).put(BlockHeader(20, b'\x14' * 32, b'\x13' * 32, 1500000000, bytes(256)))
+
+        # expect
+        assert self.transact._deadline_passed(20, None)
+
+
+class TestTransactAsync:
+    def test_should_not_block_event_loop_on_node_calls(self):
+        # given
+        web3 = MagicMock(Web3)
+        web3.eth = MagicMock()
+        web3.eth.defaultAccount = '0x0000011111000001111100000111110000022222'
+        transact = Transact(None, web3, None, Address('0x0000011111000001111100000111110000011111'), None,
+                            'transfer', [])
+        ticks, estimated = [], []
+
+        def estimated_gas(from_address):
+            time.sleep(0.5)
+            estimated.append(time.monotonic())
+            raise ValueError("Transaction would revert")
+
+        transact.estimated_gas = estimated_gas
+
+        async def tick():
+            for _ in range(5):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.05)
+
+        # when
+        async def run():
+            return await asyncio.gather(transact.transact_async(), tick())
+
+        receipt, _ = asyncio.new_event_loop().run_until_complete(run())
+
+        # then
+        assert receipt is None
+        assert len(ticks) == 5
+        assert ticks[-1] < estimated[0]
+
+    def test_should_scope_idempotency_keys_to_node_and_account(self):
+        # given
+        def transact(web3):
+            web3.eth = MagicMock()
+            return Transact(None, web3, None, Address('0x0000011111000001111100000111110000011111'), None,
+                            'transfer', [])
+
+        web3_1, web3_2 = MagicMock(Web3), MagicMock(Web3)
+        account_1 = '0x0000011111000001111100000111110000022222'
+        account_2 = '0x0000011111000001111100000111110000033333'
+        transact_1 = transact(web3_1)
+
+        # when
+        assert transact_1._claim_idempotency_key(account_1, "bite") is None
+
+        # then
+        assert transact(web3_1)._claim_idempotency_key(account_1.lower(), "bite") is transact_1
+        assert transact(web3_1)._claim_idempotency_key(account_2, "bite") is None
+        assert transact(web3_2)._claim_idempotency_key(account_1, "bite") is None
+
+
 class TestTransactReplace:
     def setup_method(self):
         self.web3 = Web3(HTTPProvider("http://localhost:8555"))
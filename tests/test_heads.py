@@ -0,0 +1,122 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 MakerDAO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import json
+import threading
+import time
+
+import websockets
+
+from pymaker.blocks import BlockHeader
+from pymaker.heads import NewHeadsListener
+
+
+def rpc_header(number: int) -> dict:
+    return {'number': hex(number),
+            'hash': '0x' + number.to_bytes(32, 'big').hex(),
+            'parentHash': '0x' + (number - 1).to_bytes(32, 'big').hex(),
+            'timestamp': hex(1500000000 + number * 15),
+            'logsBloom': '0x' + '00' * 256}
+
+
+class FakeNode:
+    """Websocket server accepting `newHeads` subscriptions and pushing a few headers to each subscriber."""
+    def __init__(self, numbers: list):
+        self.numbers = numbers
+        self.connections = 0
+        self.port = None
+        self._started = threading.Event()
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._run, daemon=True).start()
+        self._started.wait(timeout=10)
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        server = self._loop.run_until_complete(websockets.serve(self._serve, 'localhost', 0))
+        self.port = server.sockets[0].getsockname()[1]
+        self._started.set()
+        self._loop.run_forever()
+
+    async def _serve(self, websocket, path):
+        self.connections += 1
+        request = json.loads(await websocket.recv())
+        await websocket.send(json.dumps({'jsonrpc': '2.0', 'id': request['id'], 'result': '0xcafe'}))
+        for number in self.numbers:
+            await websocket.send(json.dumps({'jsonrpc': '2.0', 'method': 'eth_subscription',
+                                             'params': {'subscription': '0xcafe', 'result': rpc_header(number)}}))
+
+    @property
+    def endpoint_uri(self) -> str:
+        return f"ws://localhost:{self.port}"
+
+
+def wait_until(condition, timeout: float = 10):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.05)
+
+
+class TestBlockHeader:
+    def test_should_parse_rpc_header(self):
+        # when
+        header = BlockHeader.from_rpc(rpc_header(10))
+
+        # then
+        assert header.number == 10
+        assert header.hash == (10).to_bytes(32, 'big')
+        assert header.parent_hash == (9).to_bytes(32, 'big')
+        assert header.timestamp == 1500000150
+        assert header.logs_bloom == bytes(256)
+
+
+class TestNewHeadsListener:
+    def test_should_receive_pushed_headers(self):
+        # given
+        node = FakeNode([10, 11])
+        headers = []
+        listener = NewHeadsListener(node.endpoint_uri, headers.append)
+
+        # when
+        listener.start()
+        wait_until(lambda: len(headers) == 2)
+        listener.stop()
+
+        # then
+        assert [header.number for header in headers] == [10, 11]
+        assert listener.last_header_time is not None
+        assert not listener.connected
+
+    def test_should_reconnect_and_survive_failing_callback(self):
+        # given
+        node = FakeNode([10])
+        calls = []
+
+        def callback(header):
+            calls.append(header)
+            raise Exception("callback failed")
+
+        listener = NewHeadsListener(node.endpoint_uri, callback, reconnect_delay=0.1)
+
+        # when
+        listener.start()
+        wait_until(lambda: len(calls) >= 2)
+        listener.stop()
+
+        # then
+        assert node.connections >= 2
+        assert all(header.number == 10 for header in calls)
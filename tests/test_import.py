@@ -0,0 +1,111 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 MakerDAO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+import subprocess
+import sys
+
+from pymaker import Contract, LazyResource, read_resource
+from pymaker.dss import Vat
+
+# Time `import pymaker.deployment` may take on top of importing `web3`, in seconds. Kept generous,
+# so that slow or busy CI machines do not fail the build, and can be tightened for benchmarking.
+MAX_IMPORT_OVERHEAD = float(os.environ.get('PYMAKER_MAX_IMPORT_OVERHEAD', '5.0'))
+
+IMPORT_BENCHMARK = """
+import json, sys, time
+start = time.perf_counter()
+import web3
+web3_imported = time.perf_counter()
+import pymaker.deployment
+from pymaker import LazyResource
+from pymaker.dss import Vat
+finished = time.perf_counter()
+loaded = [f"{cls.__module__}.{cls.__name__}.{name}"
+          for module in list(sys.modules.values()) if getattr(module, '__name__', '').startswith('pymaker')
+          for cls in vars(module).values() if isinstance(cls, type) and cls.__module__ == module.__name__
+          for name, value in vars(cls).items() if isinstance(value, LazyResource) and value.loaded]
+print(json.dumps({'web3': web3_imported - start,
+                  'pymaker': finished - web3_imported,
+                  'loaded': loaded,
+                  'scd_imported': 'pymaker.sai' in sys.modules}))
+"""
+
+
+def run_import_benchmark() -> dict:
+    output = subprocess.check_output([sys.executable, "-c", IMPORT_BENCHMARK])
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+class TestLazyResource:
+    def test_should_not_read_the_resource_until_accessed(self):
+        # given
+        resource = LazyResource('pymaker.dss', 'abi/Vat.abi', json.loads)
+
+        # expect
+        assert not resource.loaded
+
+    def test_should_parse_and_cache_the_resource(self):
+        # given
+        class SomeContract(Contract):
+            abi = Contract._load_abi('pymaker.dss', 'abi/Vat.abi')
+            bin = Contract._load_bin('pymaker.dss', 'abi/Vat.bin')
+
+        # when
+        abi = SomeContract.abi
+
+        # then
+        assert isinstance(abi, list)
+        assert abi == json.loads(read_resource('pymaker.dss', 'abi/Vat.abi'))
+        assert SomeContract.abi is abi
+        assert SomeContract.__dict__['abi'].loaded
+        assert not SomeContract.__dict__['bin'].loaded
+
+        # when
+        bytecode = SomeContract.bin
+
+        # then
+        assert isinstance(bytecode, str)
+        assert SomeContract.__dict__['bin'].loaded
+
+    def test_should_be_accessible_through_instances(self):
+        # given
+        vat = object.__new__(Vat)
+
+        # expect
+        assert vat.abi is Vat.abi
+
+
+class TestImport:
+    def test_should_import_deployment_without_loading_resources(self):
+        # when
+        result = run_import_benchmark()
+
+        # then
+        assert result['loaded'] == []
+        assert not result['scd_imported']
+
+    def test_should_import_deployment_quickly(self):
+        # when
+        result = run_import_benchmark()
+        print(f"Importing web3 took {result['web3']:.3f}s, pymaker.deployment {result['pymaker']:.3f}s on top of it")
+
+        # then
+        assert result['pymaker'] < MAX_IMPORT_OVERHEAD, \
+            f"Importing pymaker.deployment took {result['pymaker']:.3f}s, more than {MAX_IMPORT_OVERHEAD}s" \
+            f" (set PYMAKER_MAX_IMPORT_OVERHEAD to change the limit)"
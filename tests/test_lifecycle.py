@@ -15,17 +15,23 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import asyncio
+import os
 import time
 from threading import Event
 from unittest.mock import Mock
+from urllib.request import urlopen
 
 import pytest
 from mock import MagicMock
 from web3 import Web3, HTTPProvider
 
 import pymaker
-from pymaker import Address
-from pymaker.lifecycle import Lifecycle, trigger_event
+from pymaker import Address, Transact
+from pymaker.blocks import BlockCancelled, BlockContext, BlockHeader, inherit_block_context
+from pymaker.lifecycle import AsyncLifecycle, Lifecycle, _AsyncCallback, trigger_event
+from pymaker.metrics import InMemoryMetrics
+from tests.test_blocks import block, mock_web3
 
 
 @pytest.mark.timeout(60)
@@ -371,3 +377,371 @@ class TestLifecycle:
                 lifecycle.on_event(Event(), 1, event_callback_1)
                 lifecycle.on_event(Event(), 1, event_callback_2)
                 lifecycle.on_shutdown(shutdown_callback)  # assertions are in `shutdown_callback`
+
+
+@pytest.mark.timeout(60)
+class TestAsyncLifecycle:
+    def test_should_await_coroutine_callbacks(self):
+        self.calls = []
+
+        async def startup():
+            self.calls.append('startup')
+
+        async def every():
+            await asyncio.sleep(0.1)
+            self.calls.append('every')
+            lifecycle.terminate("Unit test is over")
+
+        async def shutdown():
+            self.calls.append('shutdown')
+
+        # when
+        with pytest.raises(SystemExit):
+            with AsyncLifecycle() as lifecycle:
+                lifecycle.on_startup(startup)
+                lifecycle.every(1, every)
+                lifecycle.on_shutdown(shutdown)
+
+        # then
+        assert self.calls == ['startup', 'every', 'shutdown']
+
+    def test_should_run_plain_callbacks_in_executor(self):
+        self.counter = 0
+
+        def callback():
+            self.counter = self.counter + 1
+            if self.counter >= 2:
+                lifecycle.terminate("Unit test is over")
+
+        # given
+        mock = MagicMock(side_effect=callback)
+
+        # when
+        with pytest.raises(SystemExit):
+            with AsyncLifecycle() as lifecycle:
+                lifecycle.on_event(asyncio.Event(), 1, mock)
+
+        # then
+        assert mock.call_count >= 2
+
+    def test_on_event_fires_whenever_event_triggered(self):
+        event = asyncio.Event()
+        self.counter = 0
+
+        async def every_callback():
+            self.counter = self.counter + 1
+            event.set()
+            if self.counter >= 2:
+                await asyncio.sleep(1)
+                lifecycle.terminate("Unit test is over")
+
+        # given
+        mock = Mock()
+
+        # when
+        with pytest.raises(SystemExit):
+            with AsyncLifecycle() as lifecycle:
+                lifecycle.every(1, every_callback)
+                lifecycle.on_event(event, 9999, mock)
+
+        # then
+        assert mock.call_count >= 2
+
+    def test_should_pass_block_context_and_skip_blocks_while_busy(self):
+        # given
+        blocks = []
+        lifecycle = AsyncLifecycle(mock_web3())
+
+        async def on_block(block):
+            blocks.append((block.number, [header.number for header in block.skipped]))
+            await asyncio.sleep(0.2)
+
+        lifecycle.on_block(on_block)
+        lifecycle._on_block_callback = _AsyncCallback(lifecycle._run_block_function, "on_block", lifecycle)
+
+        # when
+        async def feed():
+            loop = asyncio.get_event_loop()
+            for number in range(10, 14):
+                await lifecycle._process_block(loop, BlockHeader.from_block(block(number)), pushed=True)
+                await asyncio.sleep(0.1)
+            await lifecycle._on_block_callback.wait()
+
+        asyncio.new_event_loop().run_until_complete(feed())
+
+        # then
+        assert blocks == [(10, []), (12, [11])]
+
+    def test_should_uninstall_block_filter_once_new_heads_are_pushed(self):
+        # given
+        web3 = mock_web3()
+        web3.eth.filter = Mock(return_value=Mock(filter_id='0x1', get_new_entries=Mock(return_value=[])))
+        web3.eth.uninstallFilter = Mock(return_value=True)
+        lifecycle = AsyncLifecycle(web3)
+        lifecycle._new_heads_listener = Mock(connected=False)
+
+        # when
+        async def poll():
+            task = asyncio.ensure_future(lifecycle._poll_blocks(asyncio.Queue()))
+            await asyncio.sleep(0.5)
+            lifecycle._new_heads_listener.connected = True
+            await asyncio.sleep(1.5)
+            task.cancel()
+
+        asyncio.new_event_loop().run_until_complete(poll())
+
+        # then
+        web3.eth.filter.assert_called_once_with('latest')
+        web3.eth.uninstallFilter.assert_called_once_with('0x1')
+
+    def test_should_pass_block_context_only_if_required(self):
+        # given
+        calls = []
+        lifecycle = AsyncLifecycle(mock_web3())
+
+        def on_block(*args, verbose=False, **kwargs):
+            calls.append(args)
+
+        lifecycle.on_block(on_block)
+
+        # when
+        asyncio.new_event_loop().run_until_complete(
+            lifecycle._run_block_function(BlockContext(BlockHeader.from_block(block(10)), [])))
+
+        # then
+        assert calls == [()]
+
+    def test_should_cancel_stale_blocks(self):
+        # given
+        started, finished = [], []
+        lifecycle = AsyncLifecycle(mock_web3())
+
+        async def on_block(block):
+            started.append(block.number)
+            await asyncio.sleep(0.2)
+            block.check()
+            finished.append((block.number, [header.number for header in block.skipped]))
+
+        lifecycle.on_block(on_block, cancel_stale=True)
+        lifecycle._on_block_callback = _AsyncCallback(lifecycle._run_block_function, "on_block", lifecycle)
+
+        # when
+        async def feed():
+            loop = asyncio.get_event_loop()
+            for number in range(10, 13):
+                await lifecycle._process_block(loop, BlockHeader.from_block(block(number)), pushed=True)
+                await asyncio.sleep(0.05)
+            await lifecycle._on_block_callback.wait()
+
+        asyncio.new_event_loop().run_until_complete(feed())
+
+        # then
+        assert started == [10, 11, 12]
+        assert finished == [(12, [10, 11])]
+
+    def test_should_not_abandon_transactions_already_sent(self):
+        # given
+        sent, receipts = [], []
+        lifecycle = AsyncLifecycle(mock_web3())
+        transact = Transact(None, mock_web3(), None, Address('0x0000011111000001111100000111110000011111'), None,
+                            'transfer', [])
+
+        async def send(**kwargs):
+            sent.append(kwargs)
+            await asyncio.sleep(0.2)
+            return 'receipt'
+
+        transact._transact_async = send
+
+        async def on_block(block):
+            if block.number == 10:
+                receipts.append(await transact.transact_async())
+                block.check()
+                receipts.append('not cancelled')
+
+        lifecycle.on_block(on_block, cancel_stale=True)
+        lifecycle._on_block_callback = _AsyncCallback(lifecycle._run_block_function, "on_block", lifecycle)
+
+        # when
+        async def feed():
+            loop = asyncio.get_event_loop()
+            for number in range(10, 12):
+                await lifecycle._process_block(loop, BlockHeader.from_block(block(number)), pushed=True)
+                await asyncio.sleep(0.05)
+            await lifecycle._on_block_callback.wait()
+
+        asyncio.new_event_loop().run_until_complete(feed())
+
+        # then
+        assert len(sent) == 1
+        assert receipts == ['receipt']
+
+    def test_should_not_send_transactions_from_gathered_tasks_for_stale_blocks(self):
+        # given
+        sent = []
+        lifecycle = AsyncLifecycle(mock_web3())
+        transact = Transact(None, mock_web3(), None, Address('0x0000011111000001111100000111110000011111'), None,
+                            'transfer', [])
+
+        async def send(**kwargs):
+            sent.append(kwargs)
+            return 'receipt'
+
+        transact._transact_async = send
+
+        async def bid():
+            await asyncio.sleep(0.2)
+            return await transact.transact_async()
+
+        async def on_block(block):
+            if block.number == 10:
+                await asyncio.gather(bid())
+
+        lifecycle.on_block(on_block, cancel_stale=True)
+        lifecycle._on_block_callback = _AsyncCallback(lifecycle._run_block_function, "on_block", lifecycle)
+
+        # when
+        async def feed():
+            loop = asyncio.get_event_loop()
+            inherit_block_context(loop)
+            for number in range(10, 12):
+                await lifecycle._process_block(loop, BlockHeader.from_block(block(number)), pushed=True)
+                await asyncio.sleep(0.05)
+            await lifecycle._on_block_callback.wait()
+
+        asyncio.new_event_loop().run_until_complete(feed())
+
+        # then
+        assert sent == []
+
+
+@pytest.mark.timeout(60)
+class TestCancellingStaleBlocks:
+    def test_should_restart_callback_on_newest_block(self):
+        # given
+        processed = []
+        lifecycle = Lifecycle(mock_web3())
+
+        def on_block(block):
+            for _ in range(20):
+                time.sleep(0.05)
+                block.check()
+            processed.append((block.number, [header.number for header in block.skipped]))
+
+        lifecycle.on_block(on_block, cancel_stale=True)
+        lifecycle._on_block_callback = lifecycle.scheduler.callback(lifecycle._run_cancellable, "on_block")
+        lifecycle.scheduler.start()
+
+        # when
+        for number in range(10, 13):
+            header = BlockHeader.from_block(block(number))
+            lifecycle.block_stream.add(header)
+            lifecycle._trigger_cancellable(header)
+            time.sleep(0.2)
+
+        lifecycle.scheduler.stop()
+
+        # then
+        assert processed == [(12, [10, 11])]
+
+    def test_should_not_send_transactions_for_stale_blocks(self):
+        # given
+        context = BlockContext(BlockHeader.from_block(block(10)), [])
+        transact = Transact(None, mock_web3(), None, Address('0x0000011111000001111100000111110000011111'), None,
+                            'transfer', [])
+        context.cancel()
+
+        # expect
+        with context:
+            with pytest.raises(BlockCancelled):
+                asyncio.new_event_loop().run_until_complete(transact.transact_async())
+
+
+@pytest.mark.timeout(60)
+class TestLifecycleMetrics:
+    def test_should_serve_callback_metrics(self):
+        self.scraped = []
+
+        def callback():
+            if len(self.scraped) == 0:
+                self.scraped.append(urlopen(f"http://127.0.0.1:{lifecycle.metrics_server.port}/metrics").read())
+            else:
+                lifecycle.terminate("Unit test is over")
+
+        # given
+        metrics = InMemoryMetrics()
+
+        # when
+        with pytest.raises(SystemExit):
+            with Lifecycle() as lifecycle:
+                lifecycle.report_metrics(metrics, port=0)
+                lifecycle.every(1, callback)
+
+        # then
+        assert metrics.histogram('lifecycle_callback_duration_seconds', {'callback': 'timer #1'}).count >= 2
+        assert len(self.scraped) == 1
+
+    def test_should_report_block_lag(self):
+        # given
+        metrics = InMemoryMetrics()
+        lifecycle = AsyncLifecycle(mock_web3())
+        lifecycle.report_metrics(metrics)
+        lifecycle.on_block(lambda: None)
+
+        # when
+        asyncio.new_event_loop().run_until_complete(
+            lifecycle._run_block_function(BlockContext(BlockHeader.from_block(block(10)), [])))
+
+        # then
+        assert metrics.histogram('lifecycle_block_lag_seconds').count == 1
+
+
+@pytest.mark.timeout(60)
+class TestProcessCallbacks:
+    def test_should_run_every_callback_in_worker_process(self):
+        self.acted = []
+
+        def act(result):
+            self.acted.append(result)
+            lifecycle.terminate("Unit test is over")
+
+        # when
+        with pytest.raises(SystemExit):
+            with Lifecycle() as lifecycle:
+                lifecycle.every(1, evaluate_in_process, in_process=True, act=act)
+
+        # then
+        assert self.acted[0] != os.getpid()
+        assert lifecycle._process_callbacks[0].last_output_size > 0
+
+    def test_should_pass_block_header_to_worker_process_and_context_to_act(self):
+        # given
+        acted = []
+        lifecycle = AsyncLifecycle(mock_web3())
+        lifecycle.on_block(evaluate_block_in_process, in_process=True,
+                           act=lambda block, result: acted.append((block, result)))
+        lifecycle._on_block_callback = _AsyncCallback(lifecycle._run_block_function, "on_block", lifecycle)
+        lifecycle._start_worker_processes()
+
+        # when
+        async def feed():
+            loop = asyncio.get_event_loop()
+            await lifecycle._process_block(loop, BlockHeader.from_block(block(10)), pushed=True)
+            await lifecycle._on_block_callback.wait()
+
+        asyncio.new_event_loop().run_until_complete(feed())
+        lifecycle._stop_worker_processes()
+
+        # then
+        assert isinstance(acted[0][0], BlockContext)
+        assert acted[0][1][0] == 10
+        assert acted[0][1][1] != os.getpid()
+
+
+def evaluate_in_process() -> int:
+    return os.getpid()
+
+
+def evaluate_block_in_process(header: BlockHeader) -> tuple:
+    assert isinstance(header, BlockHeader)
+    return header.number, os.getpid()
@@ -0,0 +1,158 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 MakerDAO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from eth_abi import encode_abi
+from hexbytes import HexBytes
+from web3._utils.events import get_event_data
+
+from pymaker import Address
+from pymaker.auctions import Flipper, _parse_auction_event
+from pymaker.codec import function_encoder
+from pymaker.dss import Ilk, Vat, _decode_frob
+from pymaker.events import decode_logs
+from pymaker.logging import LogNote, VAT_LAYOUT, codec
+from pymaker.numeric import Wad, Rad
+
+URN = '0x0000011111000001111100000111110000011111'
+GUY = '0x00000000001111111111000000000011111111AB'
+
+
+def raw_log_note(calldata: bytes, indexed: list) -> dict:
+    sig = calldata[:4].ljust(32, b'\x00')
+    data = encode_abi(['bytes'], [calldata.ljust(224, b'\x00')])
+    return {'address': URN,
+            'topics': [HexBytes(sig)] + [HexBytes(topic) for topic in indexed],
+            'data': '0x' + data.hex(),
+            'blockNumber': 123,
+            'transactionHash': HexBytes('0x' + 'ab' * 32),
+            'logIndex': 0,
+            'transactionIndex': 0,
+            'blockHash': HexBytes('0x' + 'cd' * 32)}
+
+
+def frob_log() -> dict:
+    calldata = function_encoder(Vat.abi, 'frob').encode([Ilk('ETH-A').toBytes(), URN, GUY, GUY,
+                                                         3 * 10**18, -2 * 10**18])
+    return raw_log_note(calldata, [calldata[4:36], calldata[36:68], calldata[68:100]])
+
+
+def tend_log() -> dict:
+    calldata = function_encoder(Flipper.abi, 'tend').encode([17, 10**18, 2 * 10**45])
+    return raw_log_note(calldata, [bytes(12) + Address(GUY).as_bytes(), calldata[4:36], calldata[36:68]])
+
+
+def generic_log_note(log: dict, abi: list) -> LogNote:
+    log_note_abi = [item for item in abi if item.get('name') == 'LogNote'][0]
+    return LogNote(get_event_data(codec, log_note_abi, log))
+
+
+class TestLogNote:
+    def test_should_decode_vat_lognotes_the_same_way_as_web3(self):
+        # given
+        log = frob_log()
+
+        # when
+        lognote = LogNote.from_log(log, VAT_LAYOUT)
+
+        # then
+        assert lognote == generic_log_note(log, Vat.abi)
+        assert lognote == LogNote.from_event(log, Vat.abi)
+        assert lognote.sig == '0x76088703'
+        assert lognote.usr is None
+
+    def test_should_decode_auction_lognotes_the_same_way_as_web3(self):
+        # given
+        log = tend_log()
+
+        # when
+        lognote = LogNote.from_log(log)
+
+        # then
+        assert lognote == generic_log_note(log, Flipper.abi)
+        assert lognote.sig == '0x4b43ed12'
+        assert lognote.usr == GUY
+        assert lognote.tx_hash == '0x' + 'ab' * 32
+        assert lognote.get_int_at_index(2) == 2 * 10**45
+
+    def test_should_ignore_other_events(self):
+        # given
+        log = tend_log()
+        log['topics'] = log['topics'][:3]
+
+        # expect
+        assert LogNote.from_log(log) is None
+
+        # given
+        log = tend_log()
+        log['topics'][0] = HexBytes('0xc84ce3a1172f0dec3173f04caaa6005151a4bfe40d4c9f3ea28dba5f719b2a7a')
+
+        # expect
+        assert LogNote.from_log(log) is None
+
+    def test_should_build_log_frob(self):
+        # when
+        log_frob = Vat.LogFrob(LogNote.from_log(frob_log(), VAT_LAYOUT))
+
+        # then
+        assert log_frob.ilk == 'ETH-A'
+        assert log_frob.urn == Address(URN)
+        assert log_frob.collateral_owner == Address(GUY)
+        assert log_frob.dai_recipient == Address(GUY)
+        assert log_frob.dink == Wad.from_number(3)
+        assert log_frob.dart == Wad.from_number(-2)
+        assert log_frob.block == 123
+
+    def test_should_build_tend_log(self):
+        # when
+        tend = Flipper.TendLog(LogNote.from_log(tend_log()))
+
+        # then
+        assert tend.guy == Address(GUY)
+        assert tend.id == 17
+        assert tend.lot == Wad(10**18)
+        assert tend.bid == Rad(2 * 10**45)
+
+
+class TestDecodeLogs:
+    def test_should_decode_in_process_pool(self):
+        # given
+        logs = [frob_log(), tend_log()] * 50
+
+        # when
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            frobs = decode_logs(_decode_frob, logs, executor, chunk_size=7)
+
+        # then
+        assert len(frobs) == 50
+        assert frobs == decode_logs(_decode_frob, logs)
+        assert frobs[0] == Vat.LogFrob(LogNote.from_log(frob_log(), VAT_LAYOUT))
+
+    def test_should_decode_auction_events_in_process_pool(self):
+        # given
+        decoder = partial(_parse_auction_event, "0xc84ce3a1172f0dec3173f04caaa6005151a4bfe40d4c9f3ea28dba5f719b2a7a",
+                          None, Flipper.KickLog)
+        logs = [tend_log()] * 20
+
+        # when
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            lognotes = decode_logs(decoder, logs, executor, chunk_size=3)
+
+        # then
+        assert lognotes == [LogNote.from_log(tend_log())] * 20
@@ -0,0 +1,204 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 MakerDAO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import math
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pytest
+
+from pymaker.metrics import Histogram, InMemoryMetrics, MetricsServer, MetricsSink, GAS_BUCKETS, prometheus_text
+
+
+class TestMetricsSink:
+    def test_not_implemented(self):
+        with pytest.raises(Exception):
+            MetricsSink().observe("metric", 1)
+
+        with pytest.raises(Exception):
+            MetricsSink().increment("metric")
+
+
+class TestHistogram:
+    def test_should_be_empty_initially(self):
+        # given
+        histogram = Histogram()
+
+        # expect
+        assert histogram.count == 0
+        assert histogram.mean() is None
+        assert histogram.quantile(0.5) is None
+
+    def test_should_track_count_sum_min_and_max(self):
+        # given
+        histogram = Histogram((1, 2, 5))
+
+        # when
+        for value in [0.5, 1.5, 4, 10]:
+            histogram.observe(value)
+
+        # then
+        assert histogram.count == 4
+        assert histogram.sum == 16
+        assert histogram.min == 0.5
+        assert histogram.max == 10
+        assert histogram.mean() == 4
+
+    def test_should_count_values_in_buckets(self):
+        # given
+        histogram = Histogram((1, 2, 5))
+
+        # when
+        for value in [0.5, 1, 1.5, 4, 10]:
+            histogram.observe(value)
+
+        # then
+        assert histogram.bucket_counts == [2, 1, 1, 1]
+        assert histogram.cumulative_counts() == [(1, 2), (2, 3), (5, 4), (math.inf, 5)]
+
+    def test_should_estimate_quantiles(self):
+        # given
+        histogram = Histogram((1, 2, 5))
+
+        # when
+        for value in [0.5, 0.6, 0.7, 1.5, 3]:
+            histogram.observe(value)
+
+        # then
+        assert histogram.quantile(0.5) == 1
+        assert histogram.quantile(0.8) == 2
+        assert histogram.quantile(1.0) == 3
+
+    def test_should_fail_on_unsorted_buckets(self):
+        with pytest.raises(Exception):
+            Histogram((2, 1))
+
+
+class TestInMemoryMetrics:
+    def test_should_keep_histograms_per_name_and_labels(self):
+        # given
+        metrics = InMemoryMetrics()
+
+        # when
+        metrics.observe("transact_send_seconds", 0.1, {"origin": "Vat", "function": "frob"})
+        metrics.observe("transact_send_seconds", 0.3, {"function": "frob", "origin": "Vat"})
+        metrics.observe("transact_send_seconds", 0.2, {"origin": "Cat", "function": "bite"})
+
+        # then
+        assert metrics.histogram("transact_send_seconds", {"origin": "Vat", "function": "frob"}).count == 2
+        assert metrics.histogram("transact_send_seconds", {"origin": "Cat", "function": "bite"}).count == 1
+        assert metrics.histogram("transact_send_seconds", {"origin": "Jug", "function": "drip"}) is None
+
+    def test_should_use_configured_buckets(self):
+        # given
+        metrics = InMemoryMetrics(buckets={"custom": (10, 20)})
+
+        # when
+        metrics.observe("custom", 15)
+        metrics.observe("transact_gas_used", 52000)
+
+        # then
+        assert metrics.histogram("custom").buckets == (10, 20)
+        assert metrics.histogram("transact_gas_used").buckets == GAS_BUCKETS
+
+    def test_should_increment_counters(self):
+        # given
+        metrics = InMemoryMetrics()
+
+        # when
+        metrics.increment("transact_total", labels={"outcome": "successful"})
+        metrics.increment("transact_total", 2, labels={"outcome": "successful"})
+
+        # then
+        assert metrics.counter("transact_total", {"outcome": "successful"}) == 3
+        assert metrics.counter("transact_total", {"outcome": "failed"}) == 0
+
+    def test_snapshot_and_reset(self):
+        # given
+        metrics = InMemoryMetrics()
+        metrics.observe("latency", 0.5, {"origin": "Vat"})
+        metrics.increment("calls")
+
+        # when
+        snapshot = metrics.snapshot()
+
+        # then
+        assert snapshot['histograms'][0]['name'] == "latency"
+        assert snapshot['histograms'][0]['labels'] == {"origin": "Vat"}
+        assert snapshot['histograms'][0]['count'] == 1
+        assert snapshot['counters'] == [{'name': "calls", 'labels': {}, 'value': 1}]
+
+        # when
+        metrics.reset()
+
+        # then
+        assert metrics.snapshot() == {'histograms': [], 'counters': []}
+
+
+class TestPrometheusText:
+    def test_should_render_histograms_and_counters(self):
+        # given
+        metrics = InMemoryMetrics({'lifecycle_callback_duration_seconds': (0.1, 1)})
+        metrics.observe("lifecycle_callback_duration_seconds", 0.05, {"callback": "on_block"})
+        metrics.observe("lifecycle_callback_duration_seconds", 0.5, {"callback": "on_block"})
+        metrics.increment("lifecycle_callback_skipped_total", 3, {"callback": "on_block"})
+
+        # when
+        text = prometheus_text(metrics)
+
+        # then
+        assert text.splitlines() == [
+            '# TYPE lifecycle_callback_duration_seconds histogram',
+            'lifecycle_callback_duration_seconds_bucket{callback="on_block",le="0.1"} 1',
+            'lifecycle_callback_duration_seconds_bucket{callback="on_block",le="1"} 2',
+            'lifecycle_callback_duration_seconds_bucket{callback="on_block",le="+Inf"} 2',
+            'lifecycle_callback_duration_seconds_sum{callback="on_block"} 0.55',
+            'lifecycle_callback_duration_seconds_count{callback="on_block"} 2',
+            '# TYPE lifecycle_callback_skipped_total counter',
+            'lifecycle_callback_skipped_total{callback="on_block"} 3']
+
+    def test_should_escape_names_and_labels(self):
+        # given
+        metrics = InMemoryMetrics()
+        metrics.increment("rpc.calls", labels={"method": 'eth_"call"\n'})
+
+        # expect
+        assert 'rpc_calls{method="eth_\\"call\\"\\n"} 1' in prometheus_text(metrics)
+
+
+class TestMetricsServer:
+    def test_should_serve_metrics_on_localhost(self):
+        # given
+        metrics = InMemoryMetrics()
+        metrics.increment("lifecycle_blocks_total")
+        server = MetricsServer(metrics, 0)
+        server.start()
+
+        try:
+            # when
+            response = urlopen(f"http://127.0.0.1:{server.port}/metrics")
+
+            # then
+            assert response.status == 200
+            assert response.headers['Content-Type'].startswith('text/plain')
+            assert 'lifecycle_blocks_total 1' in response.read().decode('utf-8')
+
+            # and
+            with pytest.raises(HTTPError):
+                urlopen(f"http://127.0.0.1:{server.port}/other")
+        finally:
+            server.stop()
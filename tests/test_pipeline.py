@@ -0,0 +1,152 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 MakerDAO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import time
+
+import pytest
+
+from pymaker.blocks import BlockContext, BlockHeader
+from pymaker.pipeline import Pipeline
+from tests.test_blocks import block
+
+
+def context(number: int) -> BlockContext:
+    return BlockContext(BlockHeader.from_block(block(number)), [])
+
+
+@pytest.mark.timeout(30)
+class TestPipeline:
+    def test_should_pass_results_between_stages(self):
+        # given
+        acted = []
+        pipeline = Pipeline([('fetch', lambda block: block.number * 10),
+                             ('evaluate', lambda block, urns: urns + 1),
+                             ('act', lambda block, bids: acted.append((block.number, bids)))])
+
+        # when
+        pipeline.start()
+        pipeline.submit(context(1))
+        pipeline.stop()
+
+        # then
+        assert acted == [(1, 11)]
+        assert pipeline.metrics['fetch'].processed == 1
+        assert pipeline.metrics['act'].last_latency is not None
+        assert pipeline.last_block_latency is not None
+
+    def test_should_overlap_fetching_with_acting(self):
+        # given
+        events = []
+
+        def fetch(block):
+            events.append(('fetch', block.number))
+            return block.number
+
+        def act(block, result):
+            time.sleep(0.2)
+            events.append(('acted', block.number))
+
+        pipeline = Pipeline([('fetch', fetch), ('evaluate', lambda block, result: result), ('act', act)])
+
+        # when
+        pipeline.start()
+        pipeline.submit(context(1))
+        time.sleep(0.05)
+        pipeline.submit(context(2))
+        pipeline.stop()
+
+        # then
+        assert events.index(('fetch', 2)) < events.index(('acted', 1))
+        assert ('acted', 2) in events
+        assert pipeline.metrics['act'].max_latency >= 0.2
+
+    def test_should_drop_stale_blocks_and_survive_failures(self):
+        # given
+        evaluated = []
+
+        def evaluate(block, result):
+            time.sleep(0.1)
+            if block.number == 1:
+                raise Exception("evaluation failed")
+            evaluated.append(block.number)
+
+        pipeline = Pipeline([('fetch', lambda block: True), ('evaluate', evaluate)])
+
+        # when
+        pipeline.start()
+        for number in range(1, 6):
+            pipeline.submit(context(number))
+            time.sleep(0.01)
+        pipeline.stop()
+
+        # then
+        assert evaluated[-1] == 5
+        assert pipeline.metrics['evaluate'].failed == 1
+        assert pipeline.metrics['evaluate'].dropped > 0
+        assert pipeline.metrics['evaluate'].processed + pipeline.metrics['evaluate'].dropped == 4
+
+    def test_should_stop_processing_block_when_stage_returns_none(self):
+        # given
+        acted = []
+        pipeline = Pipeline([('fetch', lambda block: None), ('act', lambda block, result: acted.append(block))])
+
+        # when
+        pipeline.start()
+        pipeline.submit(context(1))
+        pipeline.stop()
+
+        # then
+        assert acted == []
+
+    def test_should_run_stages_in_worker_processes(self):
+        # given
+        acted = []
+        pipeline = Pipeline([('fetch', lambda block: {'urns': [block.number, 2, 3]}),
+                             ('evaluate', evaluate_in_process),
+                             ('act', lambda block, result: acted.append(result))],
+                            process_stages=['evaluate'], max_workers=1)
+
+        # when
+        pipeline.start()
+        pipeline.submit(context(7))
+        pipeline.stop()
+
+        # then
+        assert acted[0][0] == 12
+        assert acted[0][1] != os.getpid()
+        assert pipeline.metrics['evaluate'].last_input_size > 0
+        assert pipeline.metrics['evaluate'].last_output_size > 0
+
+    def test_should_start_worker_processes_before_stage_threads(self):
+        # given
+        pipeline = Pipeline([('fetch', lambda block: {'urns': [block.number]}),
+                             ('evaluate', evaluate_in_process)],
+                            process_stages=['evaluate'], max_workers=1)
+        pipeline._run_stage = lambda index: None
+
+        # when
+        pipeline.start()
+
+        # then
+        assert len(pipeline._process_pool._processes) == 1
+        pipeline.stop()
+
+
+def evaluate_in_process(header: BlockHeader, snapshot: dict) -> tuple:
+    assert header.number == snapshot['urns'][0]
+    return sum(snapshot['urns']), os.getpid()
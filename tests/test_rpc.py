@@ -0,0 +1,151 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 MakerDAO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+
+from pymaker.metrics import InMemoryMetrics
+from pymaker.rpc import RpcAccounting, rpc_origin
+
+
+def successful_request(method, params):
+    return {'jsonrpc': '2.0', 'id': 1, 'result': '0x1'}
+
+
+def failed_request(method, params):
+    return {'jsonrpc': '2.0', 'id': 1, 'error': {'code': -32000, 'message': 'failed'}}
+
+
+class SomeContract:
+    def __init__(self, make_request):
+        self.make_request = make_request
+
+    def some_getter(self):
+        return self.make_request('eth_call', [])
+
+    def other_getter(self):
+        return self.make_request('eth_getStorageAt', [])
+
+
+class TestRpcAccounting:
+    def setup_method(self):
+        self.accounting = RpcAccounting(modules=('tests',))
+
+    def test_should_count_calls_per_method_and_origin(self):
+        # given
+        contract = SomeContract(self.accounting.middleware(successful_request, None))
+
+        # when
+        contract.some_getter()
+        contract.some_getter()
+        contract.other_getter()
+
+        # then
+        snapshot = {(stats['method'], stats['origin']): stats for stats in self.accounting.snapshot()}
+        assert snapshot[('eth_call', 'SomeContract.some_getter')]['count'] == 2
+        assert snapshot[('eth_getStorageAt', 'SomeContract.other_getter')]['count'] == 1
+        assert snapshot[('eth_call', 'SomeContract.some_getter')]['errors'] == 0
+        assert self.accounting.totals_by_origin() == {'SomeContract.some_getter': 2, 'SomeContract.other_getter': 1}
+
+    def test_should_count_errors(self):
+        # given
+        contract = SomeContract(self.accounting.middleware(failed_request, None))
+
+        # when
+        contract.some_getter()
+
+        # then
+        assert self.accounting.snapshot()[0]['errors'] == 1
+
+    def test_should_count_exceptions_as_errors(self):
+        # given
+        def raising_request(method, params):
+            raise ConnectionError("node is down")
+
+        contract = SomeContract(self.accounting.middleware(raising_request, None))
+
+        # when
+        with pytest.raises(ConnectionError):
+            contract.some_getter()
+
+        # then
+        assert self.accounting.snapshot()[0]['count'] == 1
+        assert self.accounting.snapshot()[0]['errors'] == 1
+
+    def test_should_attribute_to_explicit_origin(self):
+        # given
+        contract = SomeContract(self.accounting.middleware(successful_request, None))
+
+        # when
+        with rpc_origin("Keeper.check_cdps"):
+            contract.some_getter()
+
+        # then
+        assert self.accounting.totals_by_origin() == {'Keeper.check_cdps': 1}
+
+    def test_should_attribute_to_unknown_outside_of_modules(self):
+        # given
+        accounting = RpcAccounting(modules=('pymaker',))
+        contract = SomeContract(accounting.middleware(successful_request, None))
+
+        # when
+        contract.some_getter()
+
+        # then
+        assert accounting.totals_by_origin() == {'unknown': 1}
+
+    def test_should_report_to_metrics_sink(self):
+        # given
+        metrics = InMemoryMetrics()
+        accounting = RpcAccounting(metrics_sink=metrics, modules=('tests',))
+        contract = SomeContract(accounting.middleware(successful_request, None))
+
+        # when
+        contract.some_getter()
+
+        # then
+        labels = {'method': 'eth_call', 'origin': 'SomeContract.some_getter'}
+        assert metrics.counter("rpc_requests_total", labels) == 1
+        assert metrics.histogram("rpc_seconds", labels).count == 1
+
+    def test_reset_and_log_summary(self):
+        # given
+        contract = SomeContract(self.accounting.middleware(successful_request, None))
+        contract.some_getter()
+
+        # when
+        self.accounting.log_summary()
+        self.accounting.reset()
+
+        # then
+        assert self.accounting.snapshot() == []
+
+    def test_should_not_relate_summary_to_one_from_before_reset(self, caplog):
+        # given
+        contract = SomeContract(self.accounting.middleware(successful_request, None))
+        contract.some_getter()
+        contract.some_getter()
+        self.accounting.log_summary()
+
+        # when
+        self.accounting.reset()
+        contract.some_getter()
+        caplog.clear()
+        self.accounting.log_summary()
+
+        # then
+        assert "since the last summary" not in caplog.text
+        assert "Made 1 RPC calls in total" in caplog.text
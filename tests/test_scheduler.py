@@ -0,0 +1,137 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 MakerDAO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+import time
+
+from pymaker.metrics import InMemoryMetrics
+from pymaker.scheduler import Scheduler
+
+
+class TestScheduler:
+    def setup_method(self):
+        self.scheduler = Scheduler(max_workers=2, poll_interval=0.01)
+        self.scheduler.start()
+
+    def teardown_method(self):
+        self.scheduler.stop()
+
+    def test_should_run_callback_once_at_a_time(self):
+        # given
+        callback = self.scheduler.callback(lambda: time.sleep(0.2), "slow")
+
+        # when
+        first = callback.trigger()
+        second = callback.trigger()
+        callback.wait()
+
+        # then
+        assert first
+        assert not second
+        assert callback.runs == 1
+        assert callback.skipped == 1
+
+    def test_should_pass_arguments_and_survive_failures(self):
+        # given
+        calls = []
+
+        def function(value):
+            calls.append(value)
+            raise Exception("callback failed")
+
+        callback = self.scheduler.callback(function, "failing")
+
+        # when
+        callback.trigger(args=(1,))
+        callback.wait()
+        callback.trigger(args=(2,))
+        callback.wait()
+
+        # then
+        assert calls == [1, 2]
+        assert callback.failures == 2
+
+    def test_should_call_timers_and_count_overruns(self):
+        # given
+        callback = self.scheduler.callback(lambda: time.sleep(0.15), "timer", period=0.05)
+
+        # when
+        self.scheduler.every(0.05, callback.trigger, initial_delay=0)
+        time.sleep(0.4)
+        callback.wait()
+
+        # then
+        assert callback.runs >= 2
+        assert callback.overruns == callback.runs
+        assert callback.skipped > 0
+
+    def test_should_call_watches_on_event_and_min_frequency(self):
+        # given
+        event = threading.Event()
+        reasons = []
+        callback = self.scheduler.callback(lambda: None, "event")
+
+        def function(event_happened):
+            reasons.append(event_happened)
+            callback.trigger()
+
+        # when
+        self.scheduler.watch(event, 0.3, callback, function)
+        time.sleep(0.1)
+        event.set()
+        time.sleep(0.1)
+
+        # then
+        assert reasons == [False, True]
+
+        # when
+        time.sleep(0.35)
+
+        # then
+        assert reasons == [False, True, False]
+
+    def test_should_not_use_more_threads_than_workers(self):
+        # given
+        callbacks = [self.scheduler.callback(lambda: time.sleep(0.05), f"callback #{i}") for i in range(10)]
+        threads = threading.active_count()
+
+        # when
+        for callback in callbacks:
+            callback.trigger()
+        peak = threading.active_count()
+        for callback in callbacks:
+            callback.wait()
+
+        # then
+        assert all(callback.runs == 1 for callback in callbacks)
+        assert peak - threads <= 2
+
+    def test_should_report_metrics(self):
+        # given
+        metrics = InMemoryMetrics()
+        self.scheduler.metrics_sink = metrics
+        callback = self.scheduler.callback(lambda: time.sleep(0.1), "slow", period=0.05)
+
+        # when
+        callback.trigger()
+        callback.trigger()
+        callback.wait()
+
+        # then
+        assert metrics.histogram('lifecycle_callback_duration_seconds', {'callback': 'slow'}).count == 1
+        assert metrics.counter('lifecycle_callback_skipped_total', {'callback': 'slow'}) == 1
+        assert metrics.counter('lifecycle_callback_overruns_total', {'callback': 'slow'}) == 1
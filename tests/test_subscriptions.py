@@ -0,0 +1,107 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 MakerDAO
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from functools import partial
+from unittest.mock import Mock
+
+from eth_abi import encode_abi
+from eth_utils import event_abi_to_log_topic
+from hexbytes import HexBytes
+from web3 import Web3
+
+from pymaker import Address, _decode_event_log
+from pymaker.blocks import BlockHeader
+from pymaker.dss import Cat, Ilk, Vat
+from pymaker.logging import LogNote, VAT_LAYOUT
+from pymaker.subscriptions import LogSubscriptions
+from tests.test_blocks import logs_bloom
+from tests.test_logging import URN, frob_log
+
+VAT = Address(URN)
+CAT = Address('0x00000000001111111111000000000011111111AB')
+BITE_ABI = [item for item in Cat.abi if item.get('name') == 'Bite'][0]
+
+
+def bite_log() -> dict:
+    return {'address': CAT.address,
+            'topics': [HexBytes(event_abi_to_log_topic(BITE_ABI)), HexBytes(Ilk('ETH-A').toBytes()),
+                       HexBytes(bytes(12) + VAT.as_bytes())],
+            'data': '0x' + encode_abi(['uint256', 'uint256', 'uint256', 'address', 'uint256'],
+                                      [10**18, 2 * 10**18, 3 * 10**45, URN, 1]).hex(),
+            'blockNumber': 123,
+            'transactionHash': HexBytes('0x' + 'ab' * 32),
+            'logIndex': 1,
+            'transactionIndex': 0,
+            'blockHash': HexBytes('0x' + 'cd' * 32)}
+
+
+def header(*values: bytes) -> BlockHeader:
+    return BlockHeader(123, bytes.fromhex('cd' * 32), bytes(32), 1500000000, logs_bloom(*values))
+
+
+class TestLogSubscriptions:
+    def setup_method(self):
+        self.web3 = Mock(Web3)
+        self.web3.eth = Mock()
+        self.web3.eth.getCode = Mock(return_value=b'\x60\x80')
+        self.web3.eth.getLogs = Mock(return_value=[frob_log(), bite_log()])
+        self.subscriptions = LogSubscriptions(self.web3)
+        self.vat = Vat(self.web3, VAT)
+
+    def test_should_dispatch_events_of_many_contracts_with_a_single_call(self):
+        # given
+        frobs, bites = [], []
+        self.vat.on_frob(self.subscriptions, frobs.append)
+        self.subscriptions.subscribe(CAT, ['0x' + event_abi_to_log_topic(BITE_ABI).hex()],
+                                     partial(_decode_event_log, BITE_ABI, Cat.LogBite), bites.append)
+
+        # when
+        dispatched = self.subscriptions.process_block(header(VAT.as_bytes(), frob_log()['topics'][0],
+                                                             CAT.as_bytes(), bite_log()['topics'][0]))
+
+        # then
+        assert dispatched == 2
+        assert frobs == [Vat.LogFrob(LogNote.from_log(frob_log(), VAT_LAYOUT))]
+        assert bites[0].urn.address == VAT
+        assert self.web3.eth.getLogs.call_count == 1
+
+    def test_should_skip_blocks_ruled_out_by_bloom(self):
+        # given
+        frobs = []
+        self.vat.on_frob(self.subscriptions, frobs.append)
+
+        # when
+        dispatched = self.subscriptions.process_block(header(CAT.as_bytes()))
+
+        # then
+        assert dispatched == 0
+        assert self.web3.eth.getLogs.call_count == 0
+
+    def test_should_survive_failing_handlers_and_cancel(self):
+        # given
+        raw_logs = []
+        self.subscriptions.subscribe(VAT, None, None, Mock(side_effect=Exception("handler failed")))
+        subscription = self.subscriptions.subscribe(VAT, None, None, raw_logs.append)
+
+        # when
+        self.subscriptions.process_block(header(VAT.as_bytes()))
+        subscription.cancel()
+        self.subscriptions.process_block(header(VAT.as_bytes()))
+
+        # then
+        assert raw_logs == [frob_log()]
+        assert len(self.subscriptions) == 1
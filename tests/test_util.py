@@ -281,3 +281,15 @@ class TestAsyncCallback:
 
         # then
         assert mock.mock_calls == [call.on_start(), call.callback(), call.on_finish()]
+
+    def test_should_pass_arguments_to_the_callback(self):
+        # given
+        mock = Mock()
+        async_callback = AsyncCallback(mock.callback)
+
+        # when
+        async_callback.trigger(args=(1, 'a'))
+        async_callback.wait()
+
+        # then
+        assert mock.mock_calls == [call.callback(1, 'a')]